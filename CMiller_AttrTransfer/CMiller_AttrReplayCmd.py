@@ -0,0 +1,67 @@
+"""
+~ Attribute Replay Command ~ 2026/10/19
+
+Scripted plugin for the cmmAttrReplay command, which puts attribute edits made through DG
+modifiers on Maya's undo queue.
+
+CMiller_AttrSchema.runUndoable loads it on first use and hands each edit over before calling
+the command. doIt runs the edit, undoIt and redoIt replay the AttrReplay it recorded, so a whole
+transfer or set of channel connections is one undo step.
+
+v.1 Initial Release
+"""
+
+import sys
+
+from maya import OpenMayaMPx as ompx
+
+import CMiller_AttrSchema
+
+
+class AttrReplayCmd(ompx.MPxCommand):
+    """ Runs one pending edit from CMiller_AttrSchema.runUndoable.
+
+    """
+    def __init__(self):
+        ompx.MPxCommand.__init__(self)
+        self.replay = None
+
+    def doIt(self, args):
+        func, self.replay = CMiller_AttrSchema.takePending()
+        try:
+            func(self.replay)
+        except Exception:
+            # Leave the scene as it was, nothing lands on the undo queue
+            self.replay.undoIt()
+            raise
+
+    def undoIt(self):
+        self.replay.undoIt()
+
+    def redoIt(self):
+        self.replay.redoIt()
+
+    def isUndoable(self):
+        return True
+
+
+def cmdCreator():
+    return ompx.asMPxPtr(AttrReplayCmd())
+
+
+def initializePlugin(mobject):
+    mplugin = ompx.MFnPlugin(mobject, 'Christopher M. Miller', '1.0')
+    try:
+        mplugin.registerCommand(CMiller_AttrSchema.COMMAND_NAME, cmdCreator)
+    except RuntimeError:
+        sys.stderr.write("Failed to register command: %s\n" % CMiller_AttrSchema.COMMAND_NAME)
+        raise
+
+
+def uninitializePlugin(mobject):
+    mplugin = ompx.MFnPlugin(mobject)
+    try:
+        mplugin.deregisterCommand(CMiller_AttrSchema.COMMAND_NAME)
+    except RuntimeError:
+        sys.stderr.write("Failed to deregister command: %s\n" % CMiller_AttrSchema.COMMAND_NAME)
+        raise
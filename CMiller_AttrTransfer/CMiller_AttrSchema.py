@@ -0,0 +1,466 @@
+"""
+~ Attribute Schema ~ 2026/10/19
+
+Snapshots of user attributes, for cloning them onto many objects at once.
+
+AttrSchema.capture reads everything about the source's attributes in one pass: types, short
+names, ranges, enum fields, compound children, defaults, values, flags and connections.
+apply() replays the snapshot onto any number of destinations without querying the source
+again. Fresh attribute objects are built per destination and added through one MDGModifier,
+values and connections go through a second one once the plugs exist.
+
+API edits don't go through Maya's undo queue by themselves. runUndoable hands the edit to
+the cmmAttrReplay command (CMiller_AttrReplayCmd, loaded on first use), which runs it and
+records every modifier and lock change in an AttrReplay, so the whole transfer is one undo
+step that Ctrl+Z reverts.
+
+v.3 Connections skip plugs whose compound parent is driven, replace driven children
+v.2 Edits run inside the undoable cmmAttrReplay command
+v.1 Initial Release
+"""
+
+import os
+
+from maya import OpenMaya as om, cmds
+
+myDir = os.path.dirname(os.path.abspath(__file__))
+
+COMMAND_NAME = 'cmmAttrReplay'
+COMMAND_PLUGIN = 'CMiller_AttrReplayCmd'
+
+# Attribute type (getAttr -typ) to the API type it's created with
+NUMERIC_TYPES = {'bool': om.MFnNumericData.kBoolean, 'long': om.MFnNumericData.kInt,
+                 'short': om.MFnNumericData.kShort, 'byte': om.MFnNumericData.kByte,
+                 'char': om.MFnNumericData.kChar, 'float': om.MFnNumericData.kFloat,
+                 'double': om.MFnNumericData.kDouble}
+UNIT_TYPES = {'doubleLinear': om.MFnUnitAttribute.kDistance, 'doubleAngle': om.MFnUnitAttribute.kAngle,
+              'time': om.MFnUnitAttribute.kTime}
+# Compounds the API builds as a single numeric attribute with 2 or 3 children
+NUMERIC_COMPOUNDS = ['double2', 'double3', 'float2', 'float3', 'long2', 'long3', 'short2', 'short3']
+
+
+def enumFields(enumString):
+    """ Splits an attributeQuery -listEnum string into its fields.
+
+    :param enumString: e.g. 'off:on' or 'low=1:high=10'.
+    :return: List of (field name, value).
+    """
+    fields = []
+    value = 0
+    for field in enumString.split(':'):
+        if not field:
+            continue
+        if '=' in field:
+            field, value = field.rsplit('=', 1)
+            value = int(value)
+        fields.append((field, value))
+        value += 1
+    return fields
+
+
+def _unitValue(attrType, value):
+    """ A UI unit value as the MDistance, MAngle or MTime the API expects.
+
+    """
+    if attrType == 'doubleLinear':
+        return om.MDistance(value, om.MDistance.uiUnit())
+    if attrType == 'doubleAngle':
+        return om.MAngle(value, om.MAngle.uiUnit())
+    return om.MTime(value, om.MTime.uiUnit())
+
+
+def getDependNode(name):
+    """ Returns the MObject for a node name.
+
+    :param name: Node name.
+    :return: MObject
+    """
+    selList = om.MSelectionList()
+    selList.add(name)
+    obj = om.MObject()
+    selList.getDependNode(0, obj)
+    return obj
+
+
+def getPlug(name):
+    """ Returns the MPlug for an attribute name.
+
+    :param name: Full attribute name, node.attr.
+    :return: MPlug
+    """
+    selList = om.MSelectionList()
+    selList.add(name)
+    plug = om.MPlug()
+    selList.getPlug(0, plug)
+    return plug
+
+
+class AttrSchema(object):
+    """ Everything needed to recreate a set of user attributes, read once from a source object.
+
+    """
+    def __init__(self, source, entries):
+        self.source = source
+        self.entries = entries
+
+    @classmethod
+    def capture(cls, source, attrs=None):
+        """ Reads the schema of user attributes from an object.
+
+        Children of compounds are captured with their parent, asking for a child captures the parent.
+
+        :param source: Object holding the attributes.
+        :param attrs: Attribute names, defaults to every user attribute.
+        :return: AttrSchema
+        """
+        if not attrs:
+            attrs = cmds.listAttr(source, ud=1) or []
+        entries = []
+        done = set()
+        for attr in attrs:
+            if not cmds.attributeQuery(attr, node=source, ex=1):
+                continue
+            parents = cmds.attributeQuery(attr, node=source, lp=1)
+            if parents:
+                attr = parents[-1]
+            if attr in done:
+                continue
+            done.add(attr)
+            entry = cls._captureAttr(source, attr)
+            if entry is not None:
+                entries.append(entry)
+        return cls(source, entries)
+
+    @classmethod
+    def _captureAttr(cls, source, attr):
+        plug = "%s.%s" % (source, attr)
+        attrType = cmds.getAttr(plug, typ=1)
+        kids = cmds.attributeQuery(attr, node=source, lc=1) or []
+        entry = {'name': attr, 'short': cmds.attributeQuery(attr, node=source, sn=1), 'type': attrType,
+                 'keyable': cmds.getAttr(plug, k=1), 'channelBox': cmds.getAttr(plug, cb=1),
+                 'lock': cmds.getAttr(plug, l=1), 'hidden': cmds.attributeQuery(attr, node=source, h=1),
+                 'input': (cmds.listConnections(plug, s=1, d=0, p=1) or [None])[0],
+                 'outputs': cmds.listConnections(plug, s=0, d=1, p=1) or [],
+                 'value': None, 'default': None, 'children': []}
+
+        if kids:
+            entry['children'] = [cls._captureAttr(source, kid) for kid in kids]
+            if None in entry['children']:
+                return None
+        elif attrType == 'enum':
+            entry['fields'] = enumFields(cmds.attributeQuery(attr, node=source, le=1)[0])
+            entry['default'] = cmds.attributeQuery(attr, node=source, ld=1)[0]
+            entry['value'] = cmds.getAttr(plug)
+        elif attrType in NUMERIC_TYPES or attrType in UNIT_TYPES:
+            entry['default'] = cmds.attributeQuery(attr, node=source, ld=1)[0]
+            entry['value'] = cmds.getAttr(plug)
+            for key, exists, flag in [('min', 'mne', 'min'), ('max', 'mxe', 'max'),
+                                      ('softMin', 'sme', 'smn'), ('softMax', 'sxe', 'smx')]:
+                if cmds.attributeQuery(attr, node=source, **{exists: 1}):
+                    entry[key] = cmds.attributeQuery(attr, node=source, **{flag: 1})[0]
+        elif attrType == 'string':
+            entry['value'] = cmds.getAttr(plug)
+        elif attrType != 'message':
+            cmds.warning("Skipping %s, %s attributes can't be transferred" % (plug, attrType))
+            return None
+        return entry
+
+    def leaves(self, entry=None):
+        """ Every entry with its children, parents first.
+
+        """
+        for item in ([entry] if entry else self.entries):
+            yield item
+            for kid in item['children']:
+                for leaf in self.leaves(kid):
+                    yield leaf
+
+    ##########################
+    #
+    # Replay
+    #
+    ##########################
+
+    def _createAttr(self, entry, fnNode):
+        """ Builds a new attribute object from an entry.
+
+        """
+        name = entry['name']
+        short = entry['short'] if entry['short'] and not fnNode.hasAttribute(entry['short']) else name
+        attrType = entry['type']
+        if entry['children']:
+            children = [self._createAttr(kid, fnNode) for kid in entry['children']]
+            if attrType in NUMERIC_COMPOUNDS and len(children) in (2, 3):
+                attrObj = om.MFnNumericAttribute().create(name, short, *children)
+            else:
+                fnCompound = om.MFnCompoundAttribute()
+                attrObj = fnCompound.create(name, short)
+                for child in children:
+                    fnCompound.addChild(child)
+        elif attrType == 'enum':
+            fnEnum = om.MFnEnumAttribute()
+            attrObj = fnEnum.create(name, short, int(entry['default']))
+            for field, value in entry['fields']:
+                fnEnum.addField(field, value)
+        elif attrType in NUMERIC_TYPES:
+            fnNumeric = om.MFnNumericAttribute()
+            attrObj = fnNumeric.create(name, short, NUMERIC_TYPES[attrType], entry['default'])
+            for key, setter in [('min', fnNumeric.setMin), ('max', fnNumeric.setMax),
+                                ('softMin', fnNumeric.setSoftMin), ('softMax', fnNumeric.setSoftMax)]:
+                if key in entry:
+                    setter(entry[key])
+        elif attrType in UNIT_TYPES:
+            fnUnit = om.MFnUnitAttribute()
+            attrObj = fnUnit.create(name, short, _unitValue(attrType, entry['default']))
+            for key, setter in [('min', fnUnit.setMin), ('max', fnUnit.setMax),
+                                ('softMin', fnUnit.setSoftMin), ('softMax', fnUnit.setSoftMax)]:
+                if key in entry:
+                    setter(_unitValue(attrType, entry[key]))
+        elif attrType == 'string':
+            attrObj = om.MFnTypedAttribute().create(name, short, om.MFnData.kString)
+        else:
+            attrObj = om.MFnMessageAttribute().create(name, short)
+
+        fnAttr = om.MFnAttribute(attrObj)
+        fnAttr.setKeyable(bool(entry['keyable']))
+        if not entry['keyable']:
+            fnAttr.setChannelBox(bool(entry['channelBox']))
+        fnAttr.setHidden(bool(entry['hidden']))
+        return attrObj
+
+    def _setValue(self, modifier, plug, entry):
+        """ Queues the captured value of a new plug, if it differs from the default.
+
+        """
+        attrType = entry['type']
+        value = entry['value']
+        if value is None:
+            return
+        if attrType == 'string':
+            modifier.newPlugValueString(plug, value)
+        elif value == entry['default']:
+            return
+        elif attrType in UNIT_TYPES:
+            unitValue = _unitValue(attrType, value)
+            if attrType == 'doubleLinear':
+                modifier.newPlugValueMDistance(plug, unitValue)
+            elif attrType == 'doubleAngle':
+                modifier.newPlugValueMAngle(plug, unitValue)
+            else:
+                modifier.newPlugValueMTime(plug, unitValue)
+        elif attrType == 'bool':
+            modifier.newPlugValueBool(plug, bool(value))
+        elif attrType == 'float':
+            modifier.newPlugValueFloat(plug, value)
+        elif attrType == 'double':
+            modifier.newPlugValueDouble(plug, value)
+        else:
+            modifier.newPlugValueInt(plug, int(value))
+
+    def apply(self, dests, delFromSource=False):
+        """ Recreates the captured attributes on destination objects, as one undo step.
+
+        Attributes a destination already has are left as they are, but still get the captured
+        connections. Incoming connections are made on every destination. Outgoing ones can only
+        have one source, so they move to the last destination, as a forced connectAttr would.
+
+        :param dests: Objects to add the attributes to.
+        :param delFromSource: Removes the attributes from the source afterwards.
+        :return: AttrReplay
+        """
+        return runUndoable(lambda replay: self._apply(replay, dests, delFromSource))
+
+    def _apply(self, replay, dests, delFromSource):
+        plugCache = {}
+
+        def plugFor(name):
+            if name not in plugCache:
+                plugCache[name] = getPlug(name)
+            return plugCache[name]
+
+        targets = []
+        addModifier = om.MDGModifier()
+        for dest in dests:
+            obj = getDependNode(dest)
+            fnNode = om.MFnDependencyNode(obj)
+            created = []
+            for entry in self.entries:
+                if not fnNode.hasAttribute(entry['name']):
+                    addModifier.addAttribute(obj, self._createAttr(entry, fnNode))
+                    created.append(entry['name'])
+            targets.append((dest, obj, fnNode, set(created)))
+        replay.run(addModifier)
+
+        valueModifier = om.MDGModifier()
+        for ii, (dest, obj, fnNode, created) in enumerate(targets):
+            last = ii == len(targets) - 1
+            for top in self.entries:
+                isNew = top['name'] in created
+                for entry in self.leaves(top):
+                    plug = fnNode.findPlug(entry['name'])
+                    if isNew and not entry['children']:
+                        self._setValue(valueModifier, plug, entry)
+                    pairs = [(plugFor(entry['input']), plug)] if entry['input'] else []
+                    if last:
+                        pairs += [(plug, plugFor(output)) for output in entry['outputs']]
+                    for srcPlug, dstPlug in pairs:
+                        problem = connectProblem(srcPlug, dstPlug)
+                        if problem:
+                            cmds.warning("Not connecting %s to %s, %s" % (srcPlug.name(), dstPlug.name(), problem))
+                        else:
+                            connect(valueModifier, srcPlug, dstPlug)
+        replay.run(valueModifier)
+
+        for dest, obj, fnNode, created in targets:
+            for top in self.entries:
+                if top['name'] not in created:
+                    continue
+                for entry in self.leaves(top):
+                    if entry['lock'] or top['lock']:
+                        replay.setLocked(obj, entry['name'], True)
+
+        if delFromSource:
+            srcObj = getDependNode(self.source)
+            fnSource = om.MFnDependencyNode(srcObj)
+            removeModifier = om.MDGModifier()
+            for entry in self.entries:
+                if fnSource.hasAttribute(entry['name']):
+                    for leaf in self.leaves(entry):
+                        replay.setLocked(srcObj, leaf['name'], False)
+                    removeModifier.removeAttribute(srcObj, fnSource.attribute(entry['name']))
+            replay.run(removeModifier)
+
+'''
+################################################
+                                ~Undoable Edits~
+################################################
+'''
+
+
+def _input(plug):
+    inputs = om.MPlugArray()
+    if plug.connectedTo(inputs, True, False):
+        return inputs[0]
+    return None
+
+
+def connectProblem(srcPlug, dstPlug):
+    """ Why a forced connection can't be made through a DG modifier.
+
+    :param srcPlug: Driving MPlug.
+    :param dstPlug: Driven MPlug.
+    :return: Problem string || None if the connection can be made.
+    """
+    if srcPlug == dstPlug:
+        return "it can't drive itself"
+    if dstPlug.isLocked():
+        return "it is locked"
+    parent = dstPlug
+    while parent.isChild():
+        parent = parent.parent()
+        if _input(parent) is not None:
+            return "its parent %s is driven" % parent.partialName()
+    return None
+
+
+def connect(modifier, srcPlug, dstPlug):
+    """ Queues a forced connection, replacing whatever drives dstPlug or its children now.
+
+    :param modifier: MDGModifier to queue on.
+    :param srcPlug: Driving MPlug.
+    :param dstPlug: Driven MPlug.
+    :return: None
+    """
+    current = _input(dstPlug)
+    if current is not None:
+        if current == srcPlug:
+            return
+        modifier.disconnect(current, dstPlug)
+    if dstPlug.isCompound():
+        for ii in range(dstPlug.numChildren()):
+            child = dstPlug.child(ii)
+            childInput = _input(child)
+            if childInput is not None:
+                modifier.disconnect(childInput, child)
+    modifier.connect(srcPlug, dstPlug)
+
+
+class AttrReplay(object):
+    """ The modifiers and lock changes of one edit, in the order they were made.
+
+    cmmAttrReplay (CMiller_AttrReplayCmd) holds one per call and undoes or redoes it.
+    """
+    def __init__(self):
+        self.steps = []
+
+    def run(self, modifier):
+        """ Executes a modifier and remembers it.
+
+        """
+        modifier.doIt()
+        self.steps.append(('modifier', modifier))
+
+    def setLocked(self, obj, attr, locked):
+        """ Changes the lock state of a plug and remembers the old one.
+
+        """
+        plug = om.MFnDependencyNode(obj).findPlug(attr)
+        if plug.isLocked() != locked:
+            self.steps.append(('lock', (obj, attr, plug.isLocked(), locked)))
+            plug.setLocked(locked)
+
+    def undoIt(self):
+        """ Reverts the edit, newest change first.
+
+        :return: None
+        """
+        for kind, step in reversed(self.steps):
+            if kind == 'modifier':
+                step.undoIt()
+            else:
+                obj, attr, old, new = step
+                om.MFnDependencyNode(obj).findPlug(attr).setLocked(old)
+
+    def redoIt(self):
+        """ Makes the edit again after undoIt.
+
+        :return: None
+        """
+        for kind, step in self.steps:
+            if kind == 'modifier':
+                step.doIt()
+            else:
+                obj, attr, old, new = step
+                om.MFnDependencyNode(obj).findPlug(attr).setLocked(new)
+
+
+# (function, AttrReplay) handed over to the next cmmAttrReplay call
+_pending = []
+
+
+def runUndoable(func):
+    """ Runs func(replay) inside the cmmAttrReplay command, so all its edits are one undo step.
+
+    :param func: Function making its edits through the AttrReplay it gets.
+    :return: AttrReplay
+    """
+    if not cmds.pluginInfo(COMMAND_PLUGIN, q=1, loaded=1):
+        cmds.loadPlugin(os.path.join(myDir, COMMAND_PLUGIN + '.py'), quiet=1)
+    replay = AttrReplay()
+    _pending.append((func, replay))
+    try:
+        getattr(cmds, COMMAND_NAME)()
+    finally:
+        if _pending and _pending[-1][1] is replay:
+            _pending.pop()
+    return replay
+
+
+def takePending():
+    """ Command side of runUndoable.
+
+    :return: (function, AttrReplay)
+    """
+    if not _pending:
+        raise RuntimeError("%s only runs edits handed over by runUndoable" % COMMAND_NAME)
+    return _pending.pop()
@@ -10,193 +10,297 @@ Written and maintained by Christopher M. Miller
 
 
 
+v.7 Channel connections are refused up front when a compound parent is driven
+v.6 Transfers and channel connections are single undo steps (cmmAttrReplay command)
+v.5 Channel connections are checked up front and made in one DG modifier, with many-to-many pairing
+v.4 Reordering computes the fewest attributes to cycle, drag and drop in the attribute list
+v.3 Transfers replay a one pass attribute snapshot through DG modifiers (CMiller_AttrSchema)
 v.2 Added Channel Box functionality
 v.1 Initial Release to copy and transfer attributes.
 
 """
 
-from maya import OpenMayaUI as omUI, cmds, mel
+from maya import OpenMaya as om, OpenMayaUI as omUI, cmds, mel
 from PySide import QtGui, QtCore, QtUiTools
 from shiboken import wrapInstance
 import os
 
+from CMiller_AttrSchema import AttrSchema, connect, connectProblem, getDependNode, getPlug, runUndoable
+
 myDir = os.path.dirname(os.path.abspath(__file__))
 myFile = os.path.join(myDir, 'CMiller_AttrTransfer.ui')
 
 
-def cmmConnectChannels(source="", dest=[], sourceAttr=""):
-    """ Can connect attributes between two objects using Channel Box selection.
+def plugKind(plug):
+    """ What a plug carries, for checking connections before they're made.
+
+    :param plug: MPlug
+    :return: (kind, detail) tuple || None for generic attributes that take anything.
+    """
+    attrObj = plug.attribute()
+    if attrObj.hasFn(om.MFn.kGenericAttribute):
+        return None
+    if plug.isCompound():
+        kind = 'numeric' if attrObj.hasFn(om.MFn.kNumericAttribute) else 'compound'
+        return kind, plug.numChildren()
+    if attrObj.hasFn(om.MFn.kMatrixAttribute):
+        return 'matrix', 0
+    if attrObj.hasFn(om.MFn.kTypedAttribute):
+        dataType = om.MFnTypedAttribute(attrObj).attrType()
+        return ('matrix', 0) if dataType == om.MFnData.kMatrix else ('typed', dataType)
+    if attrObj.hasFn(om.MFn.kMessageAttribute):
+        return 'message', 0
+    # Numbers, units and enums all convert into each other
+    return 'numeric', 1
+
+
+def connectPlugs(pairs):
+    """ Connects attributes in one DG modifier, replacing whatever drives the destinations now.
+
+    Every plug is resolved once and every pair is checked before the first connection is made,
+    so either all connections happen or none do. That includes plugs whose compound parent is
+    driven, e.g. tx while translate has an input, which the modifier would refuse.
+    They're made as one undo step.
+
+    :param pairs: List of (source attribute, destination attribute) full names.
+    :return: AttrReplay to undo the connections || None if any pair can't be connected.
+    """
+    plugs = {}
+    problems = []
+
+    def plugFor(name):
+        if name not in plugs:
+            try:
+                plugs[name] = getPlug(name)
+            except RuntimeError:
+                plugs[name] = None
+        return plugs[name]
+
+    resolved = []
+    # Destination plug names, and the compound parents of destinations
+    driven = set()
+    drivenParents = set()
+    for src, dst in pairs:
+        srcPlug, dstPlug = plugFor(src), plugFor(dst)
+        if srcPlug is None or dstPlug is None:
+            problems.append("%s doesn't exist" % (src if srcPlug is None else dst))
+            continue
+        parents = []
+        parent = dstPlug
+        while parent.isChild():
+            parent = parent.parent()
+            parents.append(parent.name())
+        problem = connectProblem(srcPlug, dstPlug)
+        if dstPlug.name() in driven:
+            problems.append("%s would be driven twice" % dst)
+        elif problem:
+            problems.append("%s, %s" % (dst, problem))
+        elif driven.intersection(parents) or dstPlug.name() in drivenParents:
+            problems.append("%s and its compound parent or child would both be driven" % dst)
+        else:
+            srcKind, dstKind = plugKind(srcPlug), plugKind(dstPlug)
+            if srcKind is not None and dstKind is not None and srcKind != dstKind:
+                problems.append("%s can't drive %s" % (src, dst))
+            else:
+                resolved.append((srcPlug, dstPlug))
+                driven.add(dstPlug.name())
+                drivenParents.update(parents)
+    if problems:
+        cmds.warning("Nothing connected, %d problems: %s" % (len(problems), '; '.join(problems[:10])))
+        return None
+
+    def connectAll(replay):
+        modifier = om.MDGModifier()
+        for srcPlug, dstPlug in resolved:
+            connect(modifier, srcPlug, dstPlug)
+        replay.run(modifier)
+
+    return runUndoable(connectAll)
 
-    :param source: The Object that will control the others.
+
+def cmmConnectChannels(source="", dest=[], sourceAttr="", attrs=None):
+    """ Can connect attributes between objects using Channel Box selection.
+
+    One source drives every destination. Given a list of sources as long as dest, each source
+    drives its own destination instead. Everything is connected in one go, see connectPlugs,
+    and a single undo takes it back.
+
+    :param source: The Object that will control the others, or a list of objects paired with dest.
     :param dest: A list of objects to be controlled.
     :param sourceAttr: Optional argument to specify an attribute, otherwise Channel Box selection is used.
-    :return: None
+    :param attrs: Optional list of destination attributes, otherwise Channel Box selection is used.
+    :return: AttrReplay || None
     """
     if not source:
         source = cmds.ls(sl=1)[0]
     if not dest:
         dest = cmds.ls(sl=1)[1:]
+    sources = list(source) if isinstance(source, (list, tuple)) else [source] * len(dest)
+    if len(sources) != len(dest):
+        cmds.warning("%d sources can't be paired with %d destinations" % (len(sources), len(dest)))
+        return None
 
-    channelBox = mel.eval(
-        'global string $gChannelBoxName; $temp=$gChannelBoxName;')  # Get Maya's Main ChannelBox
+    if not attrs:
+        channelBox = mel.eval(
+            'global string $gChannelBoxName; $temp=$gChannelBoxName;')  # Get Maya's Main ChannelBox
+        attrs = cmds.channelBox(channelBox, q=True, sma=True) or []
 
-    for de in dest:
-        attrs = cmds.channelBox(channelBox, q=True, sma=True)
+    pairs = [("%s.%s" % (src, sourceAttr or at), "%s.%s" % (de, at)) for src, de in zip(sources, dest) for at in attrs]
+    return connectPlugs(pairs)
 
-        for at in attrs:
-            if sourceAttr:
-                sAtt = sourceAttr
-            else:
-                sAtt = at
-            cmds.connectAttr("%s.%s" % (source, sAtt), "%s.%s" % (de, at), f=1)
+
+def topLevelAttrs(source, attrs):
+    """ Replaces compound children with their top parent, keeping the first occurrence.
+
+    :param source: Object holding the attributes.
+    :param attrs: Attribute names.
+    :return: List of top level attribute names.
+    """
+    tops = []
+    seen = set()
+    for attr in attrs:
+        parents = cmds.attributeQuery(attr, node=source, lp=1)
+        while parents:
+            attr = parents[0]
+            parents = cmds.attributeQuery(attr, node=source, lp=1)
+        if attr not in seen:
+            seen.add(attr)
+            tops.append(attr)
+    return tops
+
+
+def reorderPlan(current, order):
+    """ The fewest attributes to cycle to the bottom to turn one order into another.
+
+    Cycling moves an attribute to the end, so whatever isn't cycled keeps its relative order at
+    the top. The longest start of the new order that already shows up, in that order, in the
+    current list stays put and the rest is cycled in its new order.
+
+    :param current: Attribute names in their current order.
+    :param order: The same names in the wanted order.
+    :return: List of attributes to cycle, in order.
+    """
+    pos = 0
+    kept = 0
+    for attr in order:
+        while pos < len(current) and current[pos] != attr:
+            pos += 1
+        if pos == len(current):
+            break
+        kept += 1
+        pos += 1
+    return list(order[kept:])
+
+
+def shiftAttrs(order, attrs, step):
+    """ Moves attributes one place up or down, selected blocks move together.
+
+    :param order: Attribute names in their current order.
+    :param attrs: Attributes to move.
+    :param step: -1 for up, 1 for down.
+    :return: New list of attribute names.
+    """
+    order = list(order)
+    indices = [i for i, attr in enumerate(order) if attr in attrs]
+    if step > 0:
+        indices.reverse()
+    for i in indices:
+        j = i + step
+        if 0 <= j < len(order) and order[j] not in attrs:
+            order[i], order[j] = order[j], order[i]
+    return order
 
 
 def cmmMoveAttrProc(source, at=""):
     """ Function for moving a single attribute to the bottom.
 
+    Compound children move with their top parent. Lock states are switched through the API,
+    so the delete/undo pair leaves nothing on the undo queue.
+
     :param source: Object to affect.
     :param at: Attribute to move.
     :return: None
     """
-    bigP = cmds.attributeQuery(at, node=source, lp=1)
-    if bigP:
-        cmds.deleteAttr("%s.%s" % (source, bigP[0]))
-        cmds.undo()
-    else:
-        lStat = cmds.getAttr("%s.%s" % (source, at), l=1)
-        cmds.setAttr("%s.%s" % (source, at), l=0)
-        cmds.deleteAttr("%s.%s" % (source, at))
-        cmds.undo()
-        cmds.setAttr("%s.%s" % (source, at), l=lStat)
+    at = topLevelAttrs(source, [at])[0]
+    fnNode = om.MFnDependencyNode(getDependNode(source))
+    names = [name for name in cmds.listAttr("%s.%s" % (source, at)) or [at] if '[' not in name]
+    locked = [name for name in names if fnNode.findPlug(name).isLocked()]
+    for name in locked:
+        fnNode.findPlug(name).setLocked(False)
+    cmds.deleteAttr("%s.%s" % (source, at))
+    cmds.undo()
+    for name in locked:
+        fnNode.findPlug(name).setLocked(True)
+
+
+def cmmReorderAttrs(source, order):
+    """ Puts user attributes into a new order, cycling as few of them as possible.
+
+    Attributes left out of order keep their relative order after the listed ones. Connections,
+    locks and compound children survive, the undo queue is left as it was.
+
+    :param source: Object to affect.
+    :param order: Attribute names in the wanted order, children stand for their parent.
+    :return: Number of cycled attributes.
+    """
+    current = topLevelAttrs(source, cmds.listAttr(source, ud=1) or [])
+    order = [attr for attr in topLevelAttrs(source, order) if attr in current]
+    listed = set(order)
+    order += [attr for attr in current if attr not in listed]
+    cycle = reorderPlan(current, order)
+    if not cycle:
+        return 0
+
+    # The cycle relies on undoing deleteAttr
+    undoState = cmds.undoInfo(q=1, state=1)
+    if not undoState:
+        cmds.undoInfo(state=1)
+    try:
+        for attr in cycle:
+            cmmMoveAttrProc(source, attr)
+    finally:
+        if not undoState:
+            cmds.undoInfo(state=0)
+    return len(cycle)
 
 
 def cmmMoveAttr(source, at, up=1):
     """ Moves an attribute up or down in the Channel Box.
 
     :param source: Object to affect.
-    :param at: Attribute to move.
+    :param at: Attribute or list of attributes to move.
     :param up: Moves attribute up (1) or down (0)
     :return: None
     """
-    ats = cmds.listAttr(source, ud=1)
-    ind = ats.index(at)
-    if up == 1:
-        if ind == 0:
-            return
-        else:
-            moveNum = -1
-            for i, at in enumerate(ats):
-                if i == ind + moveNum:
-                    cmmMoveAttrProc(source, at)
-
-            for i, at in enumerate(ats):
-                if i > ind:
-                    cmmMoveAttrProc(source, at)
-
-                    # ats = cmds.listAttr(source, ud=1)
-                    # ind2 = ats.index(at)
-                    # if ind2==ind:
-                    #    cmmMoveAttr(source, at, up=1)
-
-
-    else:
-        if ind == len(ats) - 1:
-            return
-        else:
-            moveNum = 1
-            for i, at in enumerate(ats):
-                if i == ind:
-                    cmmMoveAttrProc(source, at)
-            for i, at in enumerate(ats):
-                if i > ind + moveNum:
-                    parents = cmds.attributeQuery(at, node=source, lp=1)
-                    if parents:
-                        cmmMoveAttrProc(source, parents[0])
-                    else:
-                        cmmMoveAttrProc(source, at)
-
-                        # ats = cmds.listAttr(source, ud=1)
-                        # ind2 = ats.index(at)
-                        # if ind2==ind:
-                        #    cmmMoveAttr(source, at, up=0)
+    ats = topLevelAttrs(source, cmds.listAttr(source, ud=1) or [])
+    moving = set(topLevelAttrs(source, at if isinstance(at, (list, tuple)) else [at]))
+    cmmReorderAttrs(source, shiftAttrs(ats, moving, -1 if up == 1 else 1))
 
 
 def cmmTransferAttr(source="", dest=[], delFromSource=0, customAttrs=[]):
     """ Transfers attributes between objects. Can either clone attributes to multiple objects,
      or move attributes to a single object including the attribute's connections.
 
+    The source is read once into an AttrSchema, which is then replayed onto every destination
+    in one batch, as a single undo step.
+
     :param source: Object that has the attribute(s) currently.
     :param dest: List of object(s) to transfer attribute(s) to.
     :param delFromSource: Boolean. Whether to "move" the attribute, including the connections.
     :param customAttrs: List of attribute(s) to be transferred.
-    :return: None
+    :return: AttrReplay
     """
     if not dest:
         dest = cmds.ls(sl=1)
+    dest = [de for de in dest if de != source]
+    if delFromSource:
+        # Moved attributes only exist once
+        dest = dest[:1]
+    if not dest:
+        return None
 
-    if not customAttrs:
-        customAttrs = cmds.listAttr(source, ud=1)
-
-    for de in dest:
-        for ca in customAttrs:
-            if cmds.attributeQuery(ca, node=source, ex=1):
-                attrType = cmds.getAttr("%s.%s" % (source, ca), typ=1)
-                attrVal = cmds.getAttr("%s.%s" % (source, ca))
-                attrConns = cmds.listConnections("%s.%s" % (source, ca), p=1)
-                attrKeyable = cmds.getAttr("%s.%s" % (source, ca), k=1)
-                attrCB = cmds.getAttr("%s.%s" % (source, ca), cb=1)
-                attrLock = cmds.getAttr("%s.%s" % (source, ca), l=1)
-
-                parents = cmds.attributeQuery(ca, node=source, lp=1)
-                kids = cmds.attributeQuery(ca, node=source, lc=1)
-
-                print attrType
-
-                if parents:
-                    pass
-                else:
-                    if not cmds.attributeQuery(ca, node=de, ex=1):
-                        if kids:
-                            cmds.addAttr(de, ln=ca, at=attrType, k=attrKeyable)
-                            for child in kids:
-                                atKid = cmds.getAttr("%s.%s" % (source, child), typ=1)
-                                cmds.addAttr(de, ln=child, attributeType=atKid, parent=ca, k=attrKeyable)
-                            for child in kids:
-                                atValKid = cmds.getAttr("%s.%s" % (source, child))
-                                cmds.setAttr("%s.%s" % (de, child), atValKid, l=attrLock)
-                        elif attrType == 'enum':
-                            enumList = cmds.attributeQuery(ca, node=source, le=1)[0]
-                            cmds.addAttr(de, ln=ca, at=attrType, en=enumList, k=attrKeyable)
-                            cmds.setAttr("%s.%s" % (de, ca), attrVal, l=attrLock)
-                        elif attrType in ["double", "float", "long"]:
-                            cmds.addAttr(de, ln=ca, at=attrType, k=attrKeyable)
-                            cmds.setAttr("%s.%s" % (de, ca), attrVal, l=attrLock)
-                            if cmds.attributeQuery(ca, node=source, mxe=1):
-                                attrMax = cmds.attributeQuery(ca, node=source, max=1)[0]
-                                cmds.addAttr("%s.%s" % (de, ca), e=1, max=attrMax)
-                            if cmds.attributeQuery(ca, node=source, mne=1):
-                                attrMin = cmds.attributeQuery(ca, node=source, min=1)[0]
-                                cmds.addAttr("%s.%s" % (de, ca), e=1, min=attrMin)
-                        elif attrType == 'string':
-                            cmds.addAttr(de, ln=ca, dt="string", k=attrKeyable)
-                            if attrVal:
-                                cmds.setAttr("%s.%s" % (de, ca), attrVal, type='string', l=attrLock)
-                        elif attrType == 'bool':
-                            cmds.addAttr(de, ln=ca, at=attrType, k=attrKeyable)
-                            cmds.setAttr("%s.%s" % (de, ca), attrVal, l=attrLock)
-
-                if attrKeyable == 0:
-                    cmds.setAttr("%s.%s" % (de, ca), cb=attrCB)
-
-                if attrConns:
-                    for conn in attrConns:
-                        cmds.connectAttr("%s.%s" % (de, ca), conn, f=1)
-
-        if delFromSource:
-            for ca in customAttrs:
-                if cmds.attributeQuery(ca, node=source, ex=1):
-                    cmds.setAttr("%s.%s" % (source, ca), l=0)
-                    cmds.deleteAttr("%s.%s" % (source, ca))
+    schema = AttrSchema.capture(source, customAttrs)
+    return schema.apply(dest, delFromSource)
 
 
 '''
@@ -260,6 +364,7 @@ class CMiller_AttrTransfer(QtGui.QDialog):
         self.UI.connectAttrs_pushButton.clicked.connect(self.connectChannels)
         self.UI.moveUp_pushButton.clicked.connect(self.moveAttrs)
         self.UI.moveDown_pushButton.clicked.connect(self.moveAttrs)
+        self.UI.attrs_listWidget.model().rowsMoved.connect(self.attrsDropped)
 
         # Show the window
         self.UI.show()
@@ -270,14 +375,21 @@ class CMiller_AttrTransfer(QtGui.QDialog):
         :return: None
         """
 
-        self.UI.attrs_listWidget.clear()
-        self.UI.type_listWidget.clear()
-
         sel = cmds.ls(sl=1)[0]
         self.UI.curSource_lineEdit.setText(sel)
+        self.listAttrs(sel)
+
+    def listAttrs(self, source):
+        """ Fills the attribute and type lists.
+
+        :param source: Object to list the user attributes of.
+        :return: None
+        """
+        self.UI.attrs_listWidget.clear()
+        self.UI.type_listWidget.clear()
 
-        attrs = cmds.listAttr(sel, ud=1)
-        attrTypes = [cmds.getAttr("%s.%s" % (sel, attr), typ=1) for attr in attrs]
+        attrs = cmds.listAttr(source, ud=1) or []
+        attrTypes = [cmds.getAttr("%s.%s" % (source, attr), typ=1) for attr in attrs]
 
         self.UI.attrs_listWidget.addItems(attrs)
         self.UI.type_listWidget.addItems(attrTypes)
@@ -289,7 +401,11 @@ class CMiller_AttrTransfer(QtGui.QDialog):
         """
         sender = self.sender().objectName()
         s = cmds.ls(sl=1)[0]
-        at = cmds.channelBox("mainChannelBox", q=1, sma=1)[0]
+        at = cmds.channelBox("mainChannelBox", q=1, sma=1) or []
+        if not at and s == self.UI.curSource_lineEdit.text():
+            at = [item.text() for item in self.UI.attrs_listWidget.selectedItems()]
+        if not at:
+            return
         if sender == "moveUp_pushButton":
             cmmMoveAttr(source=s, at=at, up=1)
         elif sender == "moveDown_pushButton":
@@ -297,6 +413,24 @@ class CMiller_AttrTransfer(QtGui.QDialog):
 
         self.loadNewSource()
 
+    def attrsDropped(self, *args):
+        """ Attribute list drag and drop, runs once the drop is done.
+
+        """
+        QtCore.QTimer.singleShot(0, self.reorderFromList)
+
+    def reorderFromList(self):
+        """ Reorders the source's attributes to match the attribute list.
+
+        :return: None
+        """
+        src = self.UI.curSource_lineEdit.text()
+        if not src or not cmds.objExists(src):
+            return
+        order = [self.UI.attrs_listWidget.item(i).text() for i in range(self.UI.attrs_listWidget.count())]
+        cmmReorderAttrs(src, order)
+        self.listAttrs(src)
+
     def connectChannels(self):
         """ GUI command variant of cmmConnectChannels.
 
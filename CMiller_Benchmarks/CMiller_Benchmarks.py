@@ -0,0 +1,338 @@
+"""
+~ Weight Benchmarks ~ 2026/10/19
+
+Timing baseline for the heavy skinning paths, runnable on plain Linux without Maya.
+
+Every operation runs against CMiller_FakeMaya on generated, mirror-symmetric meshes
+in a forked child process, so each result gets its own clean scene, peak memory
+reading and API call counts. Results are written to JSON and can be compared
+against the JSON of another commit.
+
+Usage:
+    python CMiller_Benchmarks.py --tiers xs,s --out bench.json
+    python CMiller_Benchmarks.py --tiers xs --compare bench.json
+
+Requires Python 2.7 (the tool modules are Python 2) and NumPy.
+
+v.1 Initial Release covering weightJumper, weightMirror and the skinSaver paths.
+
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import traceback
+
+import numpy as np
+
+myDir = os.path.dirname(os.path.abspath(__file__))
+rootDir = os.path.dirname(myDir)
+sys.path.insert(0, myDir)
+
+import CMiller_FakeMaya as fakeMaya
+
+# name: (vertices, influences)
+TIERS = [
+    ('xxs', (2000, 20)),
+    ('xs', (10000, 20)),
+    ('s', (100000, 60)),
+    ('m', (500000, 150)),
+    ('l', (1000000, 250)),
+    ('xl', (2000000, 100)),
+    ('wide', (50000, 500)),
+]
+DEFAULT_TIERS = 'xxs,xs,s'
+
+'''
+################################################
+                                ~Operations~
+################################################
+'''
+
+
+def _modules():
+    for tool in ['CMiller_WeightJumper', 'CMiller_SkinUI']:
+        path = os.path.join(rootDir, tool)
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    import CMiller_WeightJumper
+    import CMiller_skinSaver
+    return CMiller_WeightJumper, CMiller_skinSaver
+
+
+def _skinData(scene, worldSpace=False):
+    """ Builds a skinSaver data dict straight from the scene arrays.
+
+    """
+    data = {
+        'weights': dict((inf, scene.weights[:, i].tolist()) for i, inf in enumerate(scene.influences)),
+        'worldSpace': {},
+        'worldSpaceJoints': str(scene.influences),
+        'blendWeights': scene.blendWeights.tolist(),
+        'name': scene.skin,
+        'skinningMethod': 0,
+        'normalizeWeights': 1,
+    }
+    if worldSpace:
+        truncated = np.trunc(scene.points * 1000) / 1000
+        for pos, wgt in zip(truncated.tolist(), scene.weights.tolist()):
+            data['worldSpace'][str(pos)] = str(wgt)
+    return data
+
+
+def opWeightJumper(scene, tmpDir):
+    jumper, saver = _modules()
+    return lambda: jumper.weightJumper(scene.skin, scene.influences[0], scene.influences[1], percent=50)
+
+
+def opWeightJumperSelVerts(scene, tmpDir):
+    jumper, saver = _modules()
+    scene.selectVerts(np.arange(0, scene.numVerts, 2))
+    return lambda: jumper.weightJumper(scene.skin, scene.influences[0], scene.influences[1], selVerts=True,
+                                       percent=50)
+
+
+def opWeightJumperSoftSelection(scene, tmpDir):
+    jumper, saver = _modules()
+    indices = np.arange(0, scene.numVerts, 2)
+    scene.selectVerts(indices, np.linspace(1.0, 0.0, len(indices)))
+    return lambda: jumper.weightJumper(scene.skin, scene.influences[0], scene.influences[1], selVerts=True,
+                                       percent=50)
+
+
+def opWeightMirror(scene, tmpDir):
+    jumper, saver = _modules()
+    return lambda: jumper.weightMirror(scene.skin, '-X', 0.0, 'L_:R_')
+
+
+def opExportSkinData(scene, tmpDir):
+    jumper, saver = _modules()
+    savePath = os.path.join(tmpDir, 'export' + saver.SkinCluster.skinFileExt)
+    return lambda: saver.SkinCluster.export(savePath=savePath, mesh=scene.mesh)
+
+
+def opSkinImport(scene, tmpDir):
+    jumper, saver = _modules()
+    readPath = os.path.join(tmpDir, 'import' + saver.SkinCluster.skinFileExt)
+    with open(readPath, 'w') as file:
+        json.dump(_skinData(scene), file)
+    return lambda: saver.SkinCluster.skinImport(readPath=readPath, mesh=scene.mesh, world=0)
+
+
+def opSetWorldWeights(scene, tmpDir):
+    jumper, saver = _modules()
+    data = _skinData(scene, worldSpace=True)
+    return lambda: saver.SkinCluster(scene.mesh).setWorldWeights(data, threshold=0.0)
+
+
+def opMirrorSkinWeights(scene, tmpDir):
+    jumper, saver = _modules()
+    return lambda: saver.SkinCluster(scene.mesh).mirrorSkinWeights()
+
+
+# name: (setup, maxVerts). Setup runs untimed and returns the callable to time.
+# maxVerts keeps the quadratic paths from running for hours; --no-caps lifts it.
+OPERATIONS = [
+    ('weightJumper', (opWeightJumper, None)),
+    ('weightJumper_selVerts', (opWeightJumperSelVerts, None)),
+    ('weightJumper_softSelection', (opWeightJumperSoftSelection, None)),
+    ('weightMirror', (opWeightMirror, 10000)),
+    ('exportSkinData', (opExportSkinData, 500000)),
+    ('skinImport', (opSkinImport, 500000)),
+    ('setWorldWeights', (opSetWorldWeights, 2000)),
+    ('mirrorSkinWeights', (opMirrorSkinWeights, 2000)),
+]
+
+'''
+################################################
+                                ~Runner~
+################################################
+'''
+
+
+def _procStatus():
+    """ Current and peak resident memory of this process in KB (Linux only).
+
+    """
+    status = {}
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith(('VmRSS', 'VmHWM')):
+                key, value = line.split(':')
+                status[key] = int(value.split()[0])
+    return status.get('VmRSS', 0), status.get('VmHWM', 0)
+
+
+def _runChild(scene, setup, writeFd):
+    """ Child side of runOperation. Never returns.
+
+    """
+    result = {}
+    tmpDir = tempfile.mkdtemp(prefix='cmmBench')
+    try:
+        devNull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devNull, 1)
+        sys.stdout = open(os.devnull, 'w')
+
+        func = setup(scene, tmpDir)
+        fakeMaya.resetCalls()
+        rssBefore = _procStatus()[0]
+        start = timeit.default_timer()
+        func()
+        result['seconds'] = timeit.default_timer() - start
+        peak = _procStatus()[1]
+        result['peakMemoryKb'] = peak
+        result['memoryDeltaKb'] = max(0, peak - rssBefore)
+        result['calls'] = dict(fakeMaya.CALLS)
+        result['totalCalls'] = sum(fakeMaya.CALLS.values())
+        result['status'] = 'ok'
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc().strip().splitlines()[-1]
+    finally:
+        shutil.rmtree(tmpDir, ignore_errors=True)
+        os.write(writeFd, json.dumps(result).encode('utf-8'))
+        os.close(writeFd)
+        os._exit(0)
+
+
+def runOperation(scene, setup):
+    """ Runs one operation in a forked child so its memory peak and scene edits are isolated.
+
+    :param scene: FakeScene, already installed.
+    :param setup: Operation setup function.
+    :return: Result dict.
+    """
+    readFd, writeFd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(readFd)
+        _runChild(scene, setup, writeFd)
+
+    os.close(writeFd)
+    chunks = []
+    while True:
+        chunk = os.read(readFd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(readFd)
+    pid, status = os.waitpid(pid, 0)
+    if not chunks:
+        return {'status': 'error', 'error': 'worker died with status %d' % status}
+    return json.loads(b''.join(chunks).decode('utf-8'))
+
+
+def _gitCommit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=rootDir,
+                                       stderr=open(os.devnull, 'w')).decode('utf-8').strip()
+    except Exception:
+        return None
+
+
+def runSuite(tiers, operations, caps=True, seed=0, log=print):
+    """ Runs every operation on every tier.
+
+    :param tiers: List of tier names.
+    :param operations: List of operation names.
+    :param caps: Skip operations above their maxVerts.
+    :param seed: Mesh generation seed.
+    :param log: Progress callback.
+    :return: Report dict.
+    """
+    tierSizes = dict(TIERS)
+    ops = dict(OPERATIONS)
+    report = {
+        'meta': {
+            'commit': _gitCommit(),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'seed': seed,
+        },
+        'results': [],
+    }
+    for tier in tiers:
+        numVerts, numInfs = tierSizes[tier]
+        log('tier %s: %d verts, %d influences' % (tier, numVerts, numInfs))
+        scene = fakeMaya.buildScene(numVerts, numInfs, seed=seed)
+        fakeMaya.install(scene)
+        for name in operations:
+            setup, maxVerts = ops[name]
+            entry = {'tier': tier, 'verts': numVerts, 'influences': numInfs, 'operation': name}
+            if caps and maxVerts and numVerts > maxVerts:
+                entry['status'] = 'skipped'
+                entry['error'] = 'above maxVerts %d' % maxVerts
+            else:
+                entry.update(runOperation(scene, setup))
+            report['results'].append(entry)
+            log('  %-24s %s' % (name, _describe(entry)))
+    return report
+
+
+def _describe(entry):
+    if entry['status'] != 'ok':
+        return '%s (%s)' % (entry['status'], entry.get('error', ''))
+    return '%9.3fs %9d KB %10d calls' % (entry['seconds'], entry['peakMemoryKb'], entry['totalCalls'])
+
+
+def compareReports(base, new, log=print):
+    """ Prints the time and call count ratio of new against base for matching results.
+
+    :param base: Report dict from an earlier run.
+    :param new: Report dict from this run.
+    :param log: Output callback.
+    :return: None
+    """
+    baseResults = dict(((r['tier'], r['operation']), r) for r in base['results'] if r['status'] == 'ok')
+    log('compared against %s (%s)' % (base['meta'].get('commit'), base['meta'].get('created')))
+    for entry in new['results']:
+        old = baseResults.get((entry['tier'], entry['operation']))
+        if entry['status'] != 'ok' or not old:
+            continue
+        timeRatio = entry['seconds'] / old['seconds'] if old['seconds'] else 0.0
+        callRatio = entry['totalCalls'] / old['totalCalls'] if old['totalCalls'] else 0.0
+        log('  %-5s %-24s time x%.2f  calls x%.2f' % (entry['tier'], entry['operation'], timeRatio, callRatio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks the skin weight tools against a fake Maya.')
+    parser.add_argument('--tiers', default=DEFAULT_TIERS,
+                        help='Comma separated tiers: %s' % ', '.join('%s=%dx%d' % ((n,) + s) for n, s in TIERS))
+    parser.add_argument('--ops', default=','.join(name for name, op in OPERATIONS),
+                        help='Comma separated operations.')
+    parser.add_argument('--out', default='bench_results.json', help='JSON file to write.')
+    parser.add_argument('--compare', help='Earlier JSON report to compare against.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-caps', action='store_true', help='Run quadratic paths at every size.')
+    args = parser.parse_args(argv)
+
+    tiers = [t for t in args.tiers.split(',') if t]
+    operations = [o for o in args.ops.split(',') if o]
+    unknown = [t for t in tiers if t not in dict(TIERS)] + [o for o in operations if o not in dict(OPERATIONS)]
+    if unknown:
+        parser.error('unknown tier/operation: %s' % ', '.join(unknown))
+
+    report = runSuite(tiers, operations, caps=not args.no_caps, seed=args.seed)
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+    print('wrote %s' % args.out)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compareReports(json.load(file), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,677 @@
+"""
+~ Fake Maya Layer ~ 2026/10/19
+
+A NumPy backed stand-in for the parts of OpenMaya, OpenMayaAnim, cmds and mel
+that the skinning tools touch, plus just enough PySide/shiboken to let the tool
+modules import. It lets the heavy weight paths run on plain Linux without Maya.
+
+Every fake API call is counted in CALLS so the benchmarks can report how many
+round-trips an operation makes, not only how long it takes.
+
+v.2 Rich/soft selection support
+v.1 Initial Release with skinCluster, mesh and selection support.
+
+"""
+
+from __future__ import division
+
+import collections
+import re
+import sys
+import types
+
+import numpy as np
+
+CALLS = collections.Counter()
+SCENE = None
+
+
+def resetCalls():
+    """ Clears the call counters.
+
+    :return: None
+    """
+    CALLS.clear()
+
+
+def _counted(prefix, qualify=True):
+    """ Class decorator that counts every public method call as "prefix.Class.method",
+    or "prefix.method" when qualify is off.
+
+    """
+    def wrap(cls):
+        seen = set()
+        for klass in cls.__mro__[:-1]:
+            for name, func in list(vars(klass).items()):
+                if name in seen or (name.startswith('_') and name not in ('__getitem__', '__setitem__')):
+                    continue
+                seen.add(name)
+                key = '%s.%s.%s' % (prefix, cls.__name__, name) if qualify else '%s.%s' % (prefix, name)
+                if isinstance(func, staticmethod):
+                    setattr(cls, name, staticmethod(_counter(key, func.__func__)))
+                elif callable(func) and not isinstance(func, type):
+                    setattr(cls, name, _counter(key, getattr(func, 'uncounted', func)))
+        return cls
+    return wrap
+
+
+def _counter(key, func):
+    def counted(*args, **kwargs):
+        CALLS[key] += 1
+        return func(*args, **kwargs)
+    counted.__name__ = func.__name__
+    counted.__doc__ = func.__doc__
+    counted.uncounted = func
+    return counted
+
+
+'''
+################################################
+                                ~Scene~
+################################################
+'''
+
+
+class FakeScene(object):
+    """ A single skinned mesh held as NumPy arrays.
+
+    """
+    def __init__(self, points, weights, influences, mesh='benchMesh', skin='benchMesh_skinCluster'):
+        self.points = points
+        self.weights = weights
+        self.blendWeights = np.zeros(len(points))
+        self.influences = list(influences)
+        self.mesh = mesh
+        self.shape = mesh + 'Shape'
+        self.skin = skin
+        self.attrs = {'%s.normalizeWeights' % skin: 1, '%s.envelope' % skin: 1.0,
+                      '%s.skinningMethod' % skin: 0}
+        self.selection = [mesh]
+        self.selectedVerts = None
+        self.softWeights = None
+
+    @property
+    def numVerts(self):
+        return len(self.points)
+
+    def selectVerts(self, indices, softWeights=None):
+        """ Makes a vertex selection active, optionally with soft selection falloff.
+
+        :param indices: Vertex indices to select.
+        :param softWeights: Optional per-vertex falloff matching indices.
+        :return: None
+        """
+        self.selectedVerts = np.asarray(indices, dtype=np.int64)
+        self.softWeights = None if softWeights is None else np.asarray(softWeights, dtype=np.float64)
+        self.selection = ['%s.vtx[%d]' % (self.mesh, i) for i in self.selectedVerts[:1]]
+
+
+def buildScene(numVerts, numInfs, seed=0, maxInfluences=4):
+    """ Generates a mirror-symmetric mesh with a normalized sparse skin.
+
+    :param numVerts: Number of vertices.
+    :param numInfs: Number of influences, split into L_/R_ pairs plus a center joint if odd.
+    :param seed: Random seed so tiers are reproducible between commits.
+    :param maxInfluences: Influences per vertex with a non-zero weight.
+    :return: FakeScene
+    """
+    rng = np.random.RandomState(seed)
+    half = numVerts // 2
+    side = np.round(rng.uniform(0.01, 10.0, (half, 3)), 3)
+    other = side * np.array([-1.0, 1.0, 1.0])
+    center = np.round(rng.uniform(0.01, 10.0, (numVerts - 2 * half, 3)), 3)
+    center[:, 0] = 0.0
+    points = np.vstack([side, other, center])
+
+    influences = []
+    for i in range(numInfs // 2):
+        influences += ['L_jnt_%03d' % i, 'R_jnt_%03d' % i]
+    if numInfs % 2:
+        influences.append('C_jnt_000')
+
+    perVert = min(maxInfluences, numInfs)
+    rows = np.repeat(np.arange(numVerts), perVert)
+    cols = rng.randint(0, numInfs, numVerts * perVert)
+    weights = np.zeros((numVerts, numInfs))
+    weights[rows, cols] = rng.random_sample(numVerts * perVert)
+    weights /= weights.sum(axis=1)[:, None]
+
+    return FakeScene(points, weights, influences)
+
+
+'''
+################################################
+                                ~OpenMaya~
+################################################
+'''
+
+
+class _Component(object):
+    """ Vertex component; indices of None means the whole mesh.
+
+    """
+    def __init__(self, indices=None, weights=None):
+        self.indices = indices
+        self.weights = weights
+
+    def rows(self):
+        if self.indices is None:
+            return slice(None)
+        return self.indices
+
+    def count(self):
+        if self.indices is None:
+            return SCENE.numVerts
+        return len(self.indices)
+
+
+class _Ref(object):
+    """ Base for in-place filled API objects.
+
+    """
+    def __init__(self):
+        self.ref = None
+
+
+@_counted('OpenMaya')
+class MObject(_Ref):
+    def isNull(self):
+        return self.ref is None
+
+
+@_counted('OpenMaya')
+class MDagPath(_Ref):
+    def partialPathName(self):
+        return self.ref
+
+    def fullPathName(self):
+        return '|' + self.ref
+
+
+@_counted('OpenMaya')
+class MDagPathArray(object):
+    def __init__(self):
+        self._items = []
+
+    def length(self):
+        return len(self._items)
+
+    def append(self, path):
+        self._items.append(path)
+
+    def __getitem__(self, i):
+        return self._items[i]
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _NumArray(object):
+    _dtype = np.float64
+    _cast = float
+
+    def __init__(self, *args):
+        if not args:
+            self._a = np.zeros(0, self._dtype)
+        elif isinstance(args[0], list):
+            self._a = np.array(args[0][:args[1]], self._dtype)
+        elif len(args) == 1:
+            self._a = np.zeros(args[0], self._dtype)
+        else:
+            self._a = np.full(args[0], args[1], self._dtype)
+
+    @classmethod
+    def _wrap(cls, values):
+        arr = cls()
+        arr._a = np.ascontiguousarray(values, dtype=cls._dtype).ravel()
+        return arr
+
+    def length(self):
+        return len(self._a)
+
+    def set(self, value, index):
+        self._a[index] = value
+
+    def append(self, value):
+        self._a = np.append(self._a, value)
+
+    def setLength(self, n):
+        self._a = np.resize(self._a, n)
+
+    def __len__(self):
+        return len(self._a)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._a[i].tolist()
+        return self._cast(self._a[i])
+
+    def __iter__(self):
+        CALLS['OpenMaya.%s.__getitem__' % type(self).__name__] += len(self._a)
+        return iter(self._a.tolist())
+
+    def __str__(self):
+        return str(self._a.tolist())
+
+
+@_counted('OpenMaya')
+class MDoubleArray(_NumArray):
+    pass
+
+
+@_counted('OpenMaya')
+class MIntArray(_NumArray):
+    _dtype = np.int64
+    _cast = int
+
+
+class MPoint(object):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = x, y, z
+
+    def __getitem__(self, i):
+        return (self.x, self.y, self.z)[i]
+
+
+@_counted('OpenMaya')
+class MPointArray(object):
+    def __init__(self):
+        self._a = np.zeros((0, 3))
+
+    def length(self):
+        return len(self._a)
+
+    def __getitem__(self, i):
+        return MPoint(*self._a[i].tolist())
+
+
+class MSpace(object):
+    kObject = 2
+    kWorld = 4
+
+
+class MFn(object):
+    kMeshVertComponent = 551
+
+
+@_counted('OpenMaya')
+class MScriptUtil(object):
+    def __init__(self):
+        self._ptr = [0]
+
+    def createFromInt(self, value):
+        self._ptr[0] = value
+
+    def createFromList(self, values, length):
+        self._ptr = list(values[:length])
+
+    def asUintPtr(self):
+        return self._ptr
+
+    def asDoublePtr(self):
+        return self._ptr
+
+    @staticmethod
+    def getUint(ptr):
+        return ptr[0]
+
+
+_VTX = re.compile(r'^(.+?)\.vtx\[(\d+)(?::(\d+))?\]$')
+
+
+@_counted('OpenMaya')
+class MSelectionList(object):
+    def __init__(self):
+        self._items = []
+
+    def add(self, name, *args):
+        match = _VTX.match(name)
+        if match:
+            first = int(match.group(2))
+            last = int(match.group(3) or first)
+            self._items.append((SCENE.mesh, _Component(np.arange(first, last + 1))))
+        else:
+            self._items.append((name, None))
+
+    def length(self):
+        return len(self._items)
+
+    def getDependNode(self, i, obj):
+        obj.ref = self._items[i][0]
+
+    def getDagPath(self, i, path, component=None):
+        node, comp = self._items[i]
+        path.ref = SCENE.shape if node in (SCENE.mesh, SCENE.shape) else node
+        if component is not None:
+            component.ref = comp
+
+    def getSelectionStrings(self, strings):
+        for node, comp in self._items:
+            strings.append(node)
+
+
+@_counted('OpenMaya')
+class MGlobal(object):
+    @staticmethod
+    def getActiveSelectionList(selList):
+        if SCENE.selectedVerts is not None:
+            selList._items.append((SCENE.mesh, _Component(SCENE.selectedVerts)))
+        else:
+            for name in SCENE.selection:
+                selList.add(name)
+
+    @staticmethod
+    def getRichSelection(richSel):
+        if SCENE.selectedVerts is None:
+            raise RuntimeError('(kFailure): No rich selection')
+        richSel._component = _Component(SCENE.selectedVerts, SCENE.softWeights)
+
+
+@_counted('OpenMaya')
+class MRichSelection(object):
+    def __init__(self):
+        self._component = None
+
+    def getSelection(self, selList):
+        selList._items.append((SCENE.mesh, self._component))
+
+
+class MWeight(object):
+    def __init__(self, influence=1.0):
+        self._influence = influence
+
+    def influence(self):
+        return self._influence
+
+
+@_counted('OpenMaya')
+class MFnSingleIndexedComponent(object):
+    def __init__(self, obj=None):
+        self._comp = obj.ref if obj is not None else None
+
+    def elementCount(self):
+        return self._comp.count()
+
+    def element(self, i):
+        return int(self._comp.indices[i])
+
+    def hasWeights(self):
+        return self._comp.weights is not None
+
+    def weight(self, i):
+        return MWeight(float(self._comp.weights[i]))
+
+
+@_counted('OpenMaya')
+class MItSelectionList(object):
+    def __init__(self, selList, filterType=None):
+        self._list = selList
+        self._i = 0
+
+    def isDone(self):
+        return self._i >= self._list.length()
+
+    def next(self):
+        self._i += 1
+
+    def getDagPath(self, path, component=None):
+        self._list.getDagPath(self._i, path, component)
+
+
+@_counted('OpenMaya')
+class MFnSet(object):
+    def __init__(self, obj):
+        self._obj = obj
+
+    def getMembers(self, selList, flatten):
+        selList._items.append((SCENE.mesh, _Component(None)))
+
+
+@_counted('OpenMaya')
+class MFnMesh(object):
+    def __init__(self, path):
+        self._path = path
+
+    def getPoints(self, pointArray, space=MSpace.kObject):
+        pointArray._a = SCENE.points.copy()
+
+    def numVertices(self):
+        return SCENE.numVerts
+
+
+@_counted('OpenMaya')
+class MItGeometry(object):
+    def __init__(self, path, component=None):
+        self._rows = np.arange(SCENE.numVerts)
+        if component is not None and component.ref is not None and component.ref.indices is not None:
+            self._rows = component.ref.indices
+        self._i = 0
+
+    def isDone(self):
+        return self._i >= len(self._rows)
+
+    def next(self):
+        self._i += 1
+
+    def index(self):
+        return int(self._rows[self._i])
+
+    def currentItem(self):
+        obj = MObject()
+        obj.ref = _Component(self._rows[self._i:self._i + 1])
+        return obj
+
+    def position(self, space=MSpace.kObject):
+        return MPoint(*SCENE.points[self._rows[self._i]].tolist())
+
+    def count(self):
+        return len(self._rows)
+
+
+@_counted('OpenMaya')
+class MItMeshVertex(MItGeometry):
+    pass
+
+
+'''
+################################################
+                                ~OpenMayaAnim~
+################################################
+'''
+
+
+def _components(component):
+    comp = component.ref if isinstance(component, MObject) else component
+    return comp if comp is not None else _Component(None)
+
+
+@_counted('OpenMayaAnim')
+class MFnSkinCluster(object):
+    def __init__(self, obj):
+        self._name = obj.ref
+
+    def name(self):
+        return self._name
+
+    def deformerSet(self):
+        obj = MObject()
+        obj.ref = self._name + 'Set'
+        return obj
+
+    def influenceObjects(self, pathArray):
+        for inf in SCENE.influences:
+            path = MDagPath()
+            path.ref = inf
+            pathArray.append(path)
+        return len(SCENE.influences)
+
+    def indexForOutputConnection(self, index):
+        return index
+
+    def getPathAtIndex(self, index, path):
+        path.ref = SCENE.shape
+
+    def getWeights(self, path, component, third, fourth):
+        rows = _components(component).rows()
+        if isinstance(third, MIntArray):
+            block = SCENE.weights[rows][:, third._a]
+            fourth._a = np.ascontiguousarray(block).ravel()
+        elif isinstance(third, (int, np.integer)):
+            fourth._a = SCENE.weights[rows, third].copy()
+        else:
+            third._a = np.ascontiguousarray(SCENE.weights[rows]).ravel()
+            fourth[0] = len(SCENE.influences)
+
+    def setWeights(self, path, component, infIndices, values, normalize=True, oldValues=None):
+        rows = _components(component).rows()
+        cols = infIndices._a
+        current = SCENE.weights[rows]
+        if oldValues is not None:
+            oldValues._a = np.ascontiguousarray(current[:, cols]).ravel()
+        current[:, cols] = values._a.reshape(len(current), len(cols))
+        SCENE.weights[rows] = current
+
+    def getBlendWeights(self, path, component, values):
+        values._a = SCENE.blendWeights[_components(component).rows()].copy()
+
+    def setBlendWeights(self, path, component, values):
+        SCENE.blendWeights[_components(component).rows()] = values._a
+
+
+'''
+################################################
+                                ~cmds / mel~
+################################################
+'''
+
+
+def _flat(items):
+    if isinstance(items, (list, tuple)):
+        out = []
+        for item in items:
+            out += _flat(item)
+        return out
+    return [items]
+
+
+@_counted('cmds', qualify=False)
+class _Cmds(object):
+    def getAttr(self, attr, **kwargs):
+        return SCENE.attrs.get(attr, 0)
+
+    def setAttr(self, attr, *values, **kwargs):
+        if values:
+            SCENE.attrs[attr] = values[0]
+
+    def ls(self, *args, **kwargs):
+        return list(SCENE.selection)
+
+    def select(self, *args, **kwargs):
+        pass
+
+    def nodeType(self, node):
+        if node == SCENE.mesh:
+            return 'transform'
+        if node == SCENE.shape:
+            return 'mesh'
+        if node == SCENE.skin:
+            return 'skinCluster'
+        return 'joint'
+
+    def listRelatives(self, node, **kwargs):
+        if _flat(node)[0] == SCENE.mesh:
+            return [SCENE.shape]
+        return None
+
+    def listHistory(self, node, **kwargs):
+        return [SCENE.shape, SCENE.skin]
+
+    def listConnections(self, nodes, **kwargs):
+        if SCENE.skin in _flat(nodes) or SCENE.shape in _flat(nodes):
+            return [SCENE.skin]
+        return None
+
+    def polyEvaluate(self, mesh, **kwargs):
+        return SCENE.numVerts
+
+    def skinCluster(self, *args, **kwargs):
+        return [SCENE.skin]
+
+    def namespaceInfo(self, **kwargs):
+        return []
+
+    def fileDialog2(self, **kwargs):
+        return None
+
+    def refresh(self, *args, **kwargs):
+        pass
+
+    def dgdirty(self, *args, **kwargs):
+        pass
+
+    def dgeval(self, *args, **kwargs):
+        pass
+
+    def warning(self, *args):
+        pass
+
+    def selectPref(self, **kwargs):
+        pass
+
+
+@_counted('mel', qualify=False)
+class _Mel(object):
+    def eval(self, command):
+        return None
+
+
+'''
+################################################
+                                ~PySide / shiboken~
+################################################
+'''
+
+
+class _QObject(object):
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+def _module(name, **attrs):
+    mod = types.ModuleType(name)
+    for key, value in attrs.items():
+        setattr(mod, key, value)
+    return mod
+
+
+def install(scene):
+    """ Registers the fake modules in sys.modules and points them at a scene.
+
+    :param scene: FakeScene the fake API should read and write.
+    :return: None
+    """
+    global SCENE
+    SCENE = scene
+
+    openMaya = _module('maya.OpenMaya', MObject=MObject, MDagPath=MDagPath, MDagPathArray=MDagPathArray,
+                       MDoubleArray=MDoubleArray, MIntArray=MIntArray, MPoint=MPoint, MPointArray=MPointArray,
+                       MSpace=MSpace, MFn=MFn, MScriptUtil=MScriptUtil, MSelectionList=MSelectionList,
+                       MGlobal=MGlobal, MRichSelection=MRichSelection, MWeight=MWeight,
+                       MFnSingleIndexedComponent=MFnSingleIndexedComponent, MItSelectionList=MItSelectionList, MFnSet=MFnSet, MFnMesh=MFnMesh,
+                       MItGeometry=MItGeometry, MItMeshVertex=MItMeshVertex)
+    openMayaAnim = _module('maya.OpenMayaAnim', MFnSkinCluster=MFnSkinCluster)
+    openMayaUI = _module('maya.OpenMayaUI', MQtUtil=_module('MQtUtil', mainWindow=lambda: None))
+    maya = _module('maya', OpenMaya=openMaya, OpenMayaAnim=openMayaAnim, OpenMayaUI=openMayaUI,
+                   cmds=_Cmds(), mel=_Mel())
+
+    qtCore = _module('PySide.QtCore', QObject=_QObject, QEvent=_QObject, Qt=_QObject)
+    qtGui = _module('PySide.QtGui', QDialog=_QObject, QMainWindow=_QObject)
+    qtUiTools = _module('PySide.QtUiTools', QUiLoader=_QObject)
+    pyside = _module('PySide', QtCore=qtCore, QtGui=qtGui, QtUiTools=qtUiTools)
+
+    sys.modules.update({
+        'maya': maya, 'maya.OpenMaya': openMaya, 'maya.OpenMayaAnim': openMayaAnim,
+        'maya.OpenMayaUI': openMayaUI, 'maya.cmds': maya.cmds, 'maya.mel': maya.mel,
+        'PySide': pyside, 'PySide.QtCore': qtCore, 'PySide.QtGui': qtGui, 'PySide.QtUiTools': qtUiTools,
+        'shiboken': _module('shiboken', wrapInstance=lambda ptr, cls: None),
+    })
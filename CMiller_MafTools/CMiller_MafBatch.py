@@ -0,0 +1,468 @@
+"""
+~ MAF Batch Export ~ 2026/10/19
+
+Exports .animMAF files for many scenes at once through a pool of headless mayapy workers.
+
+A job is a dict {'scene': path, 'topNodes': [nodes], 'variant': ''}. Every job runs in its own
+mayapy process, opens its scene, exports each top node with exportAnim and reports back.
+Nothing opens a dialog: existing files follow the overwrite policy instead. When all jobs are
+done a JSON manifest records the written files, skipped nodes, errors and per-job timing.
+
+A sharded bake splits one long shot instead: every worker opens the same scene, bakes one
+frame range of a top node (world transforms into a .mafCache, or keys into an .animMAF) and
+the shards are merged into a single file. Shards are evaluated independently, so this only
+holds for rigs without simulation. Keyed shards are baked SHARD_PAD frames past both ends so
+the tangents on the seams see their real neighbours.
+
+Usage:
+    mayapy CMiller_MafBatch.py jobs.json --workers 4 --overwrite skip --manifest manifest.json
+    mayapy CMiller_MafBatch.py --bake shot.ma prop_GRP --range 1001 2400 --workers 8 --mode cache
+
+The controlling process does not need Maya, any Python that can find mayapy will do.
+
+v.3 Batch temp files are removed unless a job failed
+v.2 Sharded bakes
+v.1 Initial Release
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+myDir = os.path.dirname(os.path.abspath(__file__))
+myFile = os.path.abspath(__file__)
+if myFile.endswith('.pyc'):
+    myFile = myFile[:-1]
+
+OVERWRITE_POLICIES = ['overwrite', 'skip']
+BAKE_MODES = ['cache', 'maf']
+# Extra frames baked on both sides of a keyed shard
+SHARD_PAD = 2
+
+'''
+################################################
+                                ~Jobs~
+################################################
+'''
+
+
+def makeJob(scene, topNodes, variant=""):
+    """ Builds a batch job.
+
+    :param scene: Maya scene file to open.
+    :param topNodes: Top node or list of top nodes to export.
+    :param variant: Optional argument for a modified name.
+    :return: Job dict.
+    """
+    if isinstance(topNodes, basestring if sys.version_info[0] == 2 else str):
+        topNodes = [topNodes]
+    return {'scene': os.path.abspath(scene), 'topNodes': list(topNodes), 'variant': variant or ""}
+
+
+def loadJobs(path):
+    """ Reads jobs from a JSON file holding a list of job dicts or [scene, topNodes, variant] lists.
+
+    :param path: JSON file.
+    :return: List of job dicts.
+    """
+    with open(path) as file:
+        entries = json.load(file)
+    jobs = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            jobs.append(makeJob(entry['scene'], entry['topNodes'], entry.get('variant', "")))
+        else:
+            jobs.append(makeJob(*entry))
+    return jobs
+
+
+def findMayapy():
+    """ Finds the mayapy executable, preferring $MAYA_LOCATION, then the running interpreter and PATH.
+
+    :return: Path to mayapy || None.
+    """
+    exe = 'mayapy.exe' if os.name == 'nt' else 'mayapy'
+    if os.getenv('MAYA_LOCATION'):
+        path = os.path.join(os.getenv('MAYA_LOCATION'), 'bin', exe)
+        if os.path.isfile(path):
+            return path
+    if os.path.basename(sys.executable).lower().startswith('mayapy'):
+        return sys.executable
+    for pathDir in os.getenv('PATH', '').split(os.pathsep):
+        path = os.path.join(pathDir, exe)
+        if os.path.isfile(path):
+            return path
+    return None
+
+'''
+################################################
+                                ~Pool~
+################################################
+'''
+
+
+def _startWorker(mayapy, job, overwrite, reduceTolerance, tmpDir, index, flag='--worker'):
+    jobPath = os.path.join(tmpDir, 'job%04d.json' % index)
+    resultPath = os.path.join(tmpDir, 'result%04d.json' % index)
+    logPath = os.path.join(tmpDir, 'job%04d.log' % index)
+    with open(jobPath, 'w') as file:
+        json.dump(job, file)
+    logFile = open(logPath, 'w')
+    args = [mayapy, myFile, flag, jobPath, resultPath, '--overwrite', overwrite]
+    if reduceTolerance is not None:
+        args += ['--reduce', str(reduceTolerance)]
+    proc = subprocess.Popen(args, stdout=logFile, stderr=subprocess.STDOUT)
+    return {'proc': proc, 'job': job, 'index': index, 'result': resultPath, 'log': logPath,
+            'logFile': logFile, 'start': time.time()}
+
+
+def _finishWorker(worker):
+    worker['logFile'].close()
+    result = None
+    if os.path.isfile(worker['result']):
+        with open(worker['result']) as file:
+            result = json.load(file)
+    if result is None:
+        result = dict(worker['job'], written=[], skipped=[], status='error',
+                      error='worker exited with code %s' % worker['proc'].returncode)
+        with open(worker['log']) as file:
+            result['log'] = file.read()[-4000:]
+    result['index'] = worker['index']
+    result.setdefault('seconds', {})['wall'] = time.time() - worker['start']
+    return result
+
+
+def _runPool(mayapy, jobs, workers, overwrite, reduceTolerance, tmpDir, log, flag='--worker'):
+    """ Keeps up to workers mayapy processes busy until every job has a result.
+
+    :return: List of result dicts in job order.
+    """
+    pending = list(enumerate(jobs))
+    running = []
+    results = []
+    while pending or running:
+        while pending and len(running) < max(1, workers):
+            index, job = pending.pop(0)
+            running.append(_startWorker(mayapy, job, overwrite, reduceTolerance, tmpDir, index, flag))
+            log("started %s" % job.get('name', job['scene']))
+        for worker in list(running):
+            if worker['proc'].poll() is None:
+                continue
+            running.remove(worker)
+            result = _finishWorker(worker)
+            results.append(result)
+            log("%s %s (%.1fs, %d written)" % (result['status'], result.get('name', result['scene']),
+                                               result['seconds']['wall'], len(result['written'])))
+        time.sleep(0.2)
+    results.sort(key=lambda r: r['index'])
+    return results
+
+
+def _findMayapy(mayapy):
+    mayapy = mayapy or findMayapy()
+    if not mayapy:
+        raise RuntimeError("Could not find mayapy, set MAYA_LOCATION or pass mayapy=")
+    return mayapy
+
+
+def runBatch(jobs, workers=2, overwrite='skip', manifestPath=None, mayapy=None, log=None, reduceTolerance=None):
+    """ Runs export jobs in a pool of headless mayapy processes and writes a manifest.
+
+    The workers' temp dir is removed afterwards, unless a job failed: then it's kept for its
+    logs and recorded in the manifest as tmpDir.
+
+    :param jobs: List of job dicts, see makeJob.
+    :param workers: Number of mayapy processes running at once.
+    :param overwrite: 'overwrite' or 'skip' for .animMAF files that already exist.
+    :param manifestPath: Optional JSON file to write the manifest to.
+    :param mayapy: mayapy executable, found with findMayapy if not given.
+    :param log: Progress callback, prints by default.
+    :param reduceTolerance: Optional key reduction tolerance for baked curves.
+    :return: Manifest dict.
+    """
+    if overwrite not in OVERWRITE_POLICIES:
+        raise ValueError("overwrite must be one of %s" % ', '.join(OVERWRITE_POLICIES))
+    mayapy = _findMayapy(mayapy)
+    if log is None:
+        def log(msg):
+            print(msg)
+
+    start = time.time()
+    tmpDir = tempfile.mkdtemp(prefix='mafBatch')
+    results = _runPool(mayapy, jobs, workers, overwrite, reduceTolerance, tmpDir, log)
+    manifest = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'user': os.getenv('USERNAME'),
+        'mayapy': mayapy,
+        'workers': workers,
+        'overwrite': overwrite,
+        'reduceTolerance': reduceTolerance,
+        'seconds': time.time() - start,
+        'written': sum(len(r['written']) for r in results),
+        'failed': len([r for r in results if r['status'] != 'ok']),
+        'jobs': results,
+    }
+    if manifest['failed']:
+        manifest['tmpDir'] = tmpDir
+    else:
+        shutil.rmtree(tmpDir, ignore_errors=True)
+    if manifestPath:
+        with open(manifestPath, 'w') as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+    return manifest
+
+'''
+################################################
+                                ~Sharded Bakes~
+################################################
+'''
+
+
+def shardRange(startFrame, endFrame, shards):
+    """ Splits a frame range into consecutive whole frame ranges of about the same length.
+
+    :param startFrame: First frame.
+    :param endFrame: Last frame.
+    :param shards: Number of ranges, fewer if the range has fewer frames.
+    :return: List of (first frame, last frame).
+    """
+    startFrame, endFrame = int(startFrame), int(endFrame)
+    numFrames = endFrame - startFrame + 1
+    shards = max(1, min(shards, numFrames))
+    bounds = [startFrame + numFrames * ii // shards for ii in range(shards + 1)]
+    return [(bounds[ii], bounds[ii + 1] - 1) for ii in range(shards)]
+
+
+def defaultBakePath(scene, topNode, variant="", mode='cache'):
+    """ Where ExImFuncs.getSavePath would put the file for a top node of a scene.
+
+    :return: Path.
+    """
+    from CMiller_MafCache import CACHE_EXT
+    from CMiller_MafFormat import MAF_EXT
+
+    name = "%s_%s_%s%s" % (topNode, str(variant), os.getenv('USERNAME'), CACHE_EXT if mode == 'cache' else MAF_EXT)
+    return os.path.join(os.path.dirname(os.path.abspath(scene)), 'animMaf', name)
+
+
+def runShardedBake(scene, topNode, startFrame, endFrame, savePath=None, mode='cache', workers=2, shards=None,
+                   variant="", mayapy=None, log=None, reduceTolerance=None, pad=SHARD_PAD):
+    """ Bakes a top node over a frame range in parallel mayapy processes and merges the shards.
+
+    :param scene: Saved Maya scene, every worker opens it.
+    :param topNode: Top node to bake.
+    :param startFrame: First frame.
+    :param endFrame: Last frame.
+    :param savePath: Merged file, defaults to defaultBakePath.
+    :param mode: 'cache' for a .mafCache of world transforms, 'maf' for baked keys in an .animMAF file.
+    :param workers: Number of mayapy processes running at once.
+    :param shards: Number of frame ranges, defaults to workers.
+    :param variant: Optional argument for a modified name.
+    :param mayapy: mayapy executable, found with findMayapy if not given.
+    :param log: Progress callback, prints by default.
+    :param reduceTolerance: Optional key reduction tolerance for the baked curves of 'maf' mode.
+    :param pad: Extra frames baked on both sides of a keyed shard.
+    :return: Report dict with the status, merged file and shard results.
+    """
+    if mode not in BAKE_MODES:
+        raise ValueError("mode must be one of %s" % ', '.join(BAKE_MODES))
+    mayapy = _findMayapy(mayapy)
+    if log is None:
+        def log(msg):
+            print(msg)
+    savePath = savePath or defaultBakePath(scene, topNode, variant, mode)
+
+    start = time.time()
+    tmpDir = tempfile.mkdtemp(prefix='mafShards')
+    jobs = []
+    for index, (first, last) in enumerate(shardRange(startFrame, endFrame, shards or workers)):
+        jobs.append({'scene': os.path.abspath(scene), 'topNode': topNode, 'variant': variant or "", 'mode': mode,
+                     'startFrame': first, 'endFrame': last, 'pad': pad,
+                     'outDir': os.path.join(tmpDir, 'shard%04d' % index),
+                     'name': '%s %d-%d' % (topNode, first, last)})
+    results = _runPool(mayapy, jobs, workers, 'overwrite', reduceTolerance, tmpDir, log, '--shard')
+
+    report = {'status': 'ok', 'savePath': savePath, 'mode': mode, 'shards': results,
+              'startFrame': int(startFrame), 'endFrame': int(endFrame)}
+    failed = [r for r in results if r['status'] != 'ok' or len(r['written']) != 1]
+    if failed:
+        report['status'] = 'error'
+        report['error'] = '; '.join('%s: %s' % (r.get('name', r['scene']), r.get('error', 'nothing written'))
+                                    for r in failed)
+        report['tmpDir'] = tmpDir
+    else:
+        if not os.path.isdir(os.path.dirname(savePath)):
+            os.makedirs(os.path.dirname(savePath))
+        paths = [r['written'][0] for r in results]
+        mergeStart = time.time()
+        if mode == 'cache':
+            from CMiller_MafCache import mergeCacheFiles
+            mergeCacheFiles(paths, savePath, shards=len(paths))
+        else:
+            from CMiller_MafFormat import mergeMafFiles
+            mergeMafFiles(paths, savePath, shards=len(paths))
+        report['mergeSeconds'] = time.time() - mergeStart
+        shutil.rmtree(tmpDir, ignore_errors=True)
+    report['seconds'] = time.time() - start
+    log("%s %s, %d shards, %.1fs" % (report['status'], savePath, len(results), report['seconds']))
+    return report
+
+'''
+################################################
+                                ~Worker~
+################################################
+'''
+
+
+def exportJob(job, overwrite='skip', reduceTolerance=None):
+    """ Worker side: opens the job's scene in this mayapy session and exports its top nodes.
+
+    :param job: Job dict.
+    :param overwrite: 'overwrite' or 'skip'.
+    :param reduceTolerance: Optional key reduction tolerance for baked curves.
+    :return: Result dict.
+    """
+    from maya import cmds
+    import CMiller_MafTools
+
+    result = dict(job, written=[], skipped=[], missing=[], status='ok', seconds={})
+    start = time.time()
+    cmds.file(job['scene'], o=1, f=1, prompt=0)
+    result['seconds']['open'] = time.time() - start
+
+    exporter = CMiller_MafTools.ExImFuncs()
+    start = time.time()
+    for topNode in job['topNodes']:
+        if not cmds.objExists(topNode):
+            result['missing'].append(topNode)
+            continue
+        nodeStart = time.time()
+        written = exporter.exportAnim(job['variant'], [topNode], overwrite, reduceTolerance)
+        result['seconds'][topNode] = time.time() - nodeStart
+        if written:
+            result['written'] += written
+        else:
+            result['skipped'].append(topNode)
+    result['seconds']['export'] = time.time() - start
+    if result['missing']:
+        result['status'] = 'error'
+        result['error'] = 'missing top nodes: %s' % ', '.join(result['missing'])
+    return result
+
+
+def bakeShard(job, overwrite='overwrite', reduceTolerance=None):
+    """ Worker side: opens the job's scene and bakes one frame range of its top node into outDir.
+
+    :param job: Shard job dict, see runShardedBake.
+    :param overwrite: Unused, shards always write.
+    :param reduceTolerance: Optional key reduction tolerance for baked curves.
+    :return: Result dict, written holds the shard file.
+    """
+    from maya import cmds
+    import CMiller_MafTools
+    from CMiller_MafCache import CACHE_EXT, writeCacheFile
+
+    result = dict(job, written=[], skipped=[], missing=[], status='ok', seconds={})
+    start = time.time()
+    cmds.file(job['scene'], o=1, f=1, prompt=0)
+    result['seconds']['open'] = time.time() - start
+
+    topNode = job['topNode']
+    if not cmds.objExists(topNode):
+        result.update(status='error', error='missing top node %s' % topNode, missing=[topNode])
+        return result
+    if not os.path.isdir(job['outDir']):
+        os.makedirs(job['outDir'])
+
+    exporter = CMiller_MafTools.ExImFuncs()
+    startFrame, endFrame = job['startFrame'], job['endFrame']
+    start = time.time()
+    if job['mode'] == 'cache':
+        # World matrices are sampled per frame through a DG context, no padding needed
+        cache = exporter.bakeOutWorldData(topNode, startFrame, endFrame)
+        savePath = os.path.join(job['outDir'], 'shard' + CACHE_EXT)
+        writeCacheFile(savePath, cache, topNode=topNode.split(":")[-1], user=os.getenv('USERNAME'),
+                       scene=job['scene'], variant=job['variant'])
+        result['written'].append(savePath)
+    else:
+        exporter.startFrame = startFrame - job['pad']
+        exporter.endFrame = endFrame + job['pad']
+        exporter.bakeObjectsAction(topNode, simulation=False)
+        cmds.playbackOptions(min=startFrame, max=endFrame)
+        result['written'] += exporter.exportAnim(job['variant'], [topNode], CMiller_MafTools.OVERWRITE_ALWAYS,
+                                                 reduceTolerance, saveDir=job['outDir'])
+    result['seconds']['bake'] = time.time() - start
+    return result
+
+
+def _workerMain(jobPath, resultPath, overwrite, reduceTolerance, func=exportJob):
+    with open(jobPath) as file:
+        job = json.load(file)
+    start = time.time()
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+        startup = time.time() - start
+        result = func(job, overwrite, reduceTolerance)
+        result['seconds']['startup'] = startup
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        result = dict(job, written=[], skipped=[], status='error', error=str(e), seconds={})
+    result['seconds']['total'] = time.time() - start
+    with open(resultPath, 'w') as file:
+        json.dump(result, file)
+    # Skip Maya's slow teardown, the result is already on disk
+    sys.stdout.flush()
+    os._exit(0)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Batch exports .animMAF files with headless mayapy workers.')
+    parser.add_argument('jobs', nargs='?', help='JSON list of {"scene", "topNodes", "variant"} jobs.')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--overwrite', default='skip', choices=OVERWRITE_POLICIES)
+    parser.add_argument('--manifest', default='mafBatch_manifest.json', help='JSON manifest to write.')
+    parser.add_argument('--mayapy', help='mayapy executable to run workers with.')
+    parser.add_argument('--reduce', type=float, help='Key reduction tolerance for baked curves.')
+    parser.add_argument('--bake', nargs=2, metavar=('SCENE', 'TOPNODE'), help='Sharded bake of one top node.')
+    parser.add_argument('--range', nargs=2, type=float, metavar=('START', 'END'), help='Frame range to bake.')
+    parser.add_argument('--shards', type=int, help='Frame ranges to split a bake into, defaults to --workers.')
+    parser.add_argument('--mode', default='cache', choices=BAKE_MODES, help='Bake into a .mafCache or .animMAF.')
+    parser.add_argument('--out', help='Merged bake file, defaults to the animMaf directory next to the scene.')
+    parser.add_argument('--variant', default="", help='Variant name of a bake.')
+    parser.add_argument('--worker', nargs=2, metavar=('JOB', 'RESULT'), help=argparse.SUPPRESS)
+    parser.add_argument('--shard', nargs=2, metavar=('JOB', 'RESULT'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        _workerMain(args.worker[0], args.worker[1], args.overwrite, args.reduce)
+    if args.shard:
+        _workerMain(args.shard[0], args.shard[1], args.overwrite, args.reduce, bakeShard)
+    if args.bake:
+        if not args.range:
+            parser.error('--bake needs a --range')
+        report = runShardedBake(args.bake[0], args.bake[1], args.range[0], args.range[1], args.out, args.mode,
+                                args.workers, args.shards, args.variant, args.mayapy, reduceTolerance=args.reduce)
+        if report['status'] != 'ok':
+            print('Sharded bake failed: %s. Logs: %s' % (report['error'], report['tmpDir']))
+        return 0 if report['status'] == 'ok' else 1
+    if not args.jobs:
+        parser.error('a jobs file is required')
+
+    manifest = runBatch(loadJobs(args.jobs), args.workers, args.overwrite, args.manifest, args.mayapy,
+                        reduceTolerance=args.reduce)
+    print('%d files written, %d failed jobs, %.1fs. Manifest: %s' % (manifest['written'], manifest['failed'],
+                                                                     manifest['seconds'], args.manifest))
+    if manifest['failed']:
+        print('Logs of the failed jobs: %s' % manifest['tmpDir'])
+    return 1 if manifest['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
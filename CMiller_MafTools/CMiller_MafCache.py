@@ -0,0 +1,312 @@
+"""
+~ MAF Transform Cache ~ 2026/10/19
+
+Per-frame world transforms of many objects, for handing baked props over to Lighting.
+
+A TransformCache holds frames x objects x 16 doubles (row major 4x4 world matrices, Maya's
+layout with translation in the last row) in a single flat array, frame after frame. It has no
+Maya imports, ExImFuncs.sampleWorldMatrices fills it.
+
+On disk a cache is a .mafCache file, little-endian:
+
+    magic 'MTC1' | version H | flags H | header length I | header JSON | padding | float32 data
+
+The header holds the object table, the frame range (start, step, count) and metadata. The data
+starts on a 16 byte boundary and is frames x objects x 10 floats:
+
+    translate x y z | rotate quaternion x y z w | scale x y z
+
+in world space, so any sample sits at a fixed offset and the block can be memory mapped.
+Since frames follow each other in the block, caches of consecutive frame ranges join by
+copying their blocks back to back (mergeCacheFiles).
+
+v.3 Merging frame range shards
+v.2 .mafCache files
+v.1 Initial Release
+"""
+
+import json
+import math
+import mmap
+import struct
+import sys
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from CMiller_MafFormat import atomicWrite
+
+MATRIX_SIZE = 16
+CACHE_EXT = '.mafCache'
+CACHE_MAGIC = b'MTC1'
+CACHE_VERSION = 1
+# translate xyz, rotate quaternion xyzw, scale xyz
+CHANNELS = ['tx', 'ty', 'tz', 'qx', 'qy', 'qz', 'qw', 'sx', 'sy', 'sz']
+_PREAMBLE = struct.Struct('<4sHHI')
+_ALIGN = 16
+
+
+class TransformCache(object):
+    """ frames x objects x 16 world matrices in one flat array('d').
+
+    """
+    def __init__(self, objects, frames, data=None):
+        self.objects = list(objects)
+        self.frames = list(frames)
+        self._objectIndex = dict((obj, ii) for ii, obj in enumerate(self.objects))
+        self._frameIndex = dict((frame, ii) for ii, frame in enumerate(self.frames))
+        if data is None:
+            data = array('d', [0.0]) * (len(self.frames) * len(self.objects) * MATRIX_SIZE)
+        self.data = data
+        if len(self.data) != len(self.frames) * len(self.objects) * MATRIX_SIZE:
+            raise ValueError('Cache data holds %d values, expected %d frames x %d objects x %d' % (
+                len(self.data), len(self.frames), len(self.objects), MATRIX_SIZE))
+
+    @property
+    def numFrames(self):
+        return len(self.frames)
+
+    @property
+    def numObjects(self):
+        return len(self.objects)
+
+    def _offset(self, frame, obj):
+        return (self._frameIndex[frame] * len(self.objects) + self._objectIndex[obj]) * MATRIX_SIZE
+
+    def matrix(self, frame, obj):
+        """ World matrix of one object on one frame.
+
+        :param frame: Frame as sampled.
+        :param obj: Object name as sampled.
+        :return: List of 16 floats, row major.
+        """
+        offset = self._offset(frame, obj)
+        return self.data[offset:offset + MATRIX_SIZE].tolist()
+
+    def setMatrix(self, frame, obj, values):
+        offset = self._offset(frame, obj)
+        self.data[offset:offset + MATRIX_SIZE] = array('d', values)
+
+    def frameData(self, frame):
+        """ Every object's matrix on one frame.
+
+        :param frame: Frame as sampled.
+        :return: array('d') of objects x 16 values.
+        """
+        size = len(self.objects) * MATRIX_SIZE
+        offset = self._frameIndex[frame] * size
+        return self.data[offset:offset + size]
+
+    def asNumpy(self):
+        """ frames x objects x 4 x 4 view of the data, without a copy.
+
+        :return: numpy.ndarray || None without NumPy.
+        """
+        if np is None:
+            return None
+        return np.frombuffer(self.data, dtype=np.float64).reshape(len(self.frames), len(self.objects), 4, 4)
+
+'''
+################################################
+                                ~Cache Files~
+################################################
+'''
+
+
+def matrixToTRS(m):
+    """ Splits a row major 4x4 matrix without shear into translate, quaternion and scale.
+
+    :param m: 16 floats, Maya layout (row vectors, translation in the last row).
+    :return: List of 10 floats in CHANNELS order.
+    """
+    rows = [m[0:3], m[4:7], m[8:11]]
+    scale = [math.sqrt(r[0] * r[0] + r[1] * r[1] + r[2] * r[2]) for r in rows]
+    det = (rows[0][0] * (rows[1][1] * rows[2][2] - rows[1][2] * rows[2][1]) -
+           rows[0][1] * (rows[1][0] * rows[2][2] - rows[1][2] * rows[2][0]) +
+           rows[0][2] * (rows[1][0] * rows[2][1] - rows[1][1] * rows[2][0]))
+    if det < 0:
+        scale[0] = -scale[0]
+    r = [[v / s if s else 0.0 for v in row] for row, s in zip(rows, scale)]
+
+    # r is the transpose of the column vector rotation matrix
+    trace = r[0][0] + r[1][1] + r[2][2]
+    if trace > 0:
+        k = math.sqrt(trace + 1.0) * 2
+        quat = [(r[1][2] - r[2][1]) / k, (r[2][0] - r[0][2]) / k, (r[0][1] - r[1][0]) / k, 0.25 * k]
+    elif r[0][0] > r[1][1] and r[0][0] > r[2][2]:
+        k = math.sqrt(1.0 + r[0][0] - r[1][1] - r[2][2]) * 2
+        quat = [0.25 * k, (r[1][0] + r[0][1]) / k, (r[2][0] + r[0][2]) / k, (r[1][2] - r[2][1]) / k]
+    elif r[1][1] > r[2][2]:
+        k = math.sqrt(1.0 + r[1][1] - r[0][0] - r[2][2]) * 2
+        quat = [(r[1][0] + r[0][1]) / k, 0.25 * k, (r[2][1] + r[1][2]) / k, (r[2][0] - r[0][2]) / k]
+    else:
+        k = math.sqrt(1.0 + r[2][2] - r[0][0] - r[1][1]) * 2
+        quat = [(r[2][0] + r[0][2]) / k, (r[2][1] + r[1][2]) / k, 0.25 * k, (r[0][1] - r[1][0]) / k]
+    return list(m[12:15]) + quat + scale
+
+
+def writeCacheFile(savePath, cache, **meta):
+    """ Writes a TransformCache to a .mafCache file.
+
+    :param savePath: File to write.
+    :param cache: TransformCache with evenly spaced frames.
+    :param meta: Extra header entries, e.g. user, scene, topNode.
+    :return: savePath
+    """
+    frames = cache.frames
+    step = frames[1] - frames[0] if len(frames) > 1 else 1
+    header = dict(meta)
+    header.update({'objects': cache.objects, 'startFrame': frames[0] if frames else 0, 'frameStep': step,
+                   'numFrames': len(frames), 'channels': CHANNELS, 'created': time.strftime('%Y-%m-%d %H:%M:%S')})
+    headerBytes = json.dumps(header, sort_keys=True).encode('utf-8')
+    padding = -(_PREAMBLE.size + len(headerBytes)) % _ALIGN
+    headerBytes += b' ' * padding
+
+    values = array('f')
+    data = cache.data
+    for offset in range(0, len(data), MATRIX_SIZE):
+        values.extend(matrixToTRS(data[offset:offset + MATRIX_SIZE]))
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+    return atomicWrite(savePath, [_PREAMBLE.pack(CACHE_MAGIC, CACHE_VERSION, 0, len(headerBytes)), headerBytes,
+                                  values.tobytes() if hasattr(values, 'tobytes') else values.tostring()])
+
+
+class CacheFile(object):
+    """ Random access to a .mafCache file through a memory map.
+
+    Only the header gets parsed on open. Samples are read straight from the mapped block.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        magic, self.version, flags, headerLen = _PREAMBLE.unpack(self._file.read(_PREAMBLE.size))
+        if magic != CACHE_MAGIC:
+            raise RuntimeError('%s is not a transform cache' % path)
+        if self.version > CACHE_VERSION:
+            raise RuntimeError('%s is cache v%d, this tool reads up to v%d' % (path, self.version, CACHE_VERSION))
+        self.header = json.loads(self._file.read(headerLen).decode('utf-8'))
+        self._dataStart = _PREAMBLE.size + headerLen
+        self.objects = self.header['objects']
+        self._objectIndex = dict((obj, ii) for ii, obj in enumerate(self.objects))
+        self._stride = len(CHANNELS) * 4
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def startFrame(self):
+        return self.header['startFrame']
+
+    @property
+    def frameStep(self):
+        return self.header['frameStep']
+
+    @property
+    def numFrames(self):
+        return self.header['numFrames']
+
+    @property
+    def frames(self):
+        return [self.startFrame + ii * self.frameStep for ii in range(self.numFrames)]
+
+    def frameIndex(self, frame):
+        """ Index of the sample on or before a frame, clamped to the cache.
+
+        """
+        index = int(math.floor((frame - self.startFrame) / float(self.frameStep) + 1e-6))
+        return min(max(index, 0), self.numFrames - 1)
+
+    def sample(self, frame, obj):
+        """ One object on one frame.
+
+        :param frame: Frame.
+        :param obj: Object name from the object table.
+        :return: List of 10 floats in CHANNELS order.
+        """
+        return self._sampleAt(self.frameIndex(frame), self._objectIndex[obj])
+
+    def samples(self, obj, startFrame=None, endFrame=None):
+        """ One object over a frame range.
+
+        :param obj: Object name from the object table.
+        :param startFrame: First frame, defaults to the start of the cache.
+        :param endFrame: Last frame, defaults to the end of the cache.
+        :return: List of frames, list of 10 float lists.
+        """
+        first = self.frameIndex(self.startFrame if startFrame is None else startFrame)
+        if startFrame is not None and self.startFrame + first * self.frameStep < startFrame:
+            first += 1
+        last = self.frameIndex(self.frames[-1] if endFrame is None else endFrame)
+        frames = [self.startFrame + ii * self.frameStep for ii in range(first, last + 1)]
+        objIndex = self._objectIndex[obj]
+        return frames, [self._sampleAt(ii, objIndex) for ii in range(first, last + 1)]
+
+    def _sampleAt(self, frameIndex, objIndex):
+        offset = self._dataStart + (frameIndex * len(self.objects) + objIndex) * self._stride
+        return list(struct.unpack_from('<10f', self._map, offset))
+
+    def asNumpy(self):
+        """ frames x objects x 10 memory mapped float32 array.
+
+        :return: numpy.memmap || None without NumPy.
+        """
+        if np is None:
+            return None
+        return np.memmap(self.path, dtype='<f4', mode='r', offset=self._dataStart,
+                         shape=(self.numFrames, len(self.objects), len(CHANNELS)))
+
+
+def mergeCacheFiles(paths, savePath, **meta):
+    """ Joins .mafCache files of the same objects over consecutive frame ranges into one file.
+
+    The sample blocks are copied as they are, nothing gets decoded.
+
+    :param paths: .mafCache files, in any order.
+    :param savePath: File to write.
+    :param meta: Extra header entries, the others come from the first file.
+    :return: savePath
+    """
+    cacheFiles = sorted([CacheFile(path) for path in paths], key=lambda c: c.startFrame)
+    try:
+        if not cacheFiles:
+            raise ValueError('No caches to merge')
+        first = cacheFiles[0]
+        for prev, cacheFile in zip(cacheFiles, cacheFiles[1:]):
+            if cacheFile.objects != first.objects:
+                raise RuntimeError('%s and %s cache different objects' % (first.path, cacheFile.path))
+            if abs(cacheFile.frameStep - first.frameStep) > 1e-6:
+                raise RuntimeError('%s and %s use different frame steps' % (first.path, cacheFile.path))
+            nextFrame = prev.startFrame + prev.numFrames * prev.frameStep
+            if abs(cacheFile.startFrame - nextFrame) > 1e-6:
+                raise RuntimeError('%s starts on %g, expected %g after %s' % (cacheFile.path, cacheFile.startFrame,
+                                                                              nextFrame, prev.path))
+
+        header = dict(first.header)
+        header.update(meta)
+        header.update({'numFrames': sum(c.numFrames for c in cacheFiles),
+                       'created': time.strftime('%Y-%m-%d %H:%M:%S')})
+        headerBytes = json.dumps(header, sort_keys=True).encode('utf-8')
+        headerBytes += b' ' * (-(_PREAMBLE.size + len(headerBytes)) % _ALIGN)
+        blockSize = len(first.objects) * first._stride
+        chunks = [_PREAMBLE.pack(CACHE_MAGIC, CACHE_VERSION, 0, len(headerBytes)), headerBytes]
+        for cacheFile in cacheFiles:
+            start = cacheFile._dataStart
+            chunks.append(cacheFile._map[start:start + cacheFile.numFrames * blockSize])
+        return atomicWrite(savePath, chunks)
+    finally:
+        for cacheFile in cacheFiles:
+            cacheFile.close()
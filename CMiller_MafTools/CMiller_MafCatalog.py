@@ -0,0 +1,140 @@
+"""
+~ MAF Catalog ~ 2026/10/19
+
+Local SQLite index of the .animMAF files in an animMaf directory.
+
+The catalog lives on the local disk ($MAF_CATALOG_DIR, or ~/animMafCatalogs), one database per
+directory, so listing a show directory on network storage only costs a directory listing and a
+stat per file. update() re-reads the header of a file only when its mtime or size changed, and
+drops rows for files that are gone. search() filters and sorts in SQL.
+
+v.1 Initial Release
+"""
+
+import hashlib
+import os
+import sqlite3
+
+from CMiller_MafFormat import MAF_EXT, MafFile
+
+COLUMNS = ['name', 'mtime', 'size', 'topNode', 'variant', 'user', 'scene', 'startFrame', 'endFrame',
+           'created', 'version', 'numControls', 'error']
+SEARCH_COLUMNS = ['name', 'topNode', 'variant', 'user', 'scene']
+
+_SCHEMA = '''CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY, mtime REAL, size INTEGER, topNode TEXT, variant TEXT, user TEXT, scene TEXT,
+    startFrame REAL, endFrame REAL, created TEXT, version INTEGER, numControls INTEGER, error TEXT)'''
+
+
+def catalogDir():
+    return os.getenv('MAF_CATALOG_DIR') or os.path.join(os.path.expanduser('~'), 'animMafCatalogs')
+
+
+def catalogPath(directory):
+    """ Local database file for an animMaf directory.
+
+    :param directory: animMaf directory.
+    :return: Path.
+    """
+    directory = os.path.normcase(os.path.abspath(directory))
+    key = hashlib.sha1(directory.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(catalogDir(), 'animMaf_%s.db' % key)
+
+
+def readMetadata(path):
+    """ Catalog row values for one file, from its header.
+
+    v1 files have no user or variant in them, those come from the exportAnim file name,
+    <topNode>_<variant>_<user>.animMAF.
+
+    :param path: .animMAF file.
+    :return: Dictionary of COLUMNS values, without name, mtime and size.
+    """
+    row = dict((column, None) for column in COLUMNS[3:])
+    parts = os.path.basename(path)[:-len(MAF_EXT)].rsplit('_', 2)
+    if len(parts) == 3:
+        row['topNode'], row['variant'], row['user'] = parts
+    try:
+        mafFile = MafFile(path)
+    except Exception as e:
+        row['error'] = str(e)
+        return row
+    header = mafFile.header
+    row.update({'topNode': mafFile.topNode, 'startFrame': mafFile.startFrame, 'endFrame': mafFile.endFrame,
+                'version': mafFile.version, 'numControls': len(header['controls'])})
+    for key in ['variant', 'user', 'scene', 'created']:
+        if header.get(key) is not None:
+            row[key] = header[key]
+    return row
+
+
+class Catalog(object):
+    """ SQLite index of one animMaf directory.
+
+    """
+    def __init__(self, directory, dbPath=None):
+        self.directory = directory
+        self.dbPath = dbPath or catalogPath(directory)
+        if not os.path.isdir(os.path.dirname(self.dbPath)):
+            os.makedirs(os.path.dirname(self.dbPath))
+        self.db = sqlite3.connect(self.dbPath)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def update(self):
+        """ Brings the catalog in line with the directory, reading only new and changed files.
+
+        :return: Number of added, changed and removed files.
+        """
+        stored = dict((row['name'], (row['mtime'], row['size']))
+                      for row in self.db.execute('SELECT name, mtime, size FROM files'))
+        onDisk = {}
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(MAF_EXT):
+                    try:
+                        stat = os.stat(os.path.join(self.directory, name))
+                    except OSError:
+                        continue
+                    onDisk[name] = (stat.st_mtime, stat.st_size)
+
+        added = changed = 0
+        rows = []
+        for name, stamp in onDisk.items():
+            if stored.get(name) == stamp:
+                continue
+            if name in stored:
+                changed += 1
+            else:
+                added += 1
+            row = readMetadata(os.path.join(self.directory, name))
+            row.update({'name': name, 'mtime': stamp[0], 'size': stamp[1]})
+            rows.append([row[column] for column in COLUMNS])
+        removed = [(name,) for name in stored if name not in onDisk]
+
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO files (%s) VALUES (%s)' % (
+                ', '.join(COLUMNS), ', '.join('?' * len(COLUMNS))), rows)
+            self.db.executemany('DELETE FROM files WHERE name = ?', removed)
+        return added, changed, len(removed)
+
+    def search(self, text="", sortBy='mtime', descending=True):
+        """ Lists catalogued files.
+
+        :param text: Optional text matched against name, top node, variant, user and scene.
+        :param sortBy: Column to sort on.
+        :param descending: Sort order.
+        :return: List of row dictionaries.
+        """
+        if sortBy not in COLUMNS:
+            raise ValueError("Can't sort on %r, use one of %s" % (sortBy, ', '.join(COLUMNS)))
+        query = 'SELECT * FROM files'
+        args = []
+        if text:
+            query += ' WHERE ' + ' OR '.join('%s LIKE ?' % column for column in SEARCH_COLUMNS)
+            args = ['%%%s%%' % text] * len(SEARCH_COLUMNS)
+        query += ' ORDER BY %s %s' % (sortBy, 'DESC' if descending else 'ASC')
+        return [dict(zip(row.keys(), row)) for row in self.db.execute(query, args)]
@@ -0,0 +1,66 @@
+"""
+~ MAF Curve Change Command ~ 2026/10/19
+
+Scripted plugin for the cmmMafCurveChange command, which puts MFnAnimCurve key edits on
+Maya's undo queue.
+
+CMiller_MafUndo.runUndoable loads it on first use and hands each edit over before calling the
+command. doIt runs the edit, undoIt and redoIt replay the MAnimCurveChange it recorded.
+
+v.1 Initial Release
+"""
+
+import sys
+
+from maya import OpenMayaMPx as ompx
+
+import CMiller_MafUndo
+
+
+class MafCurveChangeCmd(ompx.MPxCommand):
+    """ Runs one pending edit from CMiller_MafUndo.runUndoable.
+
+    """
+    def __init__(self):
+        ompx.MPxCommand.__init__(self)
+        self.change = None
+
+    def doIt(self, args):
+        func, self.change = CMiller_MafUndo.takePending()
+        try:
+            func(self.change)
+        except Exception:
+            # Leave the curves as they were, nothing lands on the undo queue
+            self.change.undoIt()
+            raise
+
+    def undoIt(self):
+        self.change.undoIt()
+
+    def redoIt(self):
+        self.change.redoIt()
+
+    def isUndoable(self):
+        return True
+
+
+def cmdCreator():
+    return ompx.asMPxPtr(MafCurveChangeCmd())
+
+
+def initializePlugin(mobject):
+    mplugin = ompx.MFnPlugin(mobject, 'Christopher M. Miller', '1.0')
+    try:
+        mplugin.registerCommand(CMiller_MafUndo.COMMAND_NAME, cmdCreator)
+    except RuntimeError:
+        sys.stderr.write("Failed to register command: %s\n" % CMiller_MafUndo.COMMAND_NAME)
+        raise
+
+
+def uninitializePlugin(mobject):
+    mplugin = ompx.MFnPlugin(mobject)
+    try:
+        mplugin.deregisterCommand(CMiller_MafUndo.COMMAND_NAME)
+    except RuntimeError:
+        sys.stderr.write("Failed to deregister command: %s\n" % CMiller_MafUndo.COMMAND_NAME)
+        raise
@@ -0,0 +1,663 @@
+"""
+~ MAF Curves ~ 2026/10/19
+
+Curve math for .animMAF data that doesn't need Maya.
+
+Key reduction refits baked curves (a key on every frame) with the fewest fixed-tangent keys
+that stay within a per-channel tolerance of every baked frame. Segments between kept keys are
+cubic Hermite splines with the baked curve's slope at each end, which is also what Maya draws
+for non-weighted fixed tangents (the Bezier handles sit a third of the way along the segment).
+
+Curves sharing the same key times are fitted together as one matrix. Each pass inserts the
+worst frame of every segment that is still out of tolerance, so the number of passes follows
+the depth of the split, not the number of frames.
+
+Key reduction needs NumPy. Without it reduceCurves returns None and the data is left alone.
+
+Range slicing finds the keys inside a frame range by bisecting the sorted key times. Where the
+range cuts through a segment, a boundary key is inserted by splitting that segment's Bezier
+at the clip edge, so the sliced curve plays back exactly like the original inside the range.
+
+evaluateCurves is evaluate for many curves at many times at once: one searchsorted over all
+keys finds every segment, and the Hermite, Bezier and step cases are worked out as arrays.
+
+CurveTransform offsets, retimes, rescales and crops decoded curves before import, tangents
+included, so a conformed import creates its keys in one go like a plain one.
+
+constantValue spots keyed curves that hold one value over the exported range, so they can be
+stored like unkeyed channels.
+
+Curve space is frames against UI values. Stored tangents follow MFnAnimCurve: angles in degrees
+and weights measured in seconds against internal units, hence the fps and unitScale (internal
+units per UI unit) arguments. Bezier handles sit a third of the tangent out from the key.
+
+v.5 Import transforms
+v.4 Vectorized evaluation
+v.3 Constant curve detection
+v.2 Range slicing and boundary keys
+v.1 Initial Release with key reduction
+"""
+
+import bisect
+import math
+
+from CMiller_MafFormat import CURVE_FIELDS, isStatic
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Per-key curve fields, everything but the curve wide weightedTan
+KEY_FIELDS = [field for field in CURVE_FIELDS if field != 'weightedTan']
+
+# Short attribute name prefix: tolerance in UI units
+DEFAULT_TOLERANCES = {'translate': 0.001, 'rotate': 0.01, 'scale': 0.0001, 'default': 0.001}
+
+'''
+################################################
+                                ~Key Reduction~
+################################################
+'''
+
+
+def isBaked(times):
+    """ A baked curve has at least 3 keys spaced one frame apart.
+
+    :param times: Sorted key times.
+    :return: True or False.
+    """
+    if len(times) < 3:
+        return False
+    for ii in range(1, len(times)):
+        if abs(times[ii] - times[ii - 1] - 1.0) > 1e-6:
+            return False
+    return True
+
+
+def toleranceFor(attr, tolerance):
+    """ Picks the tolerance for an attribute.
+
+    :param attr: Attribute name, node.attr or attr.
+    :param tolerance: A number for every channel, or a dictionary of attribute name or prefix to
+                      tolerance with an optional 'default' entry.
+    :return: Tolerance.
+    """
+    return _attrLookup(attr, tolerance, DEFAULT_TOLERANCES['default'])
+
+
+def _attrLookup(attr, table, default):
+    """ A number for every attribute, or the entry of a {name or prefix: number} table for this one.
+
+    """
+    if not isinstance(table, dict):
+        return float(table)
+    shortAttr = attr.split('.')[-1]
+    if shortAttr in table:
+        return float(table[shortAttr])
+    for prefix in sorted(table.keys(), key=len, reverse=True):
+        if prefix != 'default' and shortAttr.startswith(prefix):
+            return float(table[prefix])
+    return float(table.get('default', default))
+
+
+def _hermite(times, values, slopes, prev, nxt, rows):
+    """ Evaluates every curve at every frame from its kept keys.
+
+    :param prev: Index of the kept key at or before each frame, per curve.
+    :param nxt: Index of the kept key at or after each frame, per curve.
+    :return: Fitted values, same shape as values.
+    """
+    t0 = times[prev]
+    h = times[nxt] - t0
+    onKey = h == 0
+    h = np.where(onKey, 1.0, h)
+    s = (times[None, :] - t0) / h
+    s2 = s * s
+    s3 = s2 * s
+    fit = ((2 * s3 - 3 * s2 + 1) * values[rows, prev] + (s3 - 2 * s2 + s) * h * slopes[rows, prev] +
+           (-2 * s3 + 3 * s2) * values[rows, nxt] + (s3 - s2) * h * slopes[rows, nxt])
+    return np.where(onKey, values, fit)
+
+
+def _reduceGroup(times, values, tolerances):
+    """ Fits curves that share key times.
+
+    :param times: (frames,) key times.
+    :param values: (curves, frames) values.
+    :param tolerances: (curves,) tolerances.
+    :return: (curves, frames) bool mask of kept keys, (curves, frames) slopes, (curves,) max errors.
+    """
+    numCurves, numFrames = values.shape
+    slopes = np.gradient(values, times, axis=1)
+    keep = np.zeros(values.shape, dtype=bool)
+    keep[:, 0] = keep[:, -1] = True
+    rows = np.arange(numCurves)[:, None]
+    frameIndex = np.arange(numFrames)
+    tolFlat = np.repeat(tolerances, numFrames)
+
+    while True:
+        prev = np.maximum.accumulate(np.where(keep, frameIndex, 0), axis=1)
+        nxt = np.minimum.accumulate(np.where(keep, frameIndex, numFrames - 1)[:, ::-1], axis=1)[:, ::-1]
+        error = np.abs(_hermite(times, values, slopes, prev, nxt, rows) - values)
+
+        # Every kept key starts a segment, and every row starts with a kept key
+        errFlat = error.ravel()
+        starts = np.flatnonzero(keep.ravel())
+        lengths = np.diff(np.append(starts, errFlat.size))
+        segMax = np.repeat(np.maximum.reduceat(errFlat, starts), lengths)
+        hits = np.flatnonzero((errFlat == segMax) & (errFlat > tolFlat))
+        if not hits.size:
+            return keep, slopes, error.max(axis=1)
+
+        # First worst frame of each segment
+        segments = np.repeat(np.arange(starts.size), lengths)[hits]
+        first = np.unique(segments, return_index=True)[1]
+        keep.ravel()[hits[first]] = True
+
+
+def reduceCurves(curves, tolerances):
+    """ Reduces baked curves to the fewest keys within tolerance.
+
+    :param curves: List of (times, values) pairs, times sorted.
+    :param tolerances: List of tolerances, one per curve.
+    :return: List of (kept indices, slopes at the kept keys, max error) per curve || None without NumPy.
+    """
+    if np is None:
+        return None
+    results = [None] * len(curves)
+    groups = {}
+    for ii, (times, values) in enumerate(curves):
+        groups.setdefault(tuple(times), []).append(ii)
+
+    for times, members in groups.items():
+        keep, slopes, maxError = _reduceGroup(np.array(times, dtype=float),
+                                              np.array([curves[ii][1] for ii in members], dtype=float),
+                                              np.array([tolerances[ii] for ii in members], dtype=float))
+        for row, ii in enumerate(members):
+            kept = np.flatnonzero(keep[row])
+            results[ii] = (kept.tolist(), slopes[row, kept].tolist(), float(maxError[row]))
+    return results
+
+'''
+################################################
+                                ~Range Slicing~
+################################################
+'''
+
+
+def sliceRange(times, startFrame, endFrame):
+    """ Finds the keys inside a frame range.
+
+    :param times: Sorted key times.
+    :param startFrame: First frame of the range.
+    :param endFrame: Last frame of the range.
+    :return: First index, index after the last key in range.
+    """
+    return bisect.bisect_left(times, startFrame), bisect.bisect_right(times, endFrame)
+
+
+def _cuts(times, lo, hi, startFrame, endFrame):
+    """ Whether each range edge has keys beyond it and no key on it.
+
+    """
+    cutStart = lo > 0 and (lo == len(times) or times[lo] != startFrame)
+    cutEnd = hi < len(times) and (hi == 0 or times[hi - 1] != endFrame)
+    return cutStart, cutEnd
+
+
+def clipsCurve(times, startFrame, endFrame):
+    """ True when a range edge cuts through the curve instead of landing on a key or outside it.
+
+    :param times: Sorted key times.
+    :param startFrame: First frame of the range.
+    :param endFrame: Last frame of the range.
+    :return: True or False.
+    """
+    lo, hi = sliceRange(times, startFrame, endFrame)
+    return any(_cuts(times, lo, hi, startFrame, endFrame))
+
+
+def _isWeighted(curve):
+    return bool(curve['weightedTan'] and curve['weightedTan'][0])
+
+
+def _segment(curve, ii, fps, unitScale):
+    """ Bezier control points of the segment from key ii to key ii + 1, in frames and UI units.
+
+    """
+    t0, t1 = curve['time'][ii], curve['time'][ii + 1]
+    v0, v1 = float(curve['value'][ii]), float(curve['value'][ii + 1])
+    outAngle = math.radians(curve['outAngle'][ii])
+    inAngle = math.radians(curve['inAngle'][ii + 1])
+    if _isWeighted(curve):
+        outWeight, inWeight = curve['outWeight'][ii], curve['inWeight'][ii + 1]
+        p1 = (t0 + outWeight * math.cos(outAngle) * fps / 3.0, v0 + outWeight * math.sin(outAngle) / unitScale / 3.0)
+        p2 = (t1 - inWeight * math.cos(inAngle) * fps / 3.0, v1 - inWeight * math.sin(inAngle) / unitScale / 3.0)
+    else:
+        h = (t1 - t0) / 3.0
+        scale = fps * unitScale
+        p1 = (t0 + h, v0 + math.tan(outAngle) / scale * h)
+        p2 = (t1 - h, v1 - math.tan(inAngle) / scale * h)
+    return [(t0, v0), p1, p2, (t1, v1)]
+
+
+def _bezier(a, b, c, d, u):
+    w = 1.0 - u
+    return w * w * w * a + 3.0 * w * w * u * b + 3.0 * w * u * u * c + u * u * u * d
+
+
+def _solveU(points, t, weighted):
+    """ Bezier parameter of the segment point at time t.
+
+    """
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = points
+    if not weighted:
+        # Handles at a third of the segment keep time linear in u
+        return (t - x0) / (x3 - x0)
+    lo, hi = 0.0, 1.0
+    for ii in range(60):
+        u = (lo + hi) / 2.0
+        if _bezier(x0, x1, x2, x3, u) < t:
+            lo = u
+        else:
+            hi = u
+    return (lo + hi) / 2.0
+
+
+def _split(points, u):
+    """ de Casteljau split of a Bezier segment.
+
+    :return: Left control points, right control points.
+    """
+    lerp = lambda p, q: (p[0] + (q[0] - p[0]) * u, p[1] + (q[1] - p[1]) * u)
+    p0, p1, p2, p3 = points
+    a, b, c = lerp(p0, p1), lerp(p1, p2), lerp(p2, p3)
+    d, e = lerp(a, b), lerp(b, c)
+    m = lerp(d, e)
+    return [p0, a, d, m], [m, e, c, p3]
+
+
+def _tangent(handle, fps, unitScale):
+    """ Angle and weight of a Bezier handle vector (frames, UI units).
+
+    """
+    dx = 3.0 * handle[0] / fps
+    dy = 3.0 * handle[1] * unitScale
+    return math.degrees(math.atan2(dy, dx)), math.hypot(dx, dy)
+
+
+def evaluate(curve, t, fps=24.0, unitScale=1.0):
+    """ Evaluates a curve dictionary at one time. Values hold before the first and after the last key.
+
+    :param curve: Dictionary of CURVE_FIELDS.
+    :param t: Time in frames.
+    :param fps: Frames per second of the UI time unit.
+    :param unitScale: Internal units per UI unit of the curve's values.
+    :return: Value in UI units.
+    """
+    times, values = curve['time'], curve['value']
+    if t <= times[0]:
+        return float(values[0])
+    if t >= times[-1]:
+        return float(values[-1])
+    ii = bisect.bisect_right(times, t) - 1
+    if times[ii] == t:
+        return float(values[ii])
+    if curve['inTan'] is None:
+        # Static data without tangents
+        u = (t - times[ii]) / (times[ii + 1] - times[ii])
+        return float(values[ii]) + (float(values[ii + 1]) - float(values[ii])) * u
+    if curve['outTan'][ii] == 'step':
+        return float(values[ii])
+    if curve['outTan'][ii] == 'stepnext':
+        return float(values[ii + 1])
+    points = _segment(curve, ii, fps, unitScale)
+    u = _solveU(points, t, _isWeighted(curve))
+    return _bezier(points[0][1], points[1][1], points[2][1], points[3][1], u)
+
+
+def _flatKeys(curves, unitScales):
+    """ Concatenates the keys of many curves into flat arrays for evaluateCurves.
+
+    """
+    counts = [len(curve['time']) for curve in curves]
+    starts = np.cumsum([0] + counts[:-1])
+    numKeys = sum(counts)
+    flat = {'time': np.empty(numKeys), 'value': np.empty(numKeys), 'outAngle': np.zeros(numKeys),
+            'inAngle': np.zeros(numKeys), 'outWeight': np.ones(numKeys), 'inWeight': np.ones(numKeys),
+            'step': np.zeros(numKeys, dtype=np.int8)}
+    tangents = np.zeros(len(curves), dtype=bool)
+    weighted = np.zeros(len(curves), dtype=bool)
+    for ii, curve in enumerate(curves):
+        keys = slice(starts[ii], starts[ii] + counts[ii])
+        flat['time'][keys] = curve['time']
+        flat['value'][keys] = curve['value']
+        if curve['inTan'] is None:
+            continue
+        tangents[ii] = True
+        weighted[ii] = _isWeighted(curve)
+        for field in ['outAngle', 'inAngle', 'outWeight', 'inWeight']:
+            flat[field][keys] = curve[field]
+        flat['step'][keys] = [1 if tan == 'step' else 2 if tan == 'stepnext' else 0 for tan in curve['outTan']]
+    return flat, starts, np.array(counts), tangents, weighted, np.asarray(unitScales, dtype=float)
+
+
+def _evaluateChunk(curves, times, fps, unitScales):
+    """ evaluateCurves for curves that all have two keys or more.
+
+    """
+    flat, starts, counts, tangents, weighted, unitScales = _flatKeys(curves, unitScales)
+    kt = flat['time']
+    numCurves = len(curves)
+
+    # Offsetting every curve by its own span turns the per curve bisections into one searchsorted
+    low = min(times.min(), kt.min())
+    span = max(times.max(), kt.max()) - low + 1.0
+    curveIds = np.repeat(np.arange(numCurves), counts)
+    keyed = curveIds * span + (kt - low)
+    queries = np.arange(numCurves)[:, None] * span + (times - low)[None, :]
+    found = np.searchsorted(keyed, queries.ravel(), side='right').reshape(queries.shape) - 1
+
+    first = starts[:, None]
+    last = (starts + counts - 1)[:, None]
+    # The offsets can round a query across a neighbouring key, check against the real times
+    found = np.clip(found, first, last)
+    found += (found < last) & (kt[np.minimum(found + 1, kt.size - 1)] <= times[None, :])
+    found -= (found > first) & (kt[found] > times[None, :])
+    ii = np.clip(found, first, last - 1)
+    t0, t1 = kt[ii], kt[ii + 1]
+    v0, v1 = flat['value'][ii], flat['value'][ii + 1]
+    u = (times[None, :] - t0) / (t1 - t0)
+
+    # Keys without tangents interpolate linearly, like evaluate
+    result = v0 + (v1 - v0) * u
+
+    rowTangents = np.repeat(tangents[:, None], len(times), axis=1)
+    if rowTangents.any():
+        rowWeighted = np.repeat(weighted[:, None], len(times), axis=1)
+        scale = (fps * unitScales)[:, None]
+        outAngle = np.radians(flat['outAngle'][ii])
+        inAngle = np.radians(flat['inAngle'][ii + 1])
+
+        # Non-weighted: handles a third along the segment, so u is linear in time
+        h = (t1 - t0) / 3.0
+        y1 = v0 + np.tan(outAngle) / scale * h
+        y2 = v1 - np.tan(inAngle) / scale * h
+
+        if rowWeighted.any():
+            outWeight = flat['outWeight'][ii]
+            inWeight = flat['inWeight'][ii + 1]
+            unitScale = unitScales[:, None]
+            x1 = t0 + outWeight * np.cos(outAngle) * fps / 3.0
+            x2 = t1 - inWeight * np.cos(inAngle) * fps / 3.0
+            y1 = np.where(rowWeighted, v0 + outWeight * np.sin(outAngle) / unitScale / 3.0, y1)
+            y2 = np.where(rowWeighted, v1 - inWeight * np.sin(inAngle) / unitScale / 3.0, y2)
+
+            # Bisect the Bezier's time polynomial for the weighted segments only
+            mask = rowWeighted & (u > 0) & (u < 1)
+            a, b, c, d, t = t0[mask], x1[mask], x2[mask], t1[mask], (np.zeros(u.shape) + times)[mask]
+            lo, hi = np.zeros(t.shape), np.ones(t.shape)
+            for jj in range(60):
+                mid = (lo + hi) / 2.0
+                below = _bezier(a, b, c, d, mid) < t
+                lo = np.where(below, mid, lo)
+                hi = np.where(below, hi, mid)
+            u = u.copy()
+            u[mask] = (lo + hi) / 2.0
+
+        bezier = _bezier(v0, y1, y2, v1, u)
+        step = flat['step'][ii]
+        bezier = np.where(step == 1, v0, np.where((step == 2) & (u > 0), v1, bezier))
+        result = np.where(rowTangents, bezier, result)
+
+    # Values hold before the first and after the last key
+    result = np.where(times[None, :] <= kt[first], flat['value'][first], result)
+    result = np.where(times[None, :] >= kt[last], flat['value'][last], result)
+    return result
+
+
+def evaluateCurves(curves, times, fps=24.0, unitScales=None):
+    """ Evaluates many curves at many times in one go, see evaluate.
+
+    :param curves: List of curve dictionaries and static values.
+    :param times: Times in frames, the same for every curve.
+    :param fps: Frames per second of the UI time unit.
+    :param unitScales: Internal units per UI unit of each curve's values, 1.0 for all if None.
+    :return: (curves, times) numpy array || list of value lists without NumPy.
+    """
+    if unitScales is None:
+        unitScales = [1.0] * len(curves)
+    if np is None:
+        return [[float(curve) if isStatic(curve) else evaluate(curve, t, fps, unitScale) for t in times]
+                for curve, unitScale in zip(curves, unitScales)]
+
+    times = np.asarray(times, dtype=float)
+    result = np.empty((len(curves), times.size))
+    keyed = []
+    for ii, curve in enumerate(curves):
+        if isStatic(curve):
+            result[ii] = float(curve)
+        elif len(curve['time']) == 1:
+            result[ii] = float(curve['value'][0])
+        elif len(curve['time']):
+            keyed.append(ii)
+        else:
+            result[ii] = np.nan
+    if not keyed or not times.size:
+        return result
+
+    # Chunks of curves keep the (curves, times) temporaries around a million values
+    chunk = max(1, 2 ** 20 // times.size)
+    for start in range(0, len(keyed), chunk):
+        rows = keyed[start:start + chunk]
+        result[rows] = _evaluateChunk([curves[ii] for ii in rows], times, fps, [unitScales[ii] for ii in rows])
+    return result
+
+
+def insertKey(curve, t, fps=24.0, unitScale=1.0):
+    """ Adds a key at time t without changing the shape of the curve, in place.
+
+    Inside a segment the Bezier is split at t, which also shortens the handles of the
+    neighbouring keys on weighted curves. Outside the keys the new key holds the end value.
+
+    :param curve: Dictionary of CURVE_FIELDS with mutable per-key sequences.
+    :param t: Time in frames.
+    :param fps: Frames per second of the UI time unit.
+    :param unitScale: Internal units per UI unit of the curve's values.
+    :return: Index of the key at t.
+    """
+    times = curve['time']
+    index = bisect.bisect_left(times, t)
+    if index < len(times) and times[index] == t:
+        return index
+
+    key = dict((field, None) for field in KEY_FIELDS)
+    key['time'] = t
+    key['value'] = evaluate(curve, t, fps, unitScale)
+    if curve['inTan'] is not None:
+        key.update(inTan='fixed', outTan='fixed', lockTan=True, weightLock=False,
+                   inAngle=0.0, outAngle=0.0, inWeight=1.0, outWeight=1.0)
+        ii = index - 1
+        inside = 0 < index < len(times)
+        if inside and curve['outTan'][ii] in ('step', 'stepnext'):
+            key['inTan'] = key['outTan'] = curve['outTan'][ii]
+        elif inside:
+            points = _segment(curve, ii, fps, unitScale)
+            left, right = _split(points, _solveU(points, t, _isWeighted(curve)))
+            m = left[3]
+            key['inAngle'], key['inWeight'] = _tangent((m[0] - left[2][0], m[1] - left[2][1]), fps, unitScale)
+            key['outAngle'], key['outWeight'] = _tangent((right[1][0] - m[0], right[1][1] - m[1]), fps, unitScale)
+            if _isWeighted(curve):
+                curve['outWeight'][ii] = _tangent((left[1][0] - left[0][0], left[1][1] - left[0][1]),
+                                                  fps, unitScale)[1]
+                curve['inWeight'][ii + 1] = _tangent((right[3][0] - right[2][0], right[3][1] - right[2][1]),
+                                                     fps, unitScale)[1]
+
+    for field in KEY_FIELDS:
+        if curve[field] is not None:
+            curve[field].insert(index, key[field])
+    return index
+
+
+def sliceCurve(curve, startFrame, endFrame, fps=24.0, unitScale=1.0):
+    """ Cuts a curve down to a frame range in O(log n) plus the size of the slice.
+
+    Range edges that cut through the curve get a boundary key so playback inside the range is unchanged.
+
+    :param curve: Dictionary of CURVE_FIELDS.
+    :param startFrame: First frame of the range.
+    :param endFrame: Last frame of the range.
+    :param fps: Frames per second of the UI time unit.
+    :param unitScale: Internal units per UI unit of the curve's values.
+    :return: New curve dictionary || None if the curve has no keys in or around the range.
+    """
+    times = curve['time']
+    if not len(times):
+        return None
+    lo, hi = sliceRange(times, startFrame, endFrame)
+    cutStart, cutEnd = _cuts(times, lo, hi, startFrame, endFrame)
+
+    # Keep the neighbours just outside the range, they define the boundary segments
+    first, last = max(lo - 1, 0), min(hi + 1, len(times))
+    sliced = dict((field, curve[field][first:last] if curve[field] is not None else None) for field in KEY_FIELDS)
+    sliced['weightedTan'] = curve['weightedTan']
+
+    if cutStart:
+        insertKey(sliced, startFrame, fps, unitScale)
+    if cutEnd:
+        insertKey(sliced, endFrame, fps, unitScale)
+    lo, hi = sliceRange(sliced['time'], startFrame, endFrame)
+    if lo == hi:
+        return None
+    for field in KEY_FIELDS:
+        if sliced[field] is not None:
+            sliced[field] = sliced[field][lo:hi]
+    return sliced
+
+'''
+################################################
+                                ~Channel Classes~
+################################################
+'''
+
+
+def constantValue(curve, tolerance=1e-9):
+    """ The value a curve holds across all its keys, if it never moves between them.
+
+    Every key has to share one value and every segment has to be flat: stepped, without
+    tangents, or with zero angles on both ends.
+
+    :param curve: Dictionary of CURVE_FIELDS.
+    :param tolerance: Max value difference still counted as the same value.
+    :return: Value in UI units || None if the curve moves.
+    """
+    values = curve['value']
+    if not len(values):
+        return None
+    first = float(values[0])
+    for value in values:
+        if abs(float(value) - first) > tolerance:
+            return None
+    if curve['inTan'] is not None:
+        for ii in range(len(values) - 1):
+            if curve['outTan'][ii] in ('step', 'stepnext'):
+                continue
+            if abs(curve['outAngle'][ii]) > tolerance or abs(curve['inAngle'][ii + 1]) > tolerance:
+                return None
+    return first
+
+'''
+################################################
+                                ~Import Transforms~
+################################################
+'''
+
+
+class CurveTransform(object):
+    """ Time offset, time scale, per channel value scale and crop, applied to decoded curves.
+
+    New times are (t - pivot) * timeScale + pivot + offset. Tangents follow so the reshaped
+    curve is the original one stretched: non-weighted angles get their slope scaled by
+    valueScale / timeScale, weighted handles get their time and value components scaled and
+    are turned back into angle and weight. Step tangents stay as they are.
+    """
+    def __init__(self, offset=0.0, timeScale=1.0, pivot=0.0, valueScales=None, crop=None):
+        """ Sets up the transform, the default is the identity.
+
+        :param offset: Frames added to every key.
+        :param timeScale: Positive time stretch, 0.5 plays twice as fast.
+        :param pivot: Frame that stays put when stretching.
+        :param valueScales: Value multiplier for every channel, or {attr name or prefix: multiplier}
+                            with an optional 'default' entry, as with toleranceFor.
+        :param crop: Optional (first, last) frame of the transformed curves to keep.
+        """
+        if timeScale <= 0:
+            raise ValueError("Time scale has to be positive, got %r" % timeScale)
+        self.offset = float(offset)
+        self.timeScale = float(timeScale)
+        self.pivot = float(pivot)
+        self.valueScales = valueScales if valueScales is not None else 1.0
+        self.crop = tuple(crop) if crop else None
+
+    def isIdentity(self):
+        return (self.offset == 0 and self.timeScale == 1 and not self.crop and
+                not isinstance(self.valueScales, dict) and float(self.valueScales) == 1)
+
+    def mapTime(self, t):
+        return (t - self.pivot) * self.timeScale + self.pivot + self.offset
+
+    def apply(self, attr, curve):
+        """ Transforms one channel.
+
+        :param attr: Attribute name, picks the value scale.
+        :param curve: Dictionary of CURVE_FIELDS or a static value. Left untouched.
+        :return: New curve dictionary or value.
+        """
+        valueScale = _attrLookup(attr, self.valueScales, 1.0)
+        if isStatic(curve):
+            return curve * valueScale
+        timeScale = self.timeScale
+        shift = self.pivot + self.offset - self.pivot * timeScale
+        out = dict(curve)
+        if np is not None:
+            out['time'] = (np.asarray(curve['time'], dtype=float) * timeScale + shift).tolist()
+            out['value'] = (np.asarray(curve['value'], dtype=float) * valueScale).tolist()
+        else:
+            out['time'] = [t * timeScale + shift for t in curve['time']]
+            out['value'] = [float(v) * valueScale for v in curve['value']]
+        if curve['inTan'] is None or (timeScale == 1 and valueScale == 1):
+            return out
+
+        for side in ['in', 'out']:
+            angles = curve[side + 'Angle']
+            weights = curve[side + 'Weight']
+            if _isWeighted(curve):
+                newAngles, newWeights = self._scaleHandles(angles, weights, timeScale, valueScale)
+                out[side + 'Weight'] = newWeights
+            else:
+                newAngles = self._scaleSlopes(angles, valueScale / timeScale)
+            out[side + 'Angle'] = newAngles
+        return out
+
+    @staticmethod
+    def _scaleSlopes(angles, factor):
+        if np is not None:
+            return np.degrees(np.arctan(np.tan(np.radians(np.asarray(angles, dtype=float))) * factor)).tolist()
+        return [math.degrees(math.atan(math.tan(math.radians(a)) * factor)) for a in angles]
+
+    @staticmethod
+    def _scaleHandles(angles, weights, timeScale, valueScale):
+        if np is not None:
+            radians = np.radians(np.asarray(angles, dtype=float))
+            weights = np.asarray(weights, dtype=float)
+            dx = weights * np.cos(radians) * timeScale
+            dy = weights * np.sin(radians) * valueScale
+            return np.degrees(np.arctan2(dy, dx)).tolist(), np.hypot(dx, dy).tolist()
+        newAngles, newWeights = [], []
+        for angle, weight in zip(angles, weights):
+            dx = weight * math.cos(math.radians(angle)) * timeScale
+            dy = weight * math.sin(math.radians(angle)) * valueScale
+            newAngles.append(math.degrees(math.atan2(dy, dx)))
+            newWeights.append(math.hypot(dx, dy))
+        return newAngles, newWeights
@@ -0,0 +1,219 @@
+"""
+~ MAF Evaluation ~ 2026/10/19
+
+Plays back .animMAF files without Maya, to validate, resample and diff exports on the farm.
+
+Curves are evaluated with CMiller_MafCurves.evaluateCurves, every curve of a file in one
+vectorized pass. Tangent angles and weights are stored against Maya's internal units, so the
+UI units the file was exported in have to be known. exportAnim records them in the header
+('units'), files from before that are read as film, centimeters and degrees. Rotation channels
+are recognised by their exact name (ROTATE_CHANNELS), translations (TRANSLATE_CHANNELS) count
+as linear, every other channel is unitless.
+
+Usage:
+    python CMiller_MafEval.py shot.animMAF                 validate
+    python CMiller_MafEval.py shot.animMAF --frame 1012    values on a frame
+    python CMiller_MafEval.py old.animMAF new.animMAF      diff
+
+v.2 Channels are classified by exact name, so rotatePivot or a custom txOffset stay unitless
+v.1 Initial Release
+"""
+
+import math
+import re
+import sys
+
+from CMiller_MafFormat import MafFile, isStatic
+from CMiller_MafCurves import evaluateCurves
+
+# Time unit: frames per second, anything else is 'NNfps'
+TIME_UNIT_FPS = {'game': 15.0, 'film': 24.0, 'pal': 25.0, 'ntsc': 30.0, 'show': 48.0, 'palf': 50.0, 'ntscf': 60.0}
+# UI unit: internal units (centimeters, radians) per UI unit
+LINEAR_UNITS = {'mm': 0.1, 'cm': 1.0, 'm': 100.0, 'km': 100000.0, 'in': 2.54, 'ft': 30.48, 'yd': 91.44,
+                'mi': 160934.4}
+ANGULAR_UNITS = {'deg': math.pi / 180.0, 'rad': 1.0, 'min': math.pi / 10800.0, 'sec': math.pi / 648000.0}
+DEFAULT_UNITS = {'time': 'film', 'linear': 'cm', 'angle': 'deg'}
+
+# Channels stored in UI angle and distance units, long and short names
+ROTATE_CHANNELS = set(['rotate', 'rotateX', 'rotateY', 'rotateZ', 'rx', 'ry', 'rz',
+                       'jointOrient', 'jointOrientX', 'jointOrientY', 'jointOrientZ', 'jo', 'jox', 'joy', 'joz'])
+TRANSLATE_CHANNELS = set(['translate', 'translateX', 'translateY', 'translateZ', 'tx', 'ty', 'tz'])
+
+
+def fileUnits(mafFile):
+    units = dict(DEFAULT_UNITS)
+    units.update(mafFile.header.get('units') or {})
+    return units
+
+
+def fpsFor(timeUnit):
+    """ Frames per second of a Maya time unit name.
+
+    :param timeUnit: e.g. 'film', 'ntsc', '120fps'.
+    :return: float
+    """
+    if timeUnit in TIME_UNIT_FPS:
+        return TIME_UNIT_FPS[timeUnit]
+    match = re.match(r'^([\d.]+)fps$', timeUnit or '')
+    if match:
+        return float(match.group(1))
+    return TIME_UNIT_FPS[DEFAULT_UNITS['time']]
+
+
+def unitScaleFor(attr, units):
+    """ Internal units per UI unit of an attribute, from its exact name.
+
+    :param attr: Attribute name.
+    :param units: Dictionary of 'linear' and 'angle' UI units.
+    :return: float
+    """
+    shortAttr = attr.split('.')[-1]
+    if shortAttr in ROTATE_CHANNELS:
+        return ANGULAR_UNITS.get(units['angle'], 1.0)
+    if shortAttr in TRANSLATE_CHANNELS:
+        return LINEAR_UNITS.get(units['linear'], 1.0)
+    return 1.0
+
+
+def frameTimes(startFrame, endFrame, step=1.0):
+    count = int(math.floor((endFrame - startFrame) / float(step) + 1e-6)) + 1
+    return [startFrame + ii * step for ii in range(max(count, 0))]
+
+
+'''
+################################################
+                                ~Sampling~
+################################################
+'''
+
+
+def sampleFile(mafFile, times=None, step=1.0, ctls=None):
+    """ Evaluates the curves of a file.
+
+    :param mafFile: MafFile or path.
+    :param times: Frames to evaluate, defaults to the file's range.
+    :param step: Frame step when times is None.
+    :param ctls: Controllers to evaluate, defaults to all.
+    :return: List of times, dictionary of (ctl, attr) to a list of values.
+    """
+    if not isinstance(mafFile, MafFile):
+        mafFile = MafFile(mafFile)
+    if times is None:
+        times = frameTimes(mafFile.startFrame, mafFile.endFrame, step)
+    units = fileUnits(mafFile)
+
+    channels = []
+    curves = []
+    for ctl, attrs in sorted(mafFile.readControls(ctls if ctls is not None else mafFile.controls()).items()):
+        for attr, curve in sorted(attrs.items()):
+            channels.append((ctl, attr))
+            curves.append(curve)
+    values = evaluateCurves(curves, times, fpsFor(units['time']),
+                            [unitScaleFor(attr, units) for ctl, attr in channels])
+    return list(times), dict((channel, list(row)) for channel, row in zip(channels, values))
+
+
+def validateFile(mafFile):
+    """ Checks a file for curves that can't play back as stored.
+
+    :param mafFile: MafFile or path.
+    :return: List of problem strings, empty if the file is fine.
+    """
+    if not isinstance(mafFile, MafFile):
+        mafFile = MafFile(mafFile)
+    problems = []
+    for ctl, attrs in sorted(mafFile.readAll().items()):
+        for attr, curve in sorted(attrs.items()):
+            name = '%s.%s' % (ctl, attr)
+            if isStatic(curve):
+                if math.isnan(curve) or math.isinf(curve):
+                    problems.append('%s: static value %r' % (name, curve))
+                continue
+            times, values = curve['time'], curve['value']
+            if not len(times):
+                problems.append('%s: no keys' % name)
+                continue
+            for field in ['value', 'inTan', 'outTan', 'inAngle', 'outAngle', 'inWeight', 'outWeight']:
+                if curve[field] is not None and len(curve[field]) != len(times):
+                    problems.append('%s: %d times, %d %s' % (name, len(times), len(curve[field]), field))
+            if any(times[ii + 1] <= times[ii] for ii in range(len(times) - 1)):
+                problems.append('%s: key times not increasing' % name)
+            if any(math.isnan(v) or math.isinf(v) for v in values):
+                problems.append('%s: non-finite values' % name)
+    return problems
+
+
+def diffFiles(pathA, pathB, step=1.0, tolerance=1e-4):
+    """ Compares two files by playing both back over the union of their ranges.
+
+    :param pathA: First .animMAF file.
+    :param pathB: Second .animMAF file.
+    :param step: Frame step.
+    :param tolerance: Largest difference still counted as equal.
+    :return: Dictionary with channels only in A, only in B, and {channel: (max difference, frame)} over tolerance.
+    """
+    fileA, fileB = MafFile(pathA), MafFile(pathB)
+    times = frameTimes(min(fileA.startFrame, fileB.startFrame), max(fileA.endFrame, fileB.endFrame), step)
+    timesA, valuesA = sampleFile(fileA, times)
+    timesB, valuesB = sampleFile(fileB, times)
+
+    changed = {}
+    for channel in set(valuesA) & set(valuesB):
+        diffs = [abs(a - b) for a, b in zip(valuesA[channel], valuesB[channel])]
+        worst = max(range(len(diffs)), key=diffs.__getitem__) if diffs else None
+        if worst is not None and not diffs[worst] <= tolerance:
+            changed['%s.%s' % channel] = (diffs[worst], times[worst])
+    return {'onlyA': sorted('%s.%s' % channel for channel in set(valuesA) - set(valuesB)),
+            'onlyB': sorted('%s.%s' % channel for channel in set(valuesB) - set(valuesA)),
+            'changed': changed,
+            'compared': len(set(valuesA) & set(valuesB)),
+            'frames': len(times)}
+
+
+def formatDiff(report):
+    """ Plain text version of diffFiles, largest differences first.
+
+    :param report: diffFiles result.
+    :return: String.
+    """
+    lines = ['%d channels over %d frames, %d differ' % (report['compared'], report['frames'],
+                                                         len(report['changed']))]
+    for name, (diff, frame) in sorted(report['changed'].items(), key=lambda item: -item[1][0]):
+        lines.append('    changed   %s  %g at frame %g' % (name, diff, frame))
+    for name in report['onlyA']:
+        lines.append('    removed   %s' % name)
+    for name in report['onlyB']:
+        lines.append('    added     %s' % name)
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Validates, samples or diffs .animMAF files without Maya.')
+    parser.add_argument('files', nargs='+', help='One file to validate or sample, two to diff.')
+    parser.add_argument('--frame', type=float, action='append', help='Print every channel on this frame.')
+    parser.add_argument('--step', type=float, default=1.0, help='Frame step for diffs.')
+    parser.add_argument('--tolerance', type=float, default=1e-4, help='Largest difference still counted as equal.')
+    args = parser.parse_args(argv)
+
+    if len(args.files) == 2:
+        report = diffFiles(args.files[0], args.files[1], args.step, args.tolerance)
+        print(formatDiff(report))
+        return 1 if report['changed'] or report['onlyA'] or report['onlyB'] else 0
+    if len(args.files) != 1:
+        parser.error('give one file to validate or two to diff')
+
+    if args.frame:
+        times, values = sampleFile(args.files[0], args.frame)
+        for (ctl, attr), row in sorted(values.items()):
+            print('%s.%s  %s' % (ctl, attr, '  '.join('%g' % v for v in row)))
+        return 0
+    problems = validateFile(args.files[0])
+    for problem in problems:
+        print(problem)
+    print('%s: %s' % (args.files[0], '%d problems' % len(problems) if problems else 'ok'))
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,655 @@
+"""
+~ MAF File Format ~ 2026/10/19
+
+Reading and writing of .animMAF files, kept free of Maya imports so files can be
+inspected and converted anywhere Python runs.
+
+v1 is a single JSON blob: {topNode: {ctl: {attr: [11 single-key dicts]}}, '_init': initPos}
+v2 is a binary container, little-endian:
+
+    magic 'MAF2' | version H | flags H | header length I | header JSON | control blocks
+
+The header holds the top node, init position, frame range, metadata and a table of
+contents {ctl: [offset, length, numCurves]} with offsets relative to the first block,
+so single controls can be read without decoding the rest of the file.
+
+Each control block is numCurves I followed by per curve:
+
+    name length H | name | numKeys I | flags B | times d[] | values d[]
+    with tangents: inAngle d[] | outAngle d[] | inWeight d[] | outWeight d[]
+                   inTan B[] | outTan B[] | lockTan B[] | weightLock B[]
+    static:        name length H | name | 0 I | flags B | value d
+
+Tangent types are stored as indices into the header's tangentTypes list. Channels that don't
+move over the exported range are a bare number in {attr: curve} and a single value on disk.
+
+exportAnim also stores a content hash per curve in the header (curveHashes), so a re-export
+can copy the blocks of unchanged curves from the previous file instead of encoding them again.
+
+Files covering consecutive frame ranges of one top node, e.g. the shards of a sharded bake,
+are joined with mergeMafFiles.
+
+v.4 Merging frame range shards
+v.3 Static channels
+v.2 Binary container with table of contents
+v.1 JSON
+"""
+
+import json
+import numbers
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+MAF_EXT = '.animMAF'
+MAF_MAGIC = b'MAF2'
+MAF_VERSION = 3
+
+# Per-attribute curve fields, in the order a v1 .animMAF file stores them
+CURVE_FIELDS = ['time', 'value', 'weightedTan', 'inTan', 'outTan', 'lockTan', 'weightLock',
+                'inAngle', 'outAngle', 'inWeight', 'outWeight']
+
+_PREAMBLE = struct.Struct('<4sHHI')
+_CURVE_HEAD = struct.Struct('<IB')
+_FLAG_TANGENTS = 1
+_FLAG_WEIGHTED = 2
+_FLAG_STATIC = 4
+
+
+'''
+################################################
+                                ~Curve Helpers~
+################################################
+'''
+
+
+def isStatic(curve):
+    """ Whether an attribute's data is a static value rather than a curve.
+
+    :param curve: Curve dictionary, EncodedCurve or number.
+    :return: True or False.
+    """
+    return isinstance(curve, numbers.Real)
+
+
+def curveToV1(curve):
+    """ Converts a curve dictionary into the v1 list of single-key dictionaries.
+
+    :param curve: Dictionary of CURVE_FIELDS.
+    :return: List of 11 dictionaries, JSON ready.
+    """
+    return [{field: list(curve[field]) if curve[field] is not None else None} for field in CURVE_FIELDS]
+
+
+def curveFromV1(attrData):
+    """ Converts the v1 list of single-key dictionaries into a curve dictionary.
+
+    :param attrData: List of 11 dictionaries as stored in a v1 .animMAF file.
+    :return: Dictionary of CURVE_FIELDS.
+    """
+    if isinstance(attrData, dict) or isStatic(attrData):
+        return attrData
+    return dict((field, attrData[i][field]) for i, field in enumerate(CURVE_FIELDS))
+
+
+def ctlDataToV1(ctlData):
+    """ Converts {ctl: {attr: curve}} into the v1 JSON layout.
+
+    v1 has no static channels, they become a single key on the first frame.
+
+    :param ctlData: Dictionary of controllers to curve dictionaries.
+    :return: Dictionary of controllers to v1 attribute lists.
+    """
+    startFrame = frameRange(ctlData)[0] or 0.0
+
+    def toV1(curve):
+        if isStatic(curve):
+            value = float(curve)
+            curve = dict((field, None) for field in CURVE_FIELDS)
+            curve.update(time=[startFrame], value=[value])
+        return curveToV1(curve)
+    return dict((ctl, dict((attr, toV1(curve)) for attr, curve in attrs.items()))
+                for ctl, attrs in ctlData.items())
+
+
+def frameRange(ctlData):
+    """ Finds the first and last key time over every curve.
+
+    :param ctlData: Dictionary of controllers to curve dictionaries.
+    :return: First frame, last frame || None, None.
+    """
+    times = [t for attrs in ctlData.values() for curve in attrs.values() if not isStatic(curve)
+             for t in curveFromV1(curve)['time']]
+    if not times:
+        return None, None
+    return min(times), max(times)
+
+
+def _toBytes(arr):
+    if sys.byteorder == 'big':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes() if hasattr(arr, 'tobytes') else arr.tostring()
+
+
+def _fromBytes(typecode, data):
+    arr = array(typecode)
+    if hasattr(arr, 'frombytes'):
+        arr.frombytes(data)
+    else:
+        arr.fromstring(data)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+'''
+################################################
+                                ~Writing~
+################################################
+'''
+
+
+class EncodedCurve(object):
+    """ A curve block taken as is from an existing file, written out again without decoding.
+
+    The block's tangent indices refer to that file's tangentTypes, so writeMaf has to be seeded
+    with the same table.
+    """
+    def __init__(self, data):
+        self.data = data
+
+
+def _encodeCurve(name, curve, tangentTypes):
+    """ Packs one curve into its binary block.
+
+    :param name: Attribute name.
+    :param curve: Dictionary of CURVE_FIELDS, a static value or an EncodedCurve.
+    :param tangentTypes: Tangent name to index table, extended as new names show up.
+    :return: Bytes.
+    """
+    if isinstance(curve, EncodedCurve):
+        return curve.data
+    nameBytes = name.encode('utf-8')
+    if isStatic(curve):
+        return b''.join([struct.pack('<H', len(nameBytes)), nameBytes, _CURVE_HEAD.pack(0, _FLAG_STATIC),
+                         struct.pack('<d', curve)])
+    curve = curveFromV1(curve)
+    numKeys = len(curve['time'])
+    flags = 0
+    if curve['weightedTan'] is not None and curve['inTan'] is not None:
+        flags |= _FLAG_TANGENTS
+        if curve['weightedTan'] and curve['weightedTan'][0]:
+            flags |= _FLAG_WEIGHTED
+
+    parts = [struct.pack('<H', len(nameBytes)), nameBytes, _CURVE_HEAD.pack(numKeys, flags),
+             _toBytes(array('d', curve['time'])), _toBytes(array('d', [float(v) for v in curve['value']]))]
+    if flags & _FLAG_TANGENTS:
+        for field in ['inAngle', 'outAngle', 'inWeight', 'outWeight']:
+            parts.append(_toBytes(array('d', curve[field])))
+        for field in ['inTan', 'outTan']:
+            parts.append(_toBytes(array('B', [tangentTypes.setdefault(t, len(tangentTypes)) for t in curve[field]])))
+        for field in ['lockTan', 'weightLock']:
+            parts.append(_toBytes(array('B', [1 if v else 0 for v in curve[field]])))
+    return b''.join(parts)
+
+
+def encodeControl(attrs, tangentTypes):
+    """ Packs every curve of a controller into one block.
+
+    :param attrs: Dictionary of attribute names to curve dictionaries.
+    :param tangentTypes: Tangent name to index table, extended as new names show up.
+    :return: Bytes, number of curves.
+    """
+    names = sorted(attrs.keys())
+    parts = [struct.pack('<I', len(names))]
+    for name in names:
+        parts.append(_encodeCurve(name, attrs[name], tangentTypes))
+    return b''.join(parts), len(names)
+
+
+def atomicWrite(path, data):
+    """ Writes bytes to a temp file in the target directory, then renames it over the target.
+
+    Readers of the target see the old file or the new one, never part of one. Windows can't
+    rename over an existing file, so there the target is removed first and for a moment
+    there is no file at all. It still never holds part of one.
+
+    :param path: File to write.
+    :param data: Bytes, or a list of bytes chunks.
+    :return: path
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, tempPath = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            for chunk in ([data] if isinstance(data, bytes) else data):
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        if os.name == 'nt' and os.path.exists(path):
+            # Windows can't rename over an existing file
+            os.remove(path)
+        os.rename(tempPath, path)
+    except Exception:
+        if os.path.exists(tempPath):
+            os.remove(tempPath)
+        raise
+    return path
+
+
+def encodeMaf(topNode, ctlData, initPos, startFrame=None, endFrame=None, tangentTypes=None, **meta):
+    """ Encodes a v2 .animMAF file without touching the disk, see writeMaf.
+
+    :return: List of bytes chunks making up the file.
+    """
+    if startFrame is None or endFrame is None:
+        startFrame, endFrame = frameRange(ctlData)
+
+    tangentTypes = dict((name, ii) for ii, name in enumerate(tangentTypes or []))
+    toc = {}
+    blocks = []
+    offset = 0
+    for ctl in sorted(ctlData.keys()):
+        block, numCurves = encodeControl(ctlData[ctl], tangentTypes)
+        toc[ctl] = [offset, len(block), numCurves]
+        blocks.append(block)
+        offset += len(block)
+
+    header = dict(meta)
+    header.update({
+        'topNode': topNode,
+        'init': initPos,
+        'startFrame': startFrame,
+        'endFrame': endFrame,
+        'created': header.get('created', time.strftime('%Y-%m-%d %H:%M:%S')),
+        'tangentTypes': [name for name, index in sorted(tangentTypes.items(), key=lambda x: x[1])],
+        'controls': toc,
+    })
+    headerBytes = json.dumps(header, sort_keys=True).encode('utf-8')
+    return [_PREAMBLE.pack(MAF_MAGIC, MAF_VERSION, 0, len(headerBytes)), headerBytes] + blocks
+
+
+def writeMaf(savePath, topNode, ctlData, initPos, startFrame=None, endFrame=None, tangentTypes=None, **meta):
+    """ Writes a v2 .animMAF file.
+
+    :param savePath: File to write.
+    :param topNode: Short name of the exported top node.
+    :param ctlData: Dictionary of controllers to {attr: curve}.
+    :param initPos: Initial translate, rotate, scale of the top node.
+    :param startFrame: First frame of the export, taken from the keys if None.
+    :param endFrame: Last frame of the export, taken from the keys if None.
+    :param tangentTypes: Tangent names to start the index table with, needed for EncodedCurve blocks.
+    :param meta: Extra header values (user, scene, variant, curveHashes...).
+    :return: Path to the written file.
+    """
+    return atomicWrite(savePath, encodeMaf(topNode, ctlData, initPos, startFrame, endFrame, tangentTypes, **meta))
+
+
+def writeMafV1(savePath, topNode, ctlData, initPos):
+    """ Writes a v1 JSON .animMAF file, for tools that haven't moved to v2.
+
+    :param savePath: File to write.
+    :param topNode: Short name of the exported top node.
+    :param ctlData: Dictionary of controllers to {attr: curve}.
+    :param initPos: Initial translate, rotate, scale of the top node.
+    :return: Path to the written file.
+    """
+    with open(savePath, 'w') as file:
+        json.dump({topNode: ctlDataToV1(ctlData), '_init': initPos}, file)
+    return savePath
+
+'''
+################################################
+                                ~Merging~
+################################################
+'''
+
+# Header entries that only describe one shard and don't carry over into a merged file
+_SHARD_HEADER = ['topNode', 'init', 'startFrame', 'endFrame', 'created', 'tangentTypes', 'controls',
+                 'curveHashes', 'keyReduction']
+
+
+def mergeCurves(pieces, tolerance=1e-9):
+    """ Joins the curves of one channel over consecutive frame ranges into one curve.
+
+    Keys outside their piece's range are padding the piece was baked with and get dropped, as
+    do keys on a frame the previous piece already covers. A static piece becomes a flat key on
+    each end of its range. When no piece has keys at all, e.g. a switch that changes on a
+    shard boundary, every piece becomes one stepped key on its first frame.
+
+    :param pieces: List of (curve, first frame, last frame), in frame order.
+    :param tolerance: Max value difference still counted as the same static value.
+    :return: Dictionary of CURVE_FIELDS || static value if every piece is the same static value.
+    """
+    statics = [float(curve) for curve, startFrame, endFrame in pieces if isStatic(curve)]
+    if len(statics) == len(pieces) and max(statics) - min(statics) <= tolerance:
+        return statics[0]
+
+    keyed = [curveFromV1(curve) for curve, startFrame, endFrame in pieces if not isStatic(curve)]
+    stepped = not keyed
+    hasTangents = stepped or keyed[0]['inTan'] is not None
+    merged = dict((field, [] if hasTangents or field in ('time', 'value') else None) for field in CURVE_FIELDS)
+    if hasTangents:
+        merged['weightedTan'] = [False] if stepped else list(keyed[0]['weightedTan'] or [False])
+
+    for curve, startFrame, endFrame in pieces:
+        if isStatic(curve):
+            tangent = 'step' if stepped else 'flat'
+            keys = [{'time': t, 'value': float(curve), 'inTan': tangent, 'outTan': tangent, 'lockTan': True,
+                     'weightLock': False, 'inAngle': 0.0, 'outAngle': 0.0, 'inWeight': 1.0, 'outWeight': 1.0}
+                    for t in ([startFrame] if stepped else sorted(set([startFrame, endFrame])))]
+        else:
+            curve = curveFromV1(curve)
+            keys = [dict((field, curve[field][ii]) for field in CURVE_FIELDS
+                         if field != 'weightedTan' and curve[field] is not None)
+                    for ii in range(len(curve['time']))
+                    if startFrame - 1e-6 <= curve['time'][ii] <= endFrame + 1e-6]
+        for key in keys:
+            if merged['time'] and key['time'] <= merged['time'][-1] + 1e-6:
+                continue
+            for field in CURVE_FIELDS:
+                if field != 'weightedTan' and merged[field] is not None:
+                    merged[field].append(key[field])
+    return merged
+
+
+def mergeMafFiles(paths, savePath, **meta):
+    """ Joins .animMAF files of one top node over consecutive frame ranges into one file.
+
+    The init position comes from the first range. A channel missing from some files spans the
+    ranges it was found in.
+
+    :param paths: .animMAF files, in any order.
+    :param savePath: File to write.
+    :param meta: Extra header values, the other entries come from the first file.
+    :return: Path to the written file.
+    """
+    files = sorted([MafFile(path) for path in paths], key=lambda f: f.startFrame)
+    if not files:
+        raise ValueError('No files to merge')
+    for prev, mafFile in zip(files, files[1:]):
+        if mafFile.topNode != prev.topNode:
+            raise RuntimeError('%s holds %s, %s holds %s' % (prev.path, prev.topNode, mafFile.path, mafFile.topNode))
+        if mafFile.startFrame <= prev.endFrame - 1e-6:
+            raise RuntimeError('%s and %s overlap' % (prev.path, mafFile.path))
+
+    contents = [mafFile.readAll() for mafFile in files]
+    ctlData = {}
+    for ctl in sorted(set(ctl for data in contents for ctl in data)):
+        attrs = set(attr for data in contents for attr in data.get(ctl, {}))
+        ctlData[ctl] = dict((attr, mergeCurves([(data[ctl][attr], mafFile.startFrame, mafFile.endFrame)
+                                                for mafFile, data in zip(files, contents)
+                                                if attr in data.get(ctl, {})]))
+                            for attr in attrs)
+
+    header = dict((key, value) for key, value in files[0].header.items() if key not in _SHARD_HEADER)
+    header.update(meta)
+    return writeMaf(savePath, files[0].topNode, ctlData, files[0].initPos, files[0].startFrame, files[-1].endFrame,
+                    **header)
+
+
+'''
+################################################
+                                ~Reading~
+################################################
+'''
+
+
+def _decodeCurve(data, pos, tangentTypes):
+    """ Unpacks one curve block.
+
+    :return: Attribute name, curve dictionary, position after the curve.
+    """
+    nameLen = struct.unpack_from('<H', data, pos)[0]
+    pos += 2
+    name = data[pos:pos + nameLen].decode('utf-8')
+    pos += nameLen
+    numKeys, flags = _CURVE_HEAD.unpack_from(data, pos)
+    pos += _CURVE_HEAD.size
+    if flags & _FLAG_STATIC:
+        return name, struct.unpack_from('<d', data, pos)[0], pos + 8
+
+    def take(typecode):
+        size = numKeys * array(typecode).itemsize
+        arr = _fromBytes(typecode, data[pos:pos + size])
+        return arr, pos + size
+
+    curve = dict((field, None) for field in CURVE_FIELDS)
+    curve['time'], pos = take('d')
+    curve['value'], pos = take('d')
+    if flags & _FLAG_TANGENTS:
+        curve['weightedTan'] = [bool(flags & _FLAG_WEIGHTED)]
+        for field in ['inAngle', 'outAngle', 'inWeight', 'outWeight']:
+            curve[field], pos = take('d')
+        for field in ['inTan', 'outTan']:
+            indices, pos = take('B')
+            curve[field] = [tangentTypes[i] for i in indices]
+        for field in ['lockTan', 'weightLock']:
+            flagsArr, pos = take('B')
+            curve[field] = [bool(v) for v in flagsArr]
+    return name, curve, pos
+
+
+def decodeControl(data, tangentTypes):
+    """ Unpacks a controller block written by encodeControl.
+
+    :param data: Block bytes.
+    :param tangentTypes: Tangent names, indexed as stored.
+    :return: Dictionary of attribute names to curve dictionaries.
+    """
+    numCurves = struct.unpack_from('<I', data, 0)[0]
+    pos = 4
+    attrs = {}
+    for i in range(numCurves):
+        name, curve, pos = _decodeCurve(data, pos, tangentTypes)
+        attrs[name] = curve
+    return attrs
+
+
+def splitControl(data):
+    """ Cuts a controller block into its curve blocks, reading only the curve headers.
+
+    :param data: Block bytes.
+    :return: Dictionary of attribute names to curve block bytes.
+    """
+    numCurves = struct.unpack_from('<I', data, 0)[0]
+    pos = 4
+    blocks = {}
+    for i in range(numCurves):
+        start = pos
+        nameLen = struct.unpack_from('<H', data, pos)[0]
+        name = data[pos + 2:pos + 2 + nameLen].decode('utf-8')
+        pos += 2 + nameLen
+        numKeys, flags = _CURVE_HEAD.unpack_from(data, pos)
+        pos += _CURVE_HEAD.size + numKeys * 8 * 2
+        if flags & _FLAG_STATIC:
+            pos += 8
+        elif flags & _FLAG_TANGENTS:
+            pos += numKeys * (8 * 4 + 4)
+        blocks[name] = data[start:pos]
+    return blocks
+
+
+class MafFile(object):
+    """ Read access to an .animMAF file, either the v1 JSON blob or the v2 binary container.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self._v1Data = None
+
+        with open(path, 'rb') as file:
+            preamble = file.read(_PREAMBLE.size)
+            if preamble[:4] == MAF_MAGIC:
+                magic, self.version, flags, headerLen = _PREAMBLE.unpack(preamble)
+                if self.version > MAF_VERSION:
+                    raise RuntimeError('%s is MAF v%d, this tool reads up to v%d' % (path, self.version, MAF_VERSION))
+                self.header = json.loads(file.read(headerLen).decode('utf-8'))
+                self._dataStart = _PREAMBLE.size + headerLen
+            else:
+                file.seek(0)
+                self._readV1(json.loads(file.read().decode('utf-8')))
+
+    def _readV1(self, data):
+        """ Sorts out the v1 blob by key name rather than dictionary order.
+
+        """
+        self.version = 1
+        initPos = data.pop('_init', None)
+        if len(data) != 1:
+            raise RuntimeError('%s is not a valid MAF file' % self.path)
+        topNode, ctlData = list(data.items())[0]
+        self._v1Data = ctlData
+        startFrame, endFrame = frameRange(ctlData)
+        self.header = {'topNode': topNode, 'init': initPos, 'startFrame': startFrame, 'endFrame': endFrame,
+                       'controls': dict((ctl, [None, None, len(attrs)]) for ctl, attrs in ctlData.items())}
+
+    @property
+    def topNode(self):
+        return self.header['topNode']
+
+    @property
+    def initPos(self):
+        return self.header['init']
+
+    @property
+    def startFrame(self):
+        return self.header['startFrame']
+
+    @property
+    def endFrame(self):
+        return self.header['endFrame']
+
+    def controls(self):
+        """ Lists the controllers stored in the file.
+
+        :return: Sorted list of controller names.
+        """
+        return sorted(self.header['controls'].keys())
+
+    def readControl(self, ctl):
+        """ Decodes the curves of a single controller.
+
+        :param ctl: Controller name as stored in the file.
+        :return: Dictionary of attribute names to curve dictionaries.
+        """
+        if self._v1Data is not None:
+            return dict((attr, curveFromV1(curve)) for attr, curve in self._v1Data[ctl].items())
+
+        offset, length, numCurves = self.header['controls'][ctl]
+        with open(self.path, 'rb') as file:
+            file.seek(self._dataStart + offset)
+            return decodeControl(file.read(length), self.header['tangentTypes'])
+
+    def readControls(self, ctls):
+        """ Decodes a subset of controllers in file order with a single open.
+
+        :param ctls: Controller names as stored in the file. Names not in the file are ignored.
+        :return: Dictionary of controllers to {attr: curve}.
+        """
+        toc = self.header['controls']
+        ctls = [ctl for ctl in ctls if ctl in toc]
+        if self._v1Data is not None:
+            return dict((ctl, self.readControl(ctl)) for ctl in ctls)
+
+        ctlData = {}
+        with open(self.path, 'rb') as file:
+            for ctl in sorted(ctls, key=lambda c: toc[c][0]):
+                offset, length, numCurves = toc[ctl]
+                file.seek(self._dataStart + offset)
+                ctlData[ctl] = decodeControl(file.read(length), self.header['tangentTypes'])
+        return ctlData
+
+    def curveBlocks(self, ctl):
+        """ The still encoded curve blocks of one controller, for reuse with EncodedCurve.
+
+        :param ctl: Controller name as stored in the file.
+        :return: Dictionary of attribute names to curve block bytes, empty for v1 files.
+        """
+        if self._v1Data is not None or ctl not in self.header['controls']:
+            return {}
+        offset, length, numCurves = self.header['controls'][ctl]
+        with open(self.path, 'rb') as file:
+            file.seek(self._dataStart + offset)
+            return splitControl(file.read(length))
+
+    def curveHashes(self):
+        """ Content hashes stored by exportAnim.
+
+        :return: Dictionary of controllers to {attr: hash}.
+        """
+        return self.header.get('curveHashes') or {}
+
+    def readAll(self):
+        """ Decodes every controller.
+
+        :return: Dictionary of controllers to {attr: curve}.
+        """
+        return self.readControls(self.controls())
+
+    def controlData(self):
+        """ Dictionary-like view of every controller that only decodes what gets looked up.
+
+        :return: LazyControlData
+        """
+        return LazyControlData(self)
+
+
+class LazyControlData(object):
+    """ {ctl: {attr: curve}} view of a MafFile that decodes a controller on first access.
+
+    Membership and keys come straight from the table of contents, and renaming a
+    controller with rename() doesn't decode it at all.
+    """
+    def __init__(self, mafFile):
+        self.mafFile = mafFile
+        self._stored = dict((ctl, ctl) for ctl in mafFile.controls())
+        self._decoded = {}
+
+    def __contains__(self, ctl):
+        return ctl in self._decoded or ctl in self._stored
+
+    def __getitem__(self, ctl):
+        if ctl not in self._decoded:
+            self._decoded[ctl] = self.mafFile.readControl(self._stored[ctl])
+        return self._decoded[ctl]
+
+    def __setitem__(self, ctl, attrs):
+        self._decoded[ctl] = attrs
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        return list(set(self._stored) | set(self._decoded))
+
+    def values(self):
+        return [self[ctl] for ctl in self.keys()]
+
+    def items(self):
+        return [(ctl, self[ctl]) for ctl in self.keys()]
+
+    def get(self, ctl, default=None):
+        return self[ctl] if ctl in self else default
+
+    def rename(self, old, new):
+        """ Renames a controller without decoding it.
+
+        """
+        if old in self._decoded:
+            self._decoded[new] = self._decoded.pop(old)
+        if old in self._stored:
+            self._stored[new] = self._stored.pop(old)
+
+    def pop(self, ctl):
+        attrs = self[ctl]
+        del self._decoded[ctl]
+        self._stored.pop(ctl, None)
+        return attrs
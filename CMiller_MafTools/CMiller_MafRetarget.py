@@ -0,0 +1,244 @@
+"""
+~ MAF Retarget ~ 2026/10/19
+
+Control name mapping profiles for importing .animMAF data onto a different rig.
+
+A profile belongs to a rig pair (the top node stored in the file and the top node it gets
+imported onto) and holds:
+
+    exact      {source control: target control}, checked first
+    rules      applied in order to every other control name
+               {'type': 'prefix' | 'suffix', 'from': 'L_', 'to': 'lf_'}
+               {'type': 'regex', 'pattern': '^(.*)_CTL$', 'replace': r'\\1_ctrl'}
+               {'type': 'namespace', 'from': 'hulk', 'to': 'hulkB'}
+
+A namespace rule strips 'from:' off source names and only matches target nodes inside the
+'to' namespace. Regexes are compiled once when the rule is added, and compile() turns a
+profile into a plain {source control: [target nodes]} table in one pass over each side.
+
+Profiles are saved as JSON in $MAF_PROFILE_DIR, or ~/animMafProfiles, one file per rig pair.
+
+v.1 Initial Release
+"""
+
+import json
+import os
+import re
+
+from CMiller_MafFormat import MafFile
+
+RULE_TYPES = ['prefix', 'suffix', 'regex', 'namespace']
+
+
+def shortName(node):
+    """ Strips the DAG path and namespace off a node name, like setAnim does.
+
+    :param node: Node name.
+    :return: Short name.
+    """
+    return node.split(":")[-1].split("|")[-1]
+
+
+def nodeNamespace(node):
+    """ Namespace of the last DAG path element.
+
+    :param node: Node name.
+    :return: Namespace, '' if none.
+    """
+    leaf = node.split("|")[-1]
+    return leaf.rsplit(":", 1)[0] if ":" in leaf else ""
+
+
+class MappingProfile(object):
+    """ Name mapping rules from the controls of one rig to the nodes of another.
+
+    """
+    def __init__(self, source="", target="", exact=None, rules=None):
+        self.source = source
+        self.target = target
+        self.exact = dict(exact or {})
+        self.rules = []
+        self.namespace = None
+        self._compiled = []
+        for rule in rules or []:
+            self.addRule(rule)
+
+    def addRule(self, rule):
+        """ Appends a rule and compiles it.
+
+        :param rule: Rule dictionary, see the module docstring.
+        :return: None
+        """
+        ruleType = rule.get('type')
+        if ruleType == 'prefix':
+            old, new = rule['from'], rule['to']
+            func = lambda name: new + name[len(old):] if name.startswith(old) else name
+        elif ruleType == 'suffix':
+            old, new = rule['from'], rule['to']
+            func = lambda name: name[:len(name) - len(old)] + new if old and name.endswith(old) else name
+        elif ruleType == 'regex':
+            pattern = re.compile(rule['pattern'])
+            replace = rule['replace']
+            func = lambda name: pattern.sub(replace, name)
+        elif ruleType == 'namespace':
+            old = rule.get('from') or ""
+            self.namespace = rule.get('to') or ""
+            func = lambda name: name[len(old) + 1:] if old and name.startswith(old + ":") else name
+        else:
+            raise ValueError("Unknown mapping rule type %r, use one of %s" % (ruleType, ', '.join(RULE_TYPES)))
+        self.rules.append(dict(rule))
+        self._compiled.append(func)
+
+    def setExact(self, source, target):
+        """ Maps one control by name, ahead of every rule.
+
+        :param source: Control name as stored in the file.
+        :param target: Target control name.
+        :return: None
+        """
+        self.exact[source] = target
+
+    def mapName(self, ctl):
+        """ Runs a control name through the profile.
+
+        :param ctl: Control name as stored in the file.
+        :return: Target short name.
+        """
+        if ctl in self.exact:
+            return shortName(self.exact[ctl])
+        name = ctl
+        for func in self._compiled:
+            name = func(name)
+        return shortName(name)
+
+    def compile(self, sourceControls, targetNodes):
+        """ Builds the lookup table for one import.
+
+        :param sourceControls: Control names stored in the file.
+        :param targetNodes: Full names of the nodes under the target top node.
+        :return: Dictionary of source control to the list of target nodes with the mapped short name.
+        """
+        index = {}
+        for node in targetNodes:
+            if self.namespace is not None and nodeNamespace(node) != self.namespace:
+                continue
+            index.setdefault(shortName(node), []).append(node)
+
+        table = {}
+        for ctl in sourceControls:
+            nodes = index.get(self.mapName(ctl))
+            if nodes:
+                table[ctl] = nodes
+        return table
+
+    def validate(self, sourceControls, targetNodes):
+        """ Reports how well the profile covers a file.
+
+        :param sourceControls: Control names stored in the file.
+        :param targetNodes: Full names of the nodes under the target top node.
+        :return: Dictionary with the mapped count, unmapped controls and targets hit by several controls.
+        """
+        sourceControls = list(sourceControls)
+        table = self.compile(sourceControls, targetNodes)
+        hits = {}
+        for ctl, nodes in table.items():
+            for node in nodes:
+                hits.setdefault(node, []).append(ctl)
+        return {'controls': len(sourceControls),
+                'mapped': len(table),
+                'unmapped': sorted(ctl for ctl in sourceControls if ctl not in table),
+                'collisions': dict((node, sorted(ctls)) for node, ctls in hits.items() if len(ctls) > 1)}
+
+    def toDict(self):
+        return {'source': self.source, 'target': self.target, 'exact': self.exact, 'rules': self.rules}
+
+    @classmethod
+    def fromDict(cls, data):
+        return cls(data.get('source', ""), data.get('target', ""), data.get('exact'), data.get('rules'))
+
+'''
+################################################
+                                ~Profiles~
+################################################
+'''
+
+
+def profileDir():
+    return os.getenv('MAF_PROFILE_DIR') or os.path.join(os.path.expanduser('~'), 'animMafProfiles')
+
+
+def profilePath(source, target, directory=None):
+    """ File holding the profile of a rig pair.
+
+    :param source: Top node stored in the .animMAF file.
+    :param target: Top node imported onto.
+    :param directory: Optional profile directory.
+    :return: Path.
+    """
+    clean = lambda name: re.sub(r'[^\w.-]', '_', shortName(name))
+    return os.path.join(directory or profileDir(), '%s__%s.json' % (clean(source), clean(target)))
+
+
+def loadProfile(source, target, directory=None):
+    """ Loads the saved profile of a rig pair.
+
+    :return: MappingProfile || None.
+    """
+    path = profilePath(source, target, directory)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as file:
+        return MappingProfile.fromDict(json.load(file))
+
+
+def saveProfile(profile, directory=None):
+    """ Saves a profile under its rig pair.
+
+    :param profile: MappingProfile
+    :param directory: Optional profile directory.
+    :return: Path to the saved profile.
+    """
+    path = profilePath(profile.source, profile.target, directory)
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as file:
+        json.dump(profile.toDict(), file, indent=2, sort_keys=True)
+    return path
+
+
+def validateFiles(paths, targetNodes, target, profile=None, directory=None):
+    """ Checks many .animMAF files against a target rig from their tables of contents alone.
+
+    :param paths: .animMAF files.
+    :param targetNodes: Full names of the nodes under the target top node.
+    :param target: Target top node, used to find each file's saved profile.
+    :param profile: Profile to use for every file instead of the saved ones.
+    :param directory: Optional profile directory.
+    :return: Dictionary of path to validate() report, with the profile used.
+    """
+    targetNodes = list(targetNodes)
+    reports = {}
+    for path in paths:
+        mafFile = MafFile(path)
+        fileProfile = profile or loadProfile(mafFile.topNode, target, directory) or \
+            MappingProfile(mafFile.topNode, target)
+        report = fileProfile.validate(mafFile.controls(), targetNodes)
+        report['profile'] = profilePath(fileProfile.source, fileProfile.target, directory)
+        reports[path] = report
+    return reports
+
+
+def formatReport(reports):
+    """ Plain text version of validateFiles, worst files first.
+
+    :param reports: validateFiles result.
+    :return: String.
+    """
+    lines = []
+    for path, report in sorted(reports.items(), key=lambda item: -len(item[1]['unmapped'])):
+        lines.append('%s: %d of %d mapped' % (os.path.basename(path), report['mapped'], report['controls']))
+        for ctl in report['unmapped']:
+            lines.append('    unmapped  %s' % ctl)
+        for node, ctls in sorted(report['collisions'].items()):
+            lines.append('    collision %s <- %s' % (node, ', '.join(ctls)))
+    return '\n'.join(lines)
@@ -0,0 +1,485 @@
+"""
+~ MAF Scene Index ~ 2026/10/19
+
+One-pass index of the DAG for the rig queries of MafTools.
+
+SceneIndex walks the scene once with MItDag and records, per DAG path: parent, children,
+depth-first position (so a subtree is a slice of the walk), constraint nodes and what they
+drive and are driven by, skinned geometry below, whether a 'Rig' group sits above, and control
+tags from the naming convention. After that, checkRigid, exportAnim and importAnim answer their
+questions from dictionaries instead of listRelatives/listConnections calls and string tests.
+
+sceneIndex() hands out one shared index per session. Callbacks mark it dirty and the next call
+rebuilds it, so a batch of props in one scene only pays for one walk. They fire when a DAG node
+or skinCluster is added or removed, a DAG node is renamed or reparented, and a connection to a
+constraint or skinCluster is made or broken.
+Deletions done through SceneIndex.delete() update the index in place instead.
+
+AnimatableCache keeps what listAnimatable found per node, with the MPlugs, so repeated exports
+skip that discovery pass. A node's entry is dropped when an attribute gets added, removed,
+renamed, locked or (un)keyed on it, and everything is dropped on file new/open.
+
+v.5 Renames, reparenting, skin binds and constraint connections mark the index dirty
+v.4 descendants() in listRelatives order, constraint plugs by full path
+v.3 AnimatableCache runs nothing but listAnimatable per node, no schema queries
+v.2 Animatable attribute cache
+v.1 Initial Release
+"""
+
+from maya import OpenMaya as om, OpenMayaAnim as omAnim, cmds
+
+# Short name tests of the rig naming convention
+TAG_RULES = [('master', lambda name: name == 'MASTER_CONTROL'),
+             ('tranRot', lambda name: 'tranRot_CTL' in name),
+             ('control', lambda name: 'CTL' in name)]
+
+
+def _shortName(path):
+    return path.split('|')[-1].split(':')[-1]
+
+
+def _pathsTo(obj):
+    paths = om.MDagPathArray()
+    om.MDagPath.getAllPathsTo(obj, paths)
+    return [paths[ii].fullPathName() for ii in range(paths.length())]
+
+
+class SceneIndex(object):
+    """ Parents, children, constraints, skins and control tags of every DAG node, from one walk.
+
+    Nodes are keyed by full DAG path. Every query takes any name cmds.ls understands.
+    """
+    def __init__(self):
+        self.dirty = True
+        self._muted = False
+        self._callbackIds = []
+
+    def watch(self):
+        """ Marks the index dirty whenever something it records changes, see the module docstring.
+
+        """
+        if self._callbackIds:
+            return
+        self._callbackIds = [om.MDGMessage.addNodeAddedCallback(self._changed, 'dagNode'),
+                             om.MDGMessage.addNodeRemovedCallback(self._changed, 'dagNode'),
+                             om.MDGMessage.addNodeAddedCallback(self._changed, 'skinCluster'),
+                             om.MDGMessage.addNodeRemovedCallback(self._changed, 'skinCluster'),
+                             om.MDagMessage.addParentAddedCallback(self._changed),
+                             om.MDagMessage.addParentRemovedCallback(self._changed),
+                             om.MNodeMessage.addNameChangedCallback(om.MObject(), self._renamed),
+                             om.MDGMessage.addConnectionCallback(self._connected)]
+
+    def unwatch(self):
+        for callbackId in self._callbackIds:
+            om.MMessage.removeCallback(callbackId)
+        self._callbackIds = []
+
+    def _changed(self, node, *args):
+        if not self._muted:
+            self.dirty = True
+
+    def _renamed(self, node, prevName, *args):
+        if node.hasFn(om.MFn.kDagNode):
+            self._changed(node)
+
+    def _connected(self, srcPlug, dstPlug, made, *args):
+        # Only what _indexConstraint and _indexSkins read, keying fires this a lot
+        if self.dirty:
+            return
+        for plug in (srcPlug, dstPlug):
+            node = plug.node()
+            if node.hasFn(om.MFn.kConstraint) or node.hasFn(om.MFn.kSkinClusterFilter):
+                self._changed(node)
+                return
+
+    def build(self):
+        """ Walks the whole DAG once.
+
+        :return: self
+        """
+        self.order = []
+        self.position = {}
+        self.parents = {}
+        self.children = {}
+        self.transforms = set()
+        self.types = {}
+        self.tags = {}
+        self.inRig = set()
+        self.skinned = set()
+        self.skinnedBelow = set()
+        # constraint: set of driven nodes, set of driver nodes, list of driven plugs
+        self.constraintDriven = {}
+        self.constraintDrivers = {}
+        self.constraintPlugs = {}
+        # node: list of constraints driving it
+        self.constrainedBy = {}
+
+        subtreeEnd = {}
+        stack = []
+        constraints = []
+        dagIt = om.MItDag(om.MItDag.kDepthFirst, om.MFn.kInvalid)
+        dagPath = om.MDagPath()
+        while not dagIt.isDone():
+            dagIt.getPath(dagPath)
+            path = dagPath.fullPathName()
+            if not path:
+                # The world itself
+                dagIt.next()
+                continue
+            depth = dagIt.depth()
+            while stack and stack[-1][1] >= depth:
+                subtreeEnd[stack.pop()[0]] = len(self.order)
+            stack.append((path, depth))
+
+            obj = dagIt.currentItem()
+            parent = path.rsplit('|', 1)[0] or None
+            self.position[path] = len(self.order)
+            self.order.append(path)
+            self.parents[path] = parent
+            self.children[path] = []
+            if parent in self.children:
+                self.children[parent].append(path)
+            self.types[path] = om.MFnDependencyNode(obj).typeName()
+            if obj.hasFn(om.MFn.kTransform):
+                self.transforms.add(path)
+            if parent in self.inRig or (parent and 'Rig' in parent.split('|')[-1]):
+                self.inRig.add(path)
+            shortName = _shortName(path)
+            self.tags[path] = set(tag for tag, test in TAG_RULES if test(shortName))
+            if obj.hasFn(om.MFn.kConstraint):
+                constraints.append((path, obj))
+            dagIt.next()
+        for path, depth in stack:
+            subtreeEnd[path] = len(self.order)
+        self.subtreeEnd = subtreeEnd
+
+        for path, obj in constraints:
+            self._indexConstraint(path, obj)
+        self._indexSkins()
+        self.dirty = False
+        return self
+
+    def _indexConstraint(self, path, obj):
+        """ Sorts the connections of a constraint into driven plugs and driver nodes.
+
+        """
+        plugs = om.MPlugArray()
+        om.MFnDependencyNode(obj).getConnections(plugs)
+        driven = set()
+        drivenPlugs = []
+        dagPath = om.MDagPath()
+        sources = set()
+        others = om.MPlugArray()
+        for ii in range(plugs.length()):
+            plug = plugs[ii]
+            plug.connectedTo(others, False, True)
+            for jj in range(others.length()):
+                node = others[jj].node()
+                if node.hasFn(om.MFn.kDagNode) and node != obj:
+                    driven.update(_pathsTo(node))
+                    # MPlug.name() is short and can be ambiguous, bakeResults needs the full path
+                    om.MDagPath.getAPathTo(node, dagPath)
+                    drivenPlugs.append("%s.%s" % (dagPath.fullPathName(),
+                                                  others[jj].partialName(False, False, False, False, True, True)))
+            plug.connectedTo(others, True, False)
+            for jj in range(others.length()):
+                node = others[jj].node()
+                if node.hasFn(om.MFn.kDagNode) and node != obj:
+                    sources.update(_pathsTo(node))
+
+        # The constrained node feeds its own parentInverseMatrix and pivots back in
+        self.constraintDriven[path] = driven
+        self.constraintDrivers[path] = sources - driven
+        self.constraintPlugs[path] = drivenPlugs
+        for node in driven:
+            self.constrainedBy.setdefault(node, []).append(path)
+
+    def _indexSkins(self):
+        """ Marks the transforms of skinned geometry, and every ancestor as having skin below.
+
+        """
+        skinIt = om.MItDependencyNodes(om.MFn.kSkinClusterFilter)
+        outputs = om.MObjectArray()
+        while not skinIt.isDone():
+            omAnim.MFnSkinCluster(skinIt.thisNode()).getOutputGeometry(outputs)
+            for ii in range(outputs.length()):
+                for shape in _pathsTo(outputs[ii]):
+                    node = self.parents.get(shape)
+                    if node is None or node in self.skinned:
+                        continue
+                    self.skinned.add(node)
+                    while node is not None and node not in self.skinnedBelow:
+                        self.skinnedBelow.add(node)
+                        node = self.parents.get(node)
+            skinIt.next()
+
+    ##########################
+    #
+    # Queries
+    #
+    ##########################
+
+    def fullPath(self, node):
+        """ Full DAG path of a node name.
+
+        :param node: Node name.
+        :return: Full path || None if there is no such DAG node.
+        """
+        if node in self.position:
+            return node
+        paths = cmds.ls(node, l=1)
+        if paths and paths[0] in self.position:
+            return paths[0]
+        return None
+
+    def parent(self, node):
+        return self.parents.get(self.fullPath(node))
+
+    def childNodes(self, node):
+        return list(self.children.get(self.fullPath(node), []))
+
+    def descendants(self, node, transformsOnly=True):
+        """ Everything below a node, in listRelatives(ad=1, f=1) order: the walk reversed, deepest first.
+
+        :param node: Node name.
+        :param transformsOnly: Only transform derived nodes, like type="transform".
+        :return: List of full paths.
+        """
+        path = self.fullPath(node)
+        if path is None:
+            return []
+        # exportAnim takes initPos from the first master/tranRot control, keep listRelatives' order
+        below = self.order[self.subtreeEnd[path] - 1:self.position[path]:-1]
+        if transformsOnly:
+            return [child for child in below if child in self.transforms]
+        return [child for child in below if child in self.position]
+
+    def nodeType(self, node):
+        return self.types.get(self.fullPath(node))
+
+    def hasTag(self, node, tag):
+        """ Whether a node's short name marks it as 'master', 'tranRot' or 'control', see TAG_RULES.
+
+        """
+        return tag in self.tags.get(self.fullPath(node), ())
+
+    def isInRig(self, node):
+        """ Whether any group above the node has 'Rig' in its name.
+
+        """
+        return self.fullPath(node) in self.inRig
+
+    def isSkinned(self, node, below=True):
+        """ Whether the node, or with below anything under it, is skinned geometry.
+
+        """
+        path = self.fullPath(node)
+        return path in (self.skinnedBelow if below else self.skinned)
+
+    def constraints(self, node, constraintType=None):
+        """ Constraints driving a node.
+
+        :param node: Node name.
+        :param constraintType: Optional node type, e.g. 'parentConstraint'.
+        :return: List of constraint paths.
+        """
+        found = self.constrainedBy.get(self.fullPath(node), [])
+        if constraintType:
+            found = [con for con in found if self.types[con] == constraintType]
+        return list(found)
+
+    def drivers(self, constraint):
+        """ Target nodes of a constraint.
+
+        :param constraint: Constraint name.
+        :return: List of full paths.
+        """
+        return sorted(self.constraintDrivers.get(self.fullPath(constraint), ()))
+
+    def constrainedPlugs(self, nodes):
+        """ Channels driven by constraints, over many nodes.
+
+        :param nodes: Node names.
+        :return: List of plug names, list of constraint paths.
+        """
+        plugs = []
+        constraints = set()
+        for node in nodes:
+            for con in self.constrainedBy.get(self.fullPath(node), []):
+                if con not in constraints:
+                    constraints.add(con)
+                    plugs.extend(self.constraintPlugs[con])
+        return sorted(set(plugs)), sorted(constraints)
+
+    ##########################
+    #
+    # Edits
+    #
+    ##########################
+
+    def delete(self, nodes):
+        """ Deletes leaf nodes such as constraints and drops them from the index without a rebuild.
+
+        :param nodes: Node names, none of them with children.
+        :return: None
+        """
+        paths = [self.fullPath(node) for node in nodes]
+        self._muted = True
+        try:
+            cmds.delete(nodes)
+        finally:
+            self._muted = False
+        for path in paths:
+            if path is None or path not in self.position:
+                continue
+            if self.children[path]:
+                # Anything with children changes too much, start over next time
+                self.dirty = True
+                continue
+            parent = self.parents.pop(path)
+            if parent in self.children:
+                self.children[parent].remove(path)
+            self.transforms.discard(path)
+            for node in self.constraintDriven.pop(path, ()):
+                self.constrainedBy[node].remove(path)
+            self.constraintDrivers.pop(path, None)
+            self.constraintPlugs.pop(path, None)
+            # The walk keeps its slot, descendants() skips paths that are gone
+            del self.position[path]
+
+
+_sceneIndex = SceneIndex()
+
+
+def sceneIndex():
+    """ The session's shared SceneIndex, rebuilt when the DAG changed since the last call.
+
+    :return: SceneIndex
+    """
+    _sceneIndex.watch()
+    if _sceneIndex.dirty:
+        _sceneIndex.build()
+    return _sceneIndex
+
+
+class AnimatableCache(object):
+    """ listAnimatable per node, kept until the node's attributes change.
+
+    """
+    # Attribute changes that can change what listAnimatable returns
+    SCHEMA_MESSAGES = (om.MNodeMessage.kAttributeAdded | om.MNodeMessage.kAttributeRemoved |
+                       om.MNodeMessage.kAttributeRenamed | om.MNodeMessage.kAttributeLocked |
+                       om.MNodeMessage.kAttributeUnlocked | om.MNodeMessage.kAttributeKeyable |
+                       om.MNodeMessage.kAttributeUnkeyable)
+
+    def __init__(self):
+        # full path: [MObjectHandle, attribute names, MPlugs, callback id]
+        self.nodes = {}
+        self._sceneCallbackIds = []
+
+    def watch(self):
+        """ Empties the cache on file new and open.
+
+        """
+        if self._sceneCallbackIds:
+            return
+        self._sceneCallbackIds = [om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, self.clear),
+                                  om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, self.clear)]
+
+    def unwatch(self):
+        self.clear()
+        for callbackId in self._sceneCallbackIds:
+            om.MMessage.removeCallback(callbackId)
+        self._sceneCallbackIds = []
+
+    def clear(self, *args):
+        for path in list(self.nodes.keys()):
+            self.forget(path)
+
+    def forget(self, path, *args):
+        entry = self.nodes.pop(path, None)
+        if entry is not None:
+            try:
+                om.MMessage.removeCallback(entry[3])
+            except RuntimeError:
+                # Callbacks of deleted nodes are gone already
+                pass
+
+    def _attrChanged(self, msg, plug, otherPlug, path):
+        if msg & self.SCHEMA_MESSAGES:
+            self.forget(path)
+
+    def _cached(self, path):
+        entry = self.nodes.get(path)
+        if entry is None:
+            return None
+        handle = entry[0]
+        # Deleted, renamed or reparented nodes don't answer to the path anymore
+        if not handle.isValid() or om.MFnDagNode(handle.object()).fullPathName() != path:
+            self.forget(path)
+            return None
+        return entry
+
+    def attributes(self, node):
+        """ The animatable attributes of a node and their plugs.
+
+        :param node: Full DAG path.
+        :return: List of (node.attr, MPlug) pairs, like listAnimatable(node).
+        """
+        entry = self._cached(node)
+        if entry is None:
+            found, entry = self._discover(node)
+            if entry is None:
+                return found
+        names, plugs = entry[1], entry[2]
+        return [(node + name, plug) for name, plug in zip(names, plugs)]
+
+    def _discover(self, path):
+        """ Runs listAnimatable on a node and stores the result.
+
+        :return: List of (node.attr, MPlug) pairs, cache entry || None if the node can't be cached.
+        """
+        found = cmds.listAnimatable(path) or []
+        selList = om.MSelectionList()
+        selList.add(path)
+        obj = om.MObject()
+        selList.getDependNode(0, obj)
+        fnNode = om.MFnDependencyNode(obj)
+
+        names = []
+        plugs = []
+        own = True
+        for attr in found:
+            nodePart, name = attr.split('.', 1)
+            if nodePart != path and not path.endswith('|' + nodePart.lstrip('|')):
+                own = False
+            if own and '.' not in name and '[' not in name:
+                plug = fnNode.findPlug(name, False)
+            else:
+                # Shape channels and element or child paths need the full name resolved
+                selList.clear()
+                selList.add(attr)
+                plug = om.MPlug()
+                selList.getPlug(0, plug)
+            names.append('.' + name)
+            plugs.append(plug)
+
+        pairs = list(zip(found, plugs))
+        if not own:
+            # Shape channels belong to another node, its attribute changes would go unnoticed
+            return pairs, None
+        callbackId = om.MNodeMessage.addAttributeChangedCallback(obj, self._attrChanged, path)
+        self.nodes[path] = [om.MObjectHandle(obj), names, plugs, callbackId]
+        return pairs, self.nodes[path]
+
+
+_animatableCache = AnimatableCache()
+
+
+def animatableCache():
+    """ The session's shared AnimatableCache.
+
+    :return: AnimatableCache
+    """
+    _animatableCache.watch()
+    return _animatableCache
@@ -12,14 +12,110 @@ Also houses similar tools for baking final animation for Lighting export
 '''
 
 # Imports
-import os, os.path, json, sys
-from maya import OpenMayaUI as omUI, cmds
+import os, os.path, json, sys, time, hashlib
+from array import array
+from functools import partial
+from maya import OpenMaya as om, OpenMayaUI as omUI, OpenMayaAnim as omAnim, cmds
 from PySide import QtGui, QtCore, QtUiTools
 from shiboken import wrapInstance
+import math
+from CMiller_MafFormat import CURVE_FIELDS, MAF_EXT, EncodedCurve, MafFile, curveFromV1, encodeMaf, isStatic, writeMaf
+from CMiller_MafCurves import clipsCurve, constantValue, isBaked, reduceCurves, sliceCurve, toleranceFor
+from CMiller_MafRetarget import MappingProfile, loadProfile, saveProfile
+from CMiller_MafCache import CACHE_EXT, CacheFile, TransformCache, writeCacheFile
+from CMiller_MafCatalog import Catalog
+from CMiller_MafWriter import writer
+from CMiller_MafScene import animatableCache, sceneIndex
+from CMiller_MafUndo import UndoChunk, runUndoable
 
 myDir = os.path.dirname(os.path.abspath(__file__))
 myFile = os.path.join(myDir, 'CMiller_MafTools.ui')
 
+# API tangent types and their keyTangent names. Older Maya versions lack some of them.
+_TANGENT_NAMES = [('kTangentGlobal', 'global'), ('kTangentFixed', 'fixed'), ('kTangentLinear', 'linear'),
+                  ('kTangentFlat', 'flat'), ('kTangentSmooth', 'spline'), ('kTangentStep', 'step'),
+                  ('kTangentSlow', 'slow'), ('kTangentFast', 'fast'), ('kTangentClamped', 'clamped'),
+                  ('kTangentPlateau', 'plateau'), ('kTangentStepNext', 'stepnext'), ('kTangentAuto', 'auto')]
+TANGENT_TO_NAME = dict((getattr(omAnim.MFnAnimCurve, k), n) for k, n in _TANGENT_NAMES
+                       if hasattr(omAnim.MFnAnimCurve, k))
+NAME_TO_TANGENT = dict((n, t) for t, n in TANGENT_TO_NAME.items())
+
+# What exportAnim does when the .animMAF file already exists. Only 'ask' opens a dialog.
+OVERWRITE_ASK = 'ask'
+OVERWRITE_ALWAYS = 'overwrite'
+OVERWRITE_SKIP = 'skip'
+
+
+def toDoubleArray(values):
+    """ Builds an MDoubleArray from a list in one copy instead of a set() per element.
+
+    :param values: List of floats.
+    :return: MDoubleArray
+    """
+    util = om.MScriptUtil()
+    util.createFromList(list(values), len(values))
+    return om.MDoubleArray(util.asDoublePtr(), len(values))
+
+
+def getDependNode(name):
+    """ Returns the MObject for a node name.
+
+    :param name: Node name.
+    :return: MObject
+    """
+    selList = om.MSelectionList()
+    selList.add(name)
+    obj = om.MObject()
+    selList.getDependNode(0, obj)
+    return obj
+
+
+def getFps():
+    """ Frames per second of the current time unit.
+
+    :return: float
+    """
+    return om.MTime(1.0, om.MTime.kSeconds).asUnits(om.MTime.uiUnit())
+
+
+def getUnitScale(attrType):
+    """ Internal units per UI unit, for converting tangent angles to and from UI space.
+
+    :param attrType: Attribute type as returned by getAttr(type=1), or an MFnAnimCurve curve type.
+    :return: float
+    """
+    if attrType in ('doubleAngle', omAnim.MFnAnimCurve.kAnimCurveTA):
+        return om.MAngle(1.0, om.MAngle.uiUnit()).asRadians()
+    if attrType in ('doubleLinear', omAnim.MFnAnimCurve.kAnimCurveTL):
+        return om.MDistance(1.0, om.MDistance.uiUnit()).asCentimeters()
+    return 1.0
+
+
+def getDagPath(name):
+    """ Returns the MDagPath for a DAG node name.
+
+    :param name: Node name.
+    :return: MDagPath
+    """
+    selList = om.MSelectionList()
+    selList.add(name)
+    dagPath = om.MDagPath()
+    selList.getDagPath(0, dagPath)
+    return dagPath
+
+
+def getPlug(attr):
+    """ Returns the MPlug for an attribute name.
+
+    :param attr: Full attribute name, node.attr.
+    :return: MPlug
+    """
+    selList = om.MSelectionList()
+    selList.add(attr)
+    plug = om.MPlug()
+    selList.getPlug(0, plug)
+    return plug
+
 
 class ExImFuncs(object):
     def __init__(self):
@@ -33,7 +129,7 @@ class ExImFuncs(object):
     #
     ##########################
 
-    def setAnim(self, par='', ctlData={}, startFrame=0.0, endFrame=1.0, animLayer=""):
+    def setAnim(self, par='', ctlData={}, startFrame=0.0, endFrame=1.0, animLayer="", ctl=None, transform=None):
         """ Applies animation data to a hierarchy of controllers.
 
         :param par: Top level node to start from.
@@ -41,108 +137,370 @@ class ExImFuncs(object):
         :param startFrame: Start frame of the animation.
         :param endFrame: Last frame of the animation.
         :param animLayer: Optional argument to apply data to an Animation Layer.
+        :param ctl: Optional controller name in ctlData to read from, defaults to the short name of par.
+        :param transform: Optional CurveTransform applied to the decoded curves before keying.
         :return: None
         """
-        parSplit = par.split(":")[-1].split("|")[-1]
+        parSplit = ctl or par.split(":")[-1].split("|")[-1]
 
         print parSplit
-        if parSplit in ctlData.keys():
+        if parSplit in ctlData:
             print "par found: " + parSplit
             attrs = ctlData[parSplit]
+            curves = []
             for attr in attrs.keys():
                 shortAttr = attr.split('.')[-1]
-                fullAttr = par + "." + shortAttr
-
-                if animLayer:
-                    cmds.select(par, r=1)
-                    cmds.animLayer(animLayer, e=1, aso=1)
-                    cmds.select(cl=1)
-                tD = attrs[attr][0]
-                vD = attrs[attr][1]
-                weightedTanD = attrs[attr][2]
-                inTanD = attrs[attr][3]
-                outTanD = attrs[attr][4]
-                lockTanD = attrs[attr][5]
-                weightLockD = attrs[attr][6]
-                inAngleD = attrs[attr][7]
-                outAngleD = attrs[attr][8]
-                inWeightD = attrs[attr][9]
-                outWeightD = attrs[attr][10]
-
                 if cmds.attributeQuery(shortAttr, node=par, ex=1):
-                    for ii in xrange(len(tD['time'])):
+                    curve = curveFromV1(attrs[attr])
+                    if transform is not None:
+                        curve = transform.apply(shortAttr, curve)
+                    fullAttr = par + "." + shortAttr
+                    if isStatic(curve):
+                        if animLayer or cmds.connectionInfo(fullAttr, isDestination=1):
+                            # Keyed or layered channels still need the value as a key
+                            value = curve
+                            curve = dict((field, None) for field in CURVE_FIELDS)
+                            curve.update(time=[startFrame], value=[value])
+                        else:
+                            self.setStatic(fullAttr, curve)
+                            continue
+                    curves.append((fullAttr, curve))
+
+            if animLayer and curves:
+                # Layer membership once per node instead of once per attribute
+                cmds.animLayer(animLayer, e=1, attribute=[fullAttr for fullAttr, curve in curves])
+
+            self.setCurves([(fullAttr, curve, startFrame, endFrame) for fullAttr, curve in curves], animLayer)
 
-                        if startFrame <= tD['time'][ii] <= endFrame:
-                            if animLayer:
-                                cmds.setKeyframe(par, t=tD['time'][ii], v=float(vD['value'][ii]), at=shortAttr,
-                                                 al=animLayer, breakdown=False, hierarchy='none', controlPoints=False,
-                                                 shape=False)
-                            else:
+            print "done with " + parSplit
 
-                                cmds.setKeyframe(par, t=tD['time'][ii], v=float(vD['value'][ii]), at=shortAttr,
-                                                 breakdown=False, hierarchy='none', controlPoints=False, shape=False)
+    def setStatic(self, fullAttr, value):
+        """ Applies a static channel with a single setAttr.
 
-                    if weightedTanD:
-                        try:
-                            cmds.keyTangent(par, e=1, wt=int(weightedTanD['weightedTan'][0]), at=shortAttr)
-                        except:
-                            pass
+        :param fullAttr: Attribute to set, node.attr.
+        :param value: Value in UI units.
+        :return: True if the value was set.
+        """
+        try:
+            cmds.setAttr(fullAttr, value)
+        except RuntimeError:
+            print "couldn't set " + fullAttr
+            return False
+        return True
+
+    def getCurveForAttr(self, fullAttr, time, value, animLayer=""):
+        """ Finds the animCurve keying an attribute, creating it with a single key if there is none.
+
+        :param fullAttr: Attribute to key, node.attr.
+        :param time: Time of the first key, in case the curve has to be created.
+        :param value: Value of the first key, in case the curve has to be created.
+        :param animLayer: Optional Animation Layer the curve should live on.
+        :return: MObject of the animCurve.
+        """
+        if animLayer:
+            curveNames = cmds.animLayer(animLayer, q=1, findCurveForPlug=fullAttr)
+        else:
+            curveNames = cmds.keyframe(fullAttr, q=1, name=1)
+
+        if not curveNames:
+            # Let Maya decide the curve type and layer wiring, it's the one key that goes through MEL
+            if animLayer:
+                cmds.setKeyframe(fullAttr, t=time, v=value, al=animLayer, breakdown=False, hierarchy='none',
+                                 controlPoints=False, shape=False)
+                curveNames = cmds.animLayer(animLayer, q=1, findCurveForPlug=fullAttr)
+            else:
+                cmds.setKeyframe(fullAttr, t=time, v=value, breakdown=False, hierarchy='none',
+                                 controlPoints=False, shape=False)
+                curveNames = cmds.keyframe(fullAttr, q=1, name=1)
 
-                        for ii in xrange(len(tD['time'])):
-                            if startFrame <= tD['time'][ii] <= endFrame:
-                                try:
-                                    cmds.keyTangent(par + "." + shortAttr, e=1, t=(tD['time'][ii], tD['time'][ii]),
-                                                    ia=inAngleD['inAngle'][ii], iw=inWeightD['inWeight'][ii],
-                                                    oa=outAngleD['outAngle'][ii], ow=outWeightD['outWeight'][ii])
+        return getDependNode(curveNames[0])
 
-                                    cmds.keyTangent(par + "." + shortAttr, e=1, t=(tD['time'][ii], tD['time'][ii]),
-                                                    itt=inTanD['inTan'][ii], ott=outTanD['outTan'][ii])
+    def setCurve(self, fullAttr, curve, startFrame=0.0, endFrame=1.0, animLayer=""):
+        """ Writes every key of a curve dictionary inside a frame range onto an attribute in one pass.
 
-                                    cmds.keyTangent(par + "." + shortAttr, e=1, t=(tD['time'][ii], tD['time'][ii]),
-                                                    lock=lockTanD['lockTan'][ii])
+        :param fullAttr: Attribute to key, node.attr.
+        :param curve: Dictionary of CURVE_FIELDS.
+        :param startFrame: Start frame of the animation.
+        :param endFrame: Last frame of the animation.
+        :param animLayer: Optional Animation Layer to key on.
+        :return: Number of keys set.
+        """
+        return self.setCurves([(fullAttr, curve, startFrame, endFrame)], animLayer)
 
-                                    if weightedTanD['weightedTan'][0]:
-                                        cmds.keyTangent(par + "." + shortAttr, e=1, t=(tD['time'][ii], tD['time'][ii]),
-                                                        lock=weightLockD['weightLock'][ii])
+    def setCurves(self, items, animLayer=""):
+        """ Writes many curves at once, their key edits as one cmmMafCurveChange command, see CMiller_MafUndo.
 
-                                except:
-                                    print "tangent wtf at " + parSplit + "." + shortAttr
+        :param items: List of (fullAttr, curve dictionary, startFrame, endFrame), see setCurve.
+        :param animLayer: Optional Animation Layer to key on.
+        :return: Number of keys set.
+        """
+        sliced = []
+        for fullAttr, curve, startFrame, endFrame in items:
+            # Clip edges that cut through the curve get a boundary key evaluated from the stored tangents
+            unitScale = 1.0
+            if curve['inTan'] is not None and clipsCurve(curve['time'], startFrame, endFrame):
+                unitScale = getUnitScale(cmds.getAttr(fullAttr, type=1))
+            curve = sliceCurve(curve, startFrame, endFrame, getFps(), unitScale)
+            if curve is None:
+                continue
+            # Curves that don't exist yet are made through MEL, before the command runs
+            curveObj = self.getCurveForAttr(fullAttr, float(curve['time'][0]), float(curve['value'][0]), animLayer)
+            sliced.append((fullAttr, curve, curveObj))
+        if not sliced:
+            return 0
+
+        def writeAll(change):
+            return sum(self._writeKeys(fullAttr, curve, curveObj, change) for fullAttr, curve, curveObj in sliced)
+
+        return runUndoable(writeAll)
+
+    def _writeKeys(self, fullAttr, curve, curveObj, change):
+        """ Keys a sliced curve dictionary onto an animCurve through MFnAnimCurve.
 
-            print "done with " + parSplit
+        """
+        times = [float(t) for t in curve['time']]
+        values = [float(v) for v in curve['value']]
+        fnCurve = omAnim.MFnAnimCurve(curveObj)
+
+        # File values are in UI units, the API wants internal ones
+        curveType = fnCurve.animCurveType()
+        if curveType == omAnim.MFnAnimCurve.kAnimCurveTA:
+            angleUnit = om.MAngle.uiUnit()
+            values = [om.MAngle(v, angleUnit).asRadians() for v in values]
+        elif curveType == omAnim.MFnAnimCurve.kAnimCurveTL:
+            distUnit = om.MDistance.uiUnit()
+            values = [om.MDistance(v, distUnit).asCentimeters() for v in values]
+
+        timeUnit = om.MTime.uiUnit()
+        mTimes = [om.MTime(t, timeUnit) for t in times]
+        util = om.MScriptUtil()
+        util.createFromInt(0)
+        indexPtr = util.asUintPtr()
+
+        # Replace keys sitting on the same frames, like setKeyframe does
+        replaced = []
+        for mTime in mTimes:
+            if fnCurve.find(mTime, indexPtr):
+                replaced.append(om.MScriptUtil.getUint(indexPtr))
+        for index in sorted(replaced, reverse=True):
+            fnCurve.remove(index, change)
+
+        timeArray = om.MTimeArray()
+        for mTime in mTimes:
+            timeArray.append(mTime)
+        fnCurve.addKeys(timeArray, toDoubleArray(values), omAnim.MFnAnimCurve.kTangentGlobal,
+                        omAnim.MFnAnimCurve.kTangentGlobal, True, change)
+
+        weighted = curve['weightedTan']
+        if weighted:
+            fnCurve.setIsWeighted(bool(weighted[0]), change)
+            try:
+                for ii, mTime in enumerate(mTimes):
+                    fnCurve.find(mTime, indexPtr)
+                    index = om.MScriptUtil.getUint(indexPtr)
+
+                    fnCurve.setTangentsLocked(index, False, change)
+                    fnCurve.setWeightsLocked(index, False, change)
+                    fnCurve.setTangent(index, om.MAngle(curve['inAngle'][ii], om.MAngle.kDegrees),
+                                       curve['inWeight'][ii], True, change)
+                    fnCurve.setTangent(index, om.MAngle(curve['outAngle'][ii], om.MAngle.kDegrees),
+                                       curve['outWeight'][ii], False, change)
+                    fnCurve.setInTangentType(index, NAME_TO_TANGENT.get(curve['inTan'][ii],
+                                                                        omAnim.MFnAnimCurve.kTangentGlobal), change)
+                    fnCurve.setOutTangentType(index, NAME_TO_TANGENT.get(curve['outTan'][ii],
+                                                                         omAnim.MFnAnimCurve.kTangentGlobal), change)
+                    fnCurve.setTangentsLocked(index, bool(curve['lockTan'][ii]), change)
+                    if weighted[0]:
+                        fnCurve.setWeightsLocked(index, bool(curve['weightLock'][ii]), change)
+            except RuntimeError:
+                print "tangent wtf at " + fullAttr
+
+        return len(times)
+
+    def readCurve(self, curveObj, startFrame=0.0, endFrame=1.0):
+        """ Reads the keys of an animCurve inside a frame range in one pass through the API.
+
+        Only the keys in range and their direct neighbours are read, found with findClosest. Range
+        edges that cut through the curve get a boundary key from sliceCurve.
+
+        :param curveObj: MObject of the animCurve node.
+        :param startFrame: Start frame to read keys from.
+        :param endFrame: Last frame to read keys on.
+        :return: Dictionary of CURVE_FIELDS with times, values, angles and weights as arrays, or None if no keys.
+        """
+        fnCurve = omAnim.MFnAnimCurve(curveObj)
+        if fnCurve.isUnitlessInput():
+            # Driven keys are not time based animation
+            return None
+
+        curveType = fnCurve.animCurveType()
+        if curveType == omAnim.MFnAnimCurve.kAnimCurveTA:
+            angleUnit = om.MAngle.uiUnit()
+            toUI = lambda v: om.MAngle(v).asUnits(angleUnit)
+        elif curveType == omAnim.MFnAnimCurve.kAnimCurveTL:
+            distUnit = om.MDistance.uiUnit()
+            toUI = lambda v: om.MDistance(v).asUnits(distUnit)
+        else:
+            toUI = float
+
+        timeUnit = om.MTime.uiUnit()
+        curve = {'time': array('d'), 'value': array('d'), 'weightedTan': [fnCurve.isWeighted()],
+                 'inTan': [], 'outTan': [], 'lockTan': [], 'weightLock': [],
+                 'inAngle': array('d'), 'outAngle': array('d'), 'inWeight': array('d'), 'outWeight': array('d')}
+
+        angle = om.MAngle()
+        util = om.MScriptUtil()
+        util.createFromDouble(0.0)
+        weightPtr = util.asDoublePtr()
+
+        numKeys = fnCurve.numKeys()
+        if not numKeys:
+            return None
+        first = fnCurve.findClosest(om.MTime(startFrame, timeUnit))
+        if first > 0 and fnCurve.time(first).asUnits(timeUnit) > startFrame:
+            first -= 1
+        last = fnCurve.findClosest(om.MTime(endFrame, timeUnit))
+        if last < numKeys - 1 and fnCurve.time(last).asUnits(timeUnit) < endFrame:
+            last += 1
+
+        for i in xrange(first, last + 1):
+            t = fnCurve.time(i).asUnits(timeUnit)
+            curve['time'].append(t)
+            curve['value'].append(toUI(fnCurve.value(i)))
+            curve['inTan'].append(TANGENT_TO_NAME.get(fnCurve.inTangentType(i), 'fixed'))
+            curve['outTan'].append(TANGENT_TO_NAME.get(fnCurve.outTangentType(i), 'fixed'))
+            curve['lockTan'].append(fnCurve.tangentsLocked(i))
+            curve['weightLock'].append(fnCurve.weightsLocked(i))
+
+            fnCurve.getTangent(i, angle, weightPtr, True)
+            curve['inAngle'].append(angle.asDegrees())
+            curve['inWeight'].append(om.MScriptUtil.getDouble(weightPtr))
+            fnCurve.getTangent(i, angle, weightPtr, False)
+            curve['outAngle'].append(angle.asDegrees())
+            curve['outWeight'].append(om.MScriptUtil.getDouble(weightPtr))
+
+        return sliceCurve(curve, startFrame, endFrame, getFps(), getUnitScale(curveType))
+
+    def curveHash(self, curve, salt=""):
+        """ Content hash of a curve as readCurve returned it, i.e. exactly what gets stored.
+
+        :param curve: Dictionary of CURVE_FIELDS from readCurve.
+        :param salt: Export settings that change the stored curve, e.g. the frame range.
+        :return: Hex digest.
+        """
+        digest = hashlib.sha1(salt)
+        for field in CURVE_FIELDS:
+            values = curve[field]
+            digest.update(values.tostring() if isinstance(values, array) else repr(list(values)))
+        return digest.hexdigest()
 
-    def getAnim(self, par='', startFrame=0.0, endFrame=1.0):
+    def getAnim(self, par='', startFrame=0.0, endFrame=1.0, hashes=None, previous=None, salt="", counts=None):
         """ Queries an object for relevant keyframe animation data.
 
+        Every channel is classed as static (unkeyed), constant (keyed, but never moving inside
+        the range) or animated. Static and constant channels are stored as their bare value,
+        only animated ones keep their curve, read straight from the animCurve node.
+
+        With hashes, every curve read gets a content hash of its stored keys. Curves whose hash
+        matches the previous export are not encoded again, their block from that file is reused.
+        Driven keys are never read, so they're never reused either.
+
         :param par: Object to query.
         :param startFrame: Start frame to query animation from.
         :param endFrame: Last frame to query animation on.
-        :return: Dictionary of the attributes and their values.
+        :param hashes: Optional dictionary filled with {attr: hash}.
+        :param previous: Optional (MafFile, controller name) of the previous export.
+        :param salt: Export settings mixed into the hashes.
+        :param counts: Optional dictionary of channel class (static, constant, animated, reused) to count, added to.
+        :return: Dictionary of the attributes and their curve dictionaries (see CURVE_FIELDS), values or EncodedCurve.
         """
-        attrsKeyable = cmds.listAnimatable(par)
+        # Discovered once per node and session, see AnimatableCache
+        attrsKeyable = animatableCache().attributes(par)
         attrDict = {}
-        for attr in attrsKeyable:
-            tv = cmds.keyframe(attr, q=1, timeChange=1, valueChange=1, a=1, t=(startFrame, endFrame))
+        prevHashes = previous[0].curveHashes().get(previous[1], {}) if previous else {}
+        prevBlocks = None
+        for attr, plug in attrsKeyable:
             shortAttr = attr.split(':')[-1].split('|')[-1]
-            if not tv:
-                sVal = cmds.getAttr(attr, t=startFrame)
-                tv = [startFrame, sVal]
-
-            weightedTan = cmds.keyTangent(attr, q=1, weightedTangents=1, t=(startFrame, endFrame))
-            inTan = cmds.keyTangent(attr, q=1, itt=1, t=(startFrame, endFrame))
-            outTan = cmds.keyTangent(attr, q=1, ott=1, t=(startFrame, endFrame))
-            lockTan = cmds.keyTangent(attr, q=1, lock=1, t=(startFrame, endFrame))
-            weightLock = cmds.keyTangent(attr, q=1, weightLock=1, t=(startFrame, endFrame))
-
-            inAngle = cmds.keyTangent(attr, q=1, inAngle=1, t=(startFrame, endFrame))
-            outAngle = cmds.keyTangent(attr, q=1, outAngle=1, t=(startFrame, endFrame))
-            inWeight = cmds.keyTangent(attr, q=1, inWeight=1, t=(startFrame, endFrame))
-            outWeight = cmds.keyTangent(attr, q=1, outWeight=1, t=(startFrame, endFrame))
-            attrDict[shortAttr] = [{'time': tv[0::2]}, {'value': tv[1::2]}, {'weightedTan': weightedTan},
-                                   {'inTan': inTan}, {'outTan': outTan}, {'lockTan': lockTan},
-                                   {'weightLock': weightLock}, {'inAngle': inAngle}, {'outAngle': outAngle},
-                                   {'inWeight': inWeight}, {'outWeight': outWeight}]
+
+            curve = None
+            channelClass = 'static'
+            curveObjs = om.MObjectArray()
+            if omAnim.MAnimUtil.findAnimation(plug, curveObjs):
+                curve = self.readCurve(curveObjs[0], startFrame, endFrame)
+                if curve:
+                    value = constantValue(curve)
+                    channelClass = 'animated' if value is None else 'constant'
+                    if value is not None:
+                        curve = value
+                    elif hashes is not None:
+                        digest = self.curveHash(curve, salt)
+                        hashes[shortAttr] = digest
+                        if prevHashes.get(shortAttr) == digest:
+                            if prevBlocks is None:
+                                prevBlocks = previous[0].curveBlocks(previous[1])
+                            if shortAttr in prevBlocks:
+                                curve = EncodedCurve(prevBlocks[shortAttr])
+                                channelClass = 'reused'
+
+            if channelClass == 'static':
+                curve = float(cmds.getAttr(attr, t=startFrame))
+
+            if counts is not None:
+                counts[channelClass] = counts.get(channelClass, 0) + 1
+            attrDict[shortAttr] = curve
         return attrDict
 
+    def reduceKeys(self, ctlDict, parPaths, tolerance):
+        """ Replaces baked curves with the fewest fixed tangent keys that stay within tolerance.
+
+        Every baked curve of the export is fitted in one go, see CMiller_MafCurves.
+
+        :param ctlDict: Dictionary of controllers to attribute curve dictionaries, edited in place.
+        :param parPaths: Dictionary of controller names to their full paths.
+        :param tolerance: Max error in UI units, a number or a dictionary of attribute name/prefix to tolerance.
+        :return: Report dictionary with key counts and max error || None if nothing was reduced.
+        """
+        names = []
+        curves = []
+        for ctl, attrs in ctlDict.items():
+            for attr, curve in attrs.items():
+                if isinstance(curve, EncodedCurve) or isStatic(curve):
+                    continue
+                if curve['inTan'] is not None and isBaked(curve['time']):
+                    names.append((ctl, attr))
+                    curves.append((curve['time'], curve['value']))
+        if not curves:
+            return None
+
+        results = reduceCurves(curves, [toleranceFor(attr, tolerance) for ctl, attr in names])
+        if results is None:
+            cmds.warning("Key reduction needs numpy, exporting every baked key.")
+            return None
+
+        # Slopes are UI units per frame, tangent angles are internal units per second
+        fps = getFps()
+
+        report = {'curves': len(curves), 'keysBefore': 0, 'keysAfter': 0, 'maxError': 0.0}
+        for (ctl, attr), (times, values), (kept, slopes, maxError) in zip(names, curves, results):
+            fullAttr = parPaths[ctl] + '.' + attr.split('.')[-1]
+            scale = fps * getUnitScale(cmds.getAttr(fullAttr, type=1))
+            angles = array('d', [math.degrees(math.atan(slope * scale)) for slope in slopes])
+            numKeys = len(kept)
+            ctlDict[ctl][attr] = {'time': array('d', [times[ii] for ii in kept]),
+                                  'value': array('d', [values[ii] for ii in kept]),
+                                  'weightedTan': [False], 'inTan': ['fixed'] * numKeys, 'outTan': ['fixed'] * numKeys,
+                                  'lockTan': [True] * numKeys, 'weightLock': [False] * numKeys,
+                                  'inAngle': angles, 'outAngle': array('d', angles),
+                                  'inWeight': array('d', [1.0] * numKeys), 'outWeight': array('d', [1.0] * numKeys)}
+            report['keysBefore'] += len(times)
+            report['keysAfter'] += numKeys
+            report['maxError'] = max(report['maxError'], maxError)
+
+        print "Key reduction: %d curves, %d keys to %d (%.1f%%), max error %g" % (
+            report['curves'], report['keysBefore'], report['keysAfter'],
+            100.0 * report['keysAfter'] / report['keysBefore'], report['maxError'])
+        return report
+
     def constraintBake(self, obj, ex='none'):
         """ Bakes down the constraints on an object.
 
@@ -150,53 +508,106 @@ class ExImFuncs(object):
         :param ex: Valid arguments (hierarchy) are 'above', 'below', 'both', 'none'
         :return: None
         """
+        self.constraintBakeAll([obj], ex)
+
+    def constraintBakeAll(self, objs, ex='none'):
+        """ Bakes down the constraints on many objects in a single bakeResults pass, then deletes them in one go.
+
+        Only channels driven by a constraint are baked. Constraints that merely use an object as a
+        target are left alone.
+
+        :param objs: Target objects.
+        :param ex: Valid arguments (hierarchy) are 'above', 'below', 'both', 'none'
+        :return: Number of baked channels.
+        """
+        if not objs:
+            return 0
         startFrame = int(cmds.playbackOptions(q=1, min=1))
         endFrame = int(cmds.playbackOptions(q=1, max=1))
-        cons = cmds.listConnections(obj, type="constraint", c=1)
-        if cons:
-            cmds.bakeResults(cons[0::2], t=(startFrame, endFrame), sm=1, hi=ex)
-            conList = list(set(cons[1::2]))
-            cmds.delete(conList)
-
-    def exportAnim(self, variant=""):
+        index = sceneIndex()
+        channels, conList = index.constrainedPlugs(objs)
+        if not channels:
+            return 0
+
+        # One timeline pass evaluates every constrained channel at once
+        cmds.bakeResults(channels, t=(startFrame, endFrame), sm=1, hi=ex)
+        index.delete(conList)
+        print "%d constrained channels baked from %d constraints" % (len(channels), len(conList))
+        return len(channels)
+
+    def exportAnim(self, variant="", topNodes=None, overwrite=OVERWRITE_ASK, reduceTolerance=None, background=False,
+                   saveDir=None):
         """ Exports animation on the selected object(s) to an .animMAF file.
 
         :param variant: Optional argument for a modified name.
-        :return: Path to the .animMAF file.
+        :param topNodes: Objects to export, defaults to the selection.
+        :param overwrite: OVERWRITE_ASK, OVERWRITE_ALWAYS or OVERWRITE_SKIP for existing files.
+        :param reduceTolerance: Optional key reduction tolerance for baked curves, see reduceKeys.
+        :param background: Encode and write the files on a worker thread once the scene has been read.
+        :param saveDir: Optional directory to write to instead of the scene's animMaf directory.
+        :return: List of paths to the written .animMAF files, still being written when background is on.
         """
-        curSelection = cmds.ls(sl=1)
-        for topNode in curSelection:
+        savePaths = []
+        if topNodes is None:
+            topNodes = cmds.ls(sl=1)
+        for topNode in topNodes:
 
-            savePath, startFrame, endFrame, aeDirPath = self.getSavePath(topNode, variant)
+            fpReturns = self.getSavePath(topNode, variant, saveDir)
+            if not fpReturns:
+                break
+            savePath, startFrame, endFrame, aeDirPath = fpReturns
 
             if os.path.exists(savePath):
-                myChoice = cmds.confirmDialog(title='File Exists!!',
-                                              message='This wip version already has an animMAF file. Do you want to overwrite?',
-                                              button=['Yes', 'No'], defaultButton='No', cancelButton='No',
-                                              dismissString='No')
-                if myChoice == 'No':
-                    sys.exit(0)
+                if overwrite == OVERWRITE_ASK:
+                    myChoice = cmds.confirmDialog(title='File Exists!!',
+                                                  message='This wip version already has an animMAF file. Do you want to overwrite?',
+                                                  button=['Yes', 'No'], defaultButton='No', cancelButton='No',
+                                                  dismissString='No')
+                    if myChoice == 'No':
+                        continue
+                elif overwrite != OVERWRITE_ALWAYS:
+                    print "Skipping %s, %s already exists" % (topNode, savePath)
+                    continue
             cmds.warning('Currently Writing Out Frames %d to %d for object %s. You have not crashed.' % (
             startFrame, endFrame, topNode))
-            cmds.refresh()
+            if not cmds.about(batch=1):
+                cmds.refresh()
+
+            # Unchanged curves get copied over from the file being replaced
+            previous = None
+            if os.path.exists(savePath):
+                try:
+                    previous = MafFile(savePath)
+                except Exception:
+                    previous = None
+                if previous is not None and previous.version < 2:
+                    previous = None
+            salt = repr((startFrame, endFrame, reduceTolerance, cmds.currentUnit(q=1, linear=1),
+                         cmds.currentUnit(q=1, angle=1), cmds.currentUnit(q=1, time=1)))
 
-            masterDict = {}
             ctlDict = {}
+            parPaths = {}
+            ctlHashes = {}
+            channelCounts = {}
 
             initT = cmds.getAttr(topNode + ".t")
             initR = cmds.getAttr(topNode + ".r")
             initS = cmds.getAttr(topNode + ".s")
             initPos = initT + initR + initS
 
-            parList = cmds.listRelatives(topNode, ad=1, f=1, type="transform")
+            index = sceneIndex()
+            parList = index.descendants(topNode)
             # parList = list(set([cmds.listRelatives(i,f=1,p=1)[0] for i in hi]))
+
+            # Pre-export bake phase for the whole hierarchy
+            self.constraintBakeAll(parList)
+
             for par in parList:
-                self.constraintBake(par)
                 # off = cmds.listRelatives(par,p=1)[0]
                 shortPar = par.split(':')[-1].split('|')[-1]
 
                 # shortOff = off.split(':')[-1].split('|')[-1]
-                if shortPar == 'MASTER_CONTROL':
+                if index.hasTag(par, 'master'):
                     if initT == [(0.0, 0.0, 0.0)]:
                         initT = cmds.getAttr(par + ".t", t=startFrame)
                         initR = cmds.getAttr(par + ".r", t=startFrame)
@@ -204,7 +615,7 @@ class ExImFuncs(object):
 
                         initPos = initT + initR + initS
 
-                elif "tranRot_CTL" in shortPar:
+                elif index.hasTag(par, 'tranRot'):
                     if initT == [(0.0, 0.0, 0.0)]:
                         initT = cmds.getAttr(par + ".t", t=startFrame)
                         initR = cmds.getAttr(par + ".r", t=startFrame)
@@ -222,8 +633,11 @@ class ExImFuncs(object):
                 if numKeys > 0:
                     # animated
                     print shortPar
-                    shortParAttrDict = self.getAnim(par, startFrame, endFrame)
+                    ctlHashes[shortPar] = {}
+                    shortParAttrDict = self.getAnim(par, startFrame, endFrame, ctlHashes[shortPar],
+                                                    (previous, shortPar) if previous else None, salt, channelCounts)
                     ctlDict[shortPar] = shortParAttrDict
+                    parPaths[shortPar] = par
 
                 '''
                 offKeys = cmds.keyframe(off, q=1, kc=1, t=(startFrame, endFrame))
@@ -236,64 +650,110 @@ class ExImFuncs(object):
                     # ctlDict.keys() ctlDict['x_ctrl']
                     # masterDict.keys()
                 '''
+            print "Channels: %s" % ', '.join('%d %s' % (count, name) for name, count in sorted(channelCounts.items()))
+
+            keyReduction = None
+            if reduceTolerance is not None:
+                keyReduction = self.reduceKeys(ctlDict, parPaths, reduceTolerance)
+
+            tangentTypes = None
+            if previous is not None:
+                tangentTypes = previous.header['tangentTypes']
+                numReused = len([c for attrs in ctlDict.values() for c in attrs.values() if isinstance(c, EncodedCurve)])
+                numCurves = sum(len(h) for h in ctlHashes.values())
+                print "Reused %d of %d animCurves from the previous export" % (numReused, numCurves)
+
             topNodeShort = topNode.split(":")[-1]
-            masterDict[topNodeShort] = ctlDict
-            masterDict['_init'] = initPos
-            with open(savePath, 'w') as file:
-                data = json.dump(masterDict, file)
+            meta = {'user': os.getenv('USERNAME'), 'scene': self.__FullPath__, 'variant': variant,
+                    'keyReduction': keyReduction, 'curveHashes': ctlHashes,
+                    'units': {'time': cmds.currentUnit(q=1, time=1), 'linear': cmds.currentUnit(q=1, linear=1),
+                              'angle': cmds.currentUnit(q=1, angle=1)}}
+            if background:
+                # Everything below only touches ctlDict, Maya is free once it's handed over
+                writer.submit(savePath, partial(encodeMaf, topNodeShort, ctlDict, initPos, startFrame, endFrame,
+                                                tangentTypes, **meta), self.exportDone)
+            else:
+                writeMaf(savePath, topNodeShort, ctlDict, initPos, startFrame, endFrame, tangentTypes, **meta)
+                print(savePath)
+            savePaths.append(savePath)
+        return savePaths
+
+    def exportDone(self, savePath, error):
+        """ Called on the main thread when a background export finished writing.
 
+        :param savePath: Written file.
+        :param error: Traceback string if the write failed, else None.
+        :return: None
+        """
+        if error is None:
             print(savePath)
-            return savePath
 
-    def importAnim(self, animLayer='', murderKeys=False, dataFile=None):
+    def importAnim(self, animLayer='', murderKeys=False, dataFile=None, mapping=None, transform=None):
         """ Imports animation from an .animMAF file to the selected object.
 
         :param animLayer: Optional argument for Animation Layer to import on.
         :param murderKeys: Whether or not to delete pre-existing keyframes.
         :param dataFile: The .animMAF file to reference.
+        :param mapping: Optional MappingProfile, defaults to the saved profile for the file and selected rig.
+        :param transform: Optional CurveTransform to offset, retime, scale and crop the curves before keying.
         :return: None
         """
         topNode = cmds.ls(sl=1)[0]
         startFrame = int(cmds.playbackOptions(q=1, min=1))
         endFrame = int(cmds.playbackOptions(q=1, max=1))
+        if transform is not None and transform.isIdentity():
+            transform = None
+        if transform is not None and transform.crop:
+            startFrame, endFrame = transform.crop
         # savePath, startFrame, endFrame, aeDirPath = self.getFilePath(topNode)
         if dataFile:
             initPos = dataFile[0]
             ctlData = dataFile[1]
         else:
-            savePath = cmds.fileDialog2(ds=2, fm=1, ff='MAF Files (*.animMAF)')[0]
-            with open(savePath, 'r') as file:
-                data = json.load(file)
+            savePath = cmds.fileDialog2(ds=2, fm=1, ff='MAF Files (*%s)' % MAF_EXT)[0]
+            mafFile = MafFile(savePath)
+            initPos = mafFile.initPos
+            ctlData = mafFile.controlData()
+            if mapping is None:
+                mapping = loadProfile(mafFile.topNode, topNode)
+        if mapping is None:
+            mapping = MappingProfile()
+
+        index = sceneIndex()
+        parList = index.descendants(topNode)
+        # parList = list(set([cmds.listRelatives(i,f=1,p=1)[0] for i in hi]))
 
-            if data.keys()[0] == '_init':
-                initPos = data[data.keys()[0]]
-                ctlData = data[data.keys()[1]]
-            else:
-                initPos = data[data.keys()[1]]
-                ctlData = data[data.keys()[0]]
+        # Only controls mapped onto the rig get decoded, and only when setAnim reaches them
+        fileCtls = ctlData.keys()
+        matched = {}
+        for ctl, nodes in mapping.compile(fileCtls, parList).items():
+            for node in nodes:
+                matched[node] = ctl
+        print "Importing %d of %d stored controls" % (len(set(matched.values())), len(fileCtls))
 
-        parList = cmds.listRelatives(cmds.ls(sl=1)[0], ad=1, f=1, type="transform")
-        # parList = list(set([cmds.listRelatives(i,f=1,p=1)[0] for i in hi]))
-        for par in parList:
-            shortPar = par.split(':')[-1]
+        # The cmds edits and every cmmMafCurveChange call undo as one step
+        with UndoChunk():
+            for par in parList:
+                shortPar = par.split(':')[-1]
 
-            if shortPar == 'MASTER_CONTROL':
-                cmds.setAttr(par + '.t', initPos[0][0], initPos[0][1], initPos[0][2])
-                cmds.setAttr(par + '.r', initPos[1][0], initPos[1][1], initPos[1][2])
-                cmds.setAttr(par + '.s', initPos[2][0], initPos[2][1], initPos[2][2])
-            elif "tranRot_CTL" in shortPar:
-                cmds.setAttr(par + '.t', initPos[0][0], initPos[0][1], initPos[0][2])
-                cmds.setAttr(par + '.r', initPos[1][0], initPos[1][1], initPos[1][2])
-                cmds.setAttr(par + '.s', initPos[2][0], initPos[2][1], initPos[2][2])
+                if index.hasTag(par, 'master'):
+                    cmds.setAttr(par + '.t', initPos[0][0], initPos[0][1], initPos[0][2])
+                    cmds.setAttr(par + '.r', initPos[1][0], initPos[1][1], initPos[1][2])
+                    cmds.setAttr(par + '.s', initPos[2][0], initPos[2][1], initPos[2][2])
+                elif index.hasTag(par, 'tranRot'):
+                    cmds.setAttr(par + '.t', initPos[0][0], initPos[0][1], initPos[0][2])
+                    cmds.setAttr(par + '.r', initPos[1][0], initPos[1][1], initPos[1][2])
+                    cmds.setAttr(par + '.s', initPos[2][0], initPos[2][1], initPos[2][2])
 
-            # off = cmds.listRelatives(par,p=1)[0]
+                # off = cmds.listRelatives(par,p=1)[0]
 
-            if murderKeys:
-                cmds.cutKey(par, time=(startFrame, endFrame), cl=1, option="keys")
-                # cmds.cutKey( off, time=(startFrame,endFrame), cl=1, option="keys")
+                if murderKeys:
+                    cmds.cutKey(par, time=(startFrame, endFrame), cl=1, option="keys")
+                    # cmds.cutKey( off, time=(startFrame,endFrame), cl=1, option="keys")
 
-            self.setAnim(par, ctlData, startFrame, endFrame, animLayer)
-            # self.setAnim(off,ctlData,startFrame,endFrame,animLayer)
+                if par in matched:
+                    self.setAnim(par, ctlData, startFrame, endFrame, animLayer, matched[par], transform)
+                # self.setAnim(off,ctlData,startFrame,endFrame,animLayer)
         print "IMPORT COMPLETE!"
 
     def replaceTarget(self, dataFile, old, new):
@@ -304,24 +764,36 @@ class ExImFuncs(object):
         :param new: New object name to replace with.
         :return: The modified .animMAF file and the control list from it.
         """
-        dataFile[new] = dataFile.pop(old)
+        if hasattr(dataFile, 'rename'):
+            dataFile.rename(old, new)
+        else:
+            dataFile[new] = dataFile.pop(old)
         ctlList = dataFile.keys()
         ctlList.sort()
         return dataFile, ctlList
 
-    def getSavePath(self, obj, variant=""):
+    def getMafDir(self):
+        """ The animMaf directory of the current scene, without creating it.
+
+        :return: Directory path || None if the scene isn't saved.
+        """
+        if self.__FullPath__:
+            return os.path.dirname(self.__FullPath__) + "/animMaf/"
+        return None
+
+    def getSavePath(self, obj, variant="", saveDir=None):
         """ Attempt to find the save path to an .animMAF file for the currently selected object.
 
         :param obj: Object to find/create a save path for.
         :param variant: Optional argument for a modified name.
+        :param saveDir: Optional directory to use instead of the scene's animMaf directory.
         :return: Path to the .animMaf file, first frame, last frame, base directory || None.
         """
         startFrame = int(cmds.playbackOptions(q=1, min=1))
         endFrame = int(cmds.playbackOptions(q=1, max=1))
         usr = os.getenv('USERNAME')
-        if self.__FullPath__:
-            baseDir = os.path.dirname(self.__FullPath__)
-            aeDirPath = baseDir + "/animMaf/"
+        aeDirPath = os.path.join(saveDir, '') if saveDir else self.getMafDir()
+        if aeDirPath:
             if not os.path.isdir(aeDirPath):
                 os.makedirs(aeDirPath)
 
@@ -341,9 +813,8 @@ class ExImFuncs(object):
         self.endFrame = int(cmds.playbackOptions(q=1, max=1))
 
         if self.checkRigid(self.topNode):
-            self.bakeObjectsAction(self.topNode)
-            cmds.refresh()
-            self.exportBakedDataToFile(self.topNode)
+            # World transforms are sampled through the rig, no need to bake keys first
+            self.exportTransformCache(self.topNode)
 
     def checkRigid(self, topNode):
         """ Determines if an object is a rigid prop (does not have a skinCluster).
@@ -351,16 +822,20 @@ class ExImFuncs(object):
         :param topNode: Object to check.
         :return: True or False.
         """
-        pNode = cmds.listRelatives(topNode, p=1)[0]
-        if pNode.split(":")[-1] == "Model":
+        index = sceneIndex()
+        if index.isSkinned(topNode):
+            cmds.warning("Object has skinned geometry, it is not a rigid prop. Skipping.")
+            return False
+
+        pNode = index.parent(topNode)
+        if pNode and pNode.split("|")[-1].split(":")[-1] == "Model":
             # We need to check where the constraint driver is
-            kids = cmds.listRelatives(pNode, c=1)
             ctl = ""
-            for kid in kids:
-                if "parentConstraint" in kid:
-                    modelCon = kid
-                    ctl = [x for x in list(set(cmds.listConnections(kid, s=1, d=0))) if "CTL" in x][0]
-                    tgtWgt = cmds.parentConstraint(kid, q=1, wal=1)[0]
+            for modelCon in index.constraints(pNode, 'parentConstraint'):
+                ctls = [x for x in index.drivers(modelCon) if index.hasTag(x, 'control')]
+                if ctls:
+                    ctl = ctls[0]
+                    tgtWgt = cmds.parentConstraint(modelCon, q=1, wal=1)[0]
                     # We've determined this is a Generic prop rig and the constraint is on a parent node
                     # We have the constraint as well as
                     break
@@ -368,42 +843,75 @@ class ExImFuncs(object):
                 # There is a constraint on the Model group, we'll need to emulate it.
                 self.tempCon = cmds.parentConstraint(ctl, topNode, mo=1)
                 cmds.setAttr("%s.%s" % (modelCon, tgtWgt), 0)
-
-        conns = cmds.listConnections(topNode)
-        if conns:
-            if len([x for x in conns if "parentConstraint" in x]) > 0:
                 # A parent constraint is attached to the object now, we may proceed
                 return True
-        else:
-            # Either a constraint is lower in the hierarchy, or this object is not even rigged. Let's quickly check:
-            if len([p for p in cmds.listRelatives(topNode, p=1, f=1)[0].split("|") if "Rig" in p]) > 0:
-                # We have a rig, let's proceed
-                return True
 
-            else:
-                # This isn't even a rigged object unless someone named it wrong. We need to abort and alert the user
-                cmds.warning("Object does not appear to be rigged. Skipping.")
-                return False
+        if index.constraints(topNode, 'parentConstraint'):
+            # A parent constraint is attached to the object now, we may proceed
+            return True
+        elif index.isInRig(topNode):
+            # Either a constraint is lower in the hierarchy, or this object is under a rig. We have a rig, let's proceed
+            return True
+        else:
+            # This isn't even a rigged object unless someone named it wrong. We need to abort and alert the user
+            cmds.warning("Object does not appear to be rigged. Skipping.")
+            return False
 
-    def bakeObjectsAction(self, obj):
+    def bakeObjectsAction(self, obj, simulation=True):
         """ Bakes down the animation of an object.
 
         :param obj: Object to bake keyframes on.
+        :param simulation: Evaluate frame after frame. Off bakes each frame on its own, only right
+                           for rigs that don't depend on the previous frame, see shardedBake.
         :return: Number of baked channels.
         """
-        numBaked = cmds.bakeResults(obj, simulation=1, t=(self.startFrame, self.endFrame), hi="below", sb=1, dic=1,
+        numBaked = cmds.bakeResults(obj, simulation=int(simulation), t=(self.startFrame, self.endFrame), hi="below",
+                                    sb=1, dic=1,
                                     sac=0,
                                     pok=1, ral=0, bol=0, mr=1, cp=0, s=1)
         print (str(numBaked) + " channels baked")
         return numBaked
 
+    def shardedBake(self, topNode=None, mode='cache', workers=4, variant="", reduceTolerance=None):
+        """ Bakes a top node over the playback range in parallel headless mayapy processes.
+
+        Each worker opens the saved scene and bakes one frame range, the results are merged into
+        one file next to the regular exports. Only for rigs without simulation, every shard is
+        evaluated on its own. Blocks until all workers are done.
+
+        :param topNode: Top node, defaults to the selection.
+        :param mode: 'cache' for a .mafCache of world transforms, 'maf' for baked keys in an .animMAF file.
+        :param workers: Number of mayapy processes, one frame range each.
+        :param variant: Optional argument for a modified name.
+        :param reduceTolerance: Optional key reduction tolerance for the baked curves of 'maf' mode.
+        :return: Path to the merged file || None.
+        """
+        import CMiller_MafBatch
+
+        topNode = topNode or cmds.ls(sl=1)[0]
+        if cmds.file(q=1, modified=1):
+            cmds.warning("Workers read the scene from disk, unsaved changes won't be baked")
+        fpReturns = self.getSavePath(topNode, variant)
+        if not fpReturns:
+            return None
+        savePath, startFrame, endFrame, aeDirPath = fpReturns
+        if mode == 'cache':
+            savePath = os.path.splitext(savePath)[0] + CACHE_EXT
+
+        report = CMiller_MafBatch.runShardedBake(self.__FullPath__, topNode, startFrame, endFrame, savePath, mode,
+                                                 workers, variant=variant, reduceTolerance=reduceTolerance)
+        if report['status'] != 'ok':
+            cmds.warning("Sharded bake failed: %s" % report['error'])
+            return None
+        print(savePath)
+        return savePath
+
     def exportBakedDataToFile(self, topNode, variant=""):
         """ **UNDER CONSTRUCTION**
         """
         pass
         # range star to end
         # make dict
-        masterDict = {}
         ctlDict = {}
 
         savePath, startFrame, endFrame, aeDirPath = self.getFilePath(topNode, variant)
@@ -419,42 +927,174 @@ class ExImFuncs(object):
             shortParAttrDict = self.getAnim(par, startFrame, endFrame)
             ctlDict[par] = shortParAttrDict
 
-        masterDict[topNode] = ctlDict
-        masterDict['_init'] = initPos
-        with open(savePath, 'w') as file:
-            data = json.dump(masterDict, file)
+        writeMaf(savePath, topNode, ctlDict, initPos, startFrame, endFrame,
+                 user=os.getenv('USERNAME'), scene=self.__FullPath__, variant=variant)
 
         print(savePath)
         return savePath
 
-    def bakeOutWorldData(self):
-        """ **UNDER CONSTRUCTION**
+    def sampleWorldMatrices(self, nodes, startFrame, endFrame, step=1):
+        """ Evaluates the world matrix of every node on every frame through a DG context.
+
+        Nothing gets created in the scene and the current time doesn't change. Each frame is one
+        pass over the worldMatrix plugs of all nodes.
+
+        :param nodes: Transforms to sample.
+        :param startFrame: First frame.
+        :param endFrame: Last frame.
+        :param step: Frame step.
+        :return: TransformCache
         """
-        pass
-        bakeList = []
-        conList = []
+        plugs = []
+        for node in nodes:
+            dagPath = getDagPath(node)
+            worldPlug = om.MFnDagNode(dagPath).findPlug('worldMatrix')
+            plugs.append(worldPlug.elementByLogicalIndex(dagPath.instanceNumber()))
+
+        frames = []
+        frame = startFrame
+        while frame <= endFrame:
+            frames.append(frame)
+            frame += step
+
+        timeUnit = om.MTime.uiUnit()
+        data = array('d')
+        rows = range(4)
+        for frame in frames:
+            context = om.MDGContext(om.MTime(frame, timeUnit))
+            for plug in plugs:
+                matrix = om.MFnMatrixData(plug.asMObject(context)).matrix()
+                data.extend([matrix(r, c) for r in rows for c in rows])
+        return TransformCache(nodes, frames, data)
+
+    def bakeOutWorldData(self, topNode=None, startFrame=None, endFrame=None):
+        """ Samples the world transforms of every transform under a top node for Lighting.
+
+        :param topNode: Top node, defaults to the selection.
+        :param startFrame: First frame, defaults to the playback range.
+        :param endFrame: Last frame, defaults to the playback range.
+        :return: TransformCache
+        """
+        topNode = topNode or cmds.ls(sl=1)[0]
+        if startFrame is None:
+            startFrame = int(cmds.playbackOptions(q=1, min=1))
+        if endFrame is None:
+            endFrame = int(cmds.playbackOptions(q=1, max=1))
 
-        for par in parList:
-            ctl = cmds.circle(n="%s" % (par.split("|")[-1].split(":")[-1]))[0]
-            pCon = cmds.parentConstraint(par, ctl, mo=0)[0]
-            bakeList.append(ctl)
-            conList.append(pCon)
+        parList = cmds.ls(topNode, l=1) + (cmds.listRelatives(topNode, ad=1, f=1, type="transform") or [])
+        cache = self.sampleWorldMatrices(parList, startFrame, endFrame)
+        print "Sampled %d objects over %d frames" % (cache.numObjects, cache.numFrames)
+        return cache
+
+    def exportTransformCache(self, topNode, variant=""):
+        """ Writes the world transforms of a prop to a .mafCache file next to its .animMAF files.
+
+        :param topNode: Top node of the prop.
+        :param variant: Optional argument for a modified name.
+        :return: Path to the .mafCache file || None.
+        """
+        fpReturns = self.getSavePath(topNode, variant)
+        if not fpReturns:
+            return None
+        savePath, startFrame, endFrame, aeDirPath = fpReturns
+        savePath = os.path.splitext(savePath)[0] + CACHE_EXT
 
-        print "Ready to bake"
-        cmds.bakeResults(bakeList, t=(startFrame, endFrame))
-        return bakeList
-        print "finished bake"
-        # parent to world
-        # rename to orig
-        # bake
-        # createCurves for every obj
-        # parent to world
-        # rename to orig
-        # bake
+        cache = self.bakeOutWorldData(topNode, startFrame, endFrame)
+        writeCacheFile(savePath, cache, topNode=topNode.split(":")[-1], user=os.getenv('USERNAME'),
+                       scene=self.__FullPath__, variant=variant)
+        print(savePath)
+        return savePath
 
+    def applyTransformCache(self, cachePath, startFrame=None, endFrame=None, nodes=None):
+        """ Keys the cached world transforms back onto nodes over a frame range.
 
+        World transforms are brought into each node's parent space per frame, and rotations
+        follow the node's rotate order without flipping between frames. Parents are keyed before
+        their children, so a child's parent space already has the cached motion.
 
-        # cmds.file(savePath, f=1, typ="animExport", es=1, options="precision=8;intValue=17;nodeNames=1;verboseUnits=0;whichRange=2;range=%d:%d;options=keys;hierarchy=below;controlPoints=0;shapes=1;helpPictures=0;useChannelBox=0;copyKeyCmd=-animation objects -time >%d:%d> -float >%d:%d> -option keys -hierarchy below -controlPoints 0 -shape 1 "%(startFrame,endFrame,startFrame,endFrame,startFrame,endFrame))
+        :param cachePath: The .mafCache file.
+        :param startFrame: First frame, defaults to the start of the cache.
+        :param endFrame: Last frame, defaults to the end of the cache.
+        :param nodes: Optional dictionary of cached object names to scene nodes. By default cached
+                      objects go onto the scene transform with the same short name, objects whose
+                      short name matches several transforms are skipped with a warning.
+        :return: Number of keyed nodes.
+        """
+        timeUnit = om.MTime.uiUnit()
+        linearScale = getUnitScale('doubleLinear')
+        angleScale = getUnitScale('doubleAngle')
+        attrs = ['tx', 'ty', 'tz', 'rx', 'ry', 'rz', 'sx', 'sy', 'sz']
+
+        util = om.MScriptUtil()
+        util.createFromList([1.0, 1.0, 1.0], 3)
+        scalePtr = util.asDoublePtr()
+
+        numKeyed = 0
+        # The cmds edits and every cmmMafCurveChange call undo as one step
+        with CacheFile(cachePath) as cacheFile, UndoChunk():
+            if nodes is None:
+                nodes = {}
+                for obj in cacheFile.objects:
+                    shortObj = obj.split("|")[-1].split(":")[-1]
+                    found = cmds.ls(shortObj, "*:" + shortObj, l=1, type="transform")
+                    if len(found) > 1:
+                        cmds.warning("Skipping %s, it matches %d transforms: %s. Pass nodes to pick one."
+                                     % (obj, len(found), ', '.join(found)))
+                    elif found:
+                        nodes[obj] = found[0]
+
+            # Parents first, each node's local transform comes from its parent's evaluated motion
+            dagPaths = dict((obj, getDagPath(node)) for obj, node in nodes.items())
+            for obj in sorted(nodes, key=lambda obj: dagPaths[obj].length()):
+                node = nodes[obj]
+                frames, samples = cacheFile.samples(obj, startFrame, endFrame)
+                if not frames:
+                    continue
+                dagPath = dagPaths[obj]
+                parentPlug = om.MFnDagNode(dagPath).findPlug('parentInverseMatrix')
+                parentPlug = parentPlug.elementByLogicalIndex(dagPath.instanceNumber())
+                rotateOrder = cmds.getAttr(node + ".rotateOrder")
+
+                channels = [[] for attr in attrs]
+                prevEuler = None
+                for frame, values in zip(frames, samples):
+                    world = om.MTransformationMatrix()
+                    world.setTranslation(om.MVector(values[0], values[1], values[2]), om.MSpace.kTransform)
+                    world.setRotationQuaternion(values[3], values[4], values[5], values[6])
+                    for ii in range(3):
+                        om.MScriptUtil.setDoubleArray(scalePtr, ii, values[7 + ii])
+                    world.setScale(scalePtr, om.MSpace.kTransform)
+
+                    context = om.MDGContext(om.MTime(frame, timeUnit))
+                    parentInverse = om.MFnMatrixData(parentPlug.asMObject(context)).matrix()
+                    local = om.MTransformationMatrix(world.asMatrix() * parentInverse)
+
+                    translate = local.getTranslation(om.MSpace.kTransform)
+                    euler = local.eulerRotation()
+                    euler.reorderIt(rotateOrder)
+                    if prevEuler is not None:
+                        euler = euler.closestSolution(prevEuler)
+                    prevEuler = euler
+                    local.getScale(scalePtr, om.MSpace.kTransform)
+
+                    for ii, value in enumerate([translate.x / linearScale, translate.y / linearScale,
+                                                translate.z / linearScale, euler.x / angleScale,
+                                                euler.y / angleScale, euler.z / angleScale]):
+                        channels[ii].append(value)
+                    for ii in range(3):
+                        channels[6 + ii].append(om.MScriptUtil.getDoubleArrayItem(scalePtr, ii))
+
+                items = []
+                for attr, values in zip(attrs, channels):
+                    curve = dict((field, None) for field in CURVE_FIELDS)
+                    curve['time'] = array('d', frames)
+                    curve['value'] = array('d', values)
+                    items.append((node + "." + attr, curve, frames[0], frames[-1]))
+                self.setCurves(items)
+                numKeyed += 1
+
+        print "%d nodes keyed from %s" % (numKeyed, cachePath)
+        return numKeyed
 
 
 '''
@@ -512,6 +1152,8 @@ class cmmAnimExportToolUI(QtGui.QDialog, ExImFuncs):
         self.loadedData = None
         self.dataFile = None
         self.loadedInit = None
+        self.renames = {}
+        self.catalog = None
 
         self.setWindowFlags(QtCore.Qt.WindowStaysOnTopHint)
         self.loader = QtUiTools.QUiLoader(self)
@@ -525,6 +1167,7 @@ class cmmAnimExportToolUI(QtGui.QDialog, ExImFuncs):
 
         # Connect the elements
         self.UI.curDirContents_pushButton.clicked.connect(self.dirListing)
+        self.UI.curDirSearch_lineEdit.textChanged.connect(self.catalogPopulate)
         self.UI.exportAnim_pushButton.clicked.connect(self.exportButtonAction)
         self.UI.importAnim_pushButton.clicked.connect(self.importButtonAction)
 
@@ -533,10 +1176,15 @@ class cmmAnimExportToolUI(QtGui.QDialog, ExImFuncs):
         self.UI.loadMAFData_pushButton.clicked.connect(self.loadButtonAction)
         self.UI.replaceMAFData_pushButton.clicked.connect(self.replaceButtonAction)
         self.UI.saveMAFData_pushButton.clicked.connect(self.saveButtonAction)
+        self.UI.saveMapping_pushButton.clicked.connect(self.saveMappingAction)
 
         if self.ExImFuncs.importOnly == True:
             self.UI.exportTab.setEnabled(False)
 
+        # Pending background writes show in the title bar
+        self.title = self.UI.windowTitle()
+        writer.addListener(self.writesPending)
+
         print(self.UI.keyPressEvent)
         # self.UI.keyPressEvent(self.keyPressEvent())
         '''
@@ -556,11 +1204,25 @@ class cmmAnimExportToolUI(QtGui.QDialog, ExImFuncs):
         """
         var = self.UI.fileAppend_lineEdit.text()
         # world = self.UI.worldSpaceBake_checkBox.isChecked()
-        fp = self.ExImFuncs.exportAnim(var)
+        fps = self.ExImFuncs.exportAnim(var, background=True)
 
-        if fp:
+        if fps:
+            fp = fps[-1]
             self.UI.outputPath_label.setText('<a href="%s">%s</a>' % (str("/".join(fp.split('/')[:-1])), str(fp)))
 
+    def writesPending(self, count):
+        """ Writer listener, shows the number of files still being written.
+
+        :param count: Pending background writes.
+        :return: None
+        """
+        if count:
+            self.UI.setWindowTitle('%s - writing %d file%s' % (self.title, count, 's' if count > 1 else ''))
+        else:
+            self.UI.setWindowTitle(self.title)
+            if self.catalog is not None:
+                self.dirListing()
+
     def importButtonAction(self):
         """ GUI command variant of importAnim.
 
@@ -568,52 +1230,84 @@ class cmmAnimExportToolUI(QtGui.QDialog, ExImFuncs):
         animLayer = self.UI.targetAnimLayer_lineEdit.text()  # get this val from UI
         delKeys = self.UI.deleteAnim_checkBox.isChecked()
         if self.loadedData:
-            self.ExImFuncs.importAnim(animLayer, delKeys, [self.loadedInit, self.loadedData])
+            # Renames only apply to this import, Save Mapping keeps them
+            mapping = self.loadedMapping(cmds.ls(sl=1)[0])
+            self.ExImFuncs.importAnim(animLayer, delKeys, [self.loadedInit, self.loadedData], mapping)
             self.loadedData = None
             self.dataFile = None
             self.loadedInit = None
+            self.renames = {}
             self.UI.loadedMAF_listWidget.clear()
             self.UI.saveMAFData_pushButton.setEnabled(False)
+            self.UI.saveMapping_pushButton.setEnabled(False)
 
         else:
             self.ExImFuncs.importAnim(animLayer, delKeys)
 
+    def loadedMapping(self, topNode):
+        """ The saved profile for the loaded file and a rig, with the renames made in the UI as exact rules.
+
+        :param topNode: Top node of the rig to import onto.
+        :return: MappingProfile
+        """
+        mapping = loadProfile(self.dataFile.topNode, topNode) or MappingProfile(self.dataFile.topNode, topNode)
+        for old, new in self.renames.items():
+            mapping.setExact(old, new)
+        return mapping
+
+    def saveMappingAction(self):
+        """ Saves the renames of the loaded .animMAF file as the mapping profile for the selected rig.
+
+        :return: None
+        """
+        if not self.dataFile or not self.renames:
+            return
+        selection = cmds.ls(sl=1)
+        if not selection:
+            cmds.warning("Select the top node of the rig the mapping is for.")
+            return
+        print "Saved control mapping to " + saveProfile(self.loadedMapping(selection[0]))
+
     def loadButtonAction(self):
         """ Load an .animMAF file into the UI.
 
         :return: None
         """
-        savePath = cmds.fileDialog2(ds=2, fm=1, ff='MAF Files (*.animMAF)')[0]
-        with open(savePath, 'r') as file:
-            data = json.load(file)
-
-        if data.keys()[0] == '_init':
-            initPos = data[data.keys()[0]]
-            ctlData = data[data.keys()[1]]
-        else:
-            initPos = data[data.keys()[1]]
-            ctlData = data[data.keys()[0]]
+        savePath = cmds.fileDialog2(ds=2, fm=1, ff='MAF Files (*%s)' % MAF_EXT)[0]
+        mafFile = MafFile(savePath)
+        ctlData = mafFile.controlData()
 
         ctlList = ctlData.keys()
         ctlList.sort()
         self.loadedListPopulate(ctlList)
         self.loadedData = ctlData
-        self.loadedInit = initPos
-        self.dataFile = data
+        self.loadedInit = mafFile.initPos
+        self.dataFile = mafFile
+        self.renames = {}
 
         # enable save BUTTON
         self.UI.saveMAFData_pushButton.setEnabled(True)
+        self.UI.saveMapping_pushButton.setEnabled(False)
 
     def saveButtonAction(self):
         """ GUI command hook for saveNewMAF.
 
         :return: None
         """
-        savePath = cmds.fileDialog2(ds=2, fm=1, ff='MAF Files (*.animMAF)')[0]
+        savePath = cmds.fileDialog2(ds=2, fm=1, ff='MAF Files (*%s)' % MAF_EXT)[0]
         newMasterDict = {}
         topNode = cmds.ls(sl=1)[0]
         topNodeShort = topNode.split(":")[-1]
 
+        for old, new in self.renames.items():
+            self.ExImFuncs.replaceTarget(self.loadedData, old, new)
+        if self.renames:
+            self.renames = {}
+            self.UI.saveMapping_pushButton.setEnabled(False)
+            ctlList = self.loadedData.keys()
+            ctlList.sort()
+            self.loadedListPopulate(ctlList)
+
         newMasterDict[topNodeShort] = self.loadedData
         newMasterDict['_init'] = self.loadedInit
 
@@ -623,11 +1317,13 @@ class cmmAnimExportToolUI(QtGui.QDialog, ExImFuncs):
         """ Saves/Overwrites an .animMAF file.
 
         :param dataFile: The .animMaf file to save to.
-        :param data: The data to save into the specified file.
+        :param data: The data to save into the specified file, {topNode: ctlData, '_init': initPos}.
         :return: None
         """
-        with open(dataFile, 'w') as file:
-            data = json.dump(data, file)
+        data = dict(data)
+        initPos = data.pop('_init')
+        topNode, ctlData = data.items()[0]
+        writeMaf(dataFile, topNode, ctlData, initPos, user=os.getenv('USERNAME'))
 
     def loadedListPopulate(self, ctlList):
         """ Adds the passed controller list into the UI.
@@ -637,35 +1333,66 @@ class cmmAnimExportToolUI(QtGui.QDialog, ExImFuncs):
         """
         self.UI.loadedMAF_listWidget.clear()
         self.UI.loadedMAF_listWidget.addItems(ctlList)
+        for ii, ctl in enumerate(ctlList):
+            self.UI.loadedMAF_listWidget.item(ii).setData(QtCore.Qt.UserRole, ctl)
 
     def replaceButtonAction(self):
-        """ Runs functions to modify the loaded .animMAF file.
+        """ Retargets the selected controller of the loaded .animMAF file.
+
+        The rename only goes into the list item and the pending mapping, the data is keyed by
+        the stored names until it's imported or saved.
 
         :return: None
         """
-        oldObj = self.UI.loadedMAF_listWidget.currentItem().text()
+        item = self.UI.loadedMAF_listWidget.currentItem()
         newObj = self.UI.replaceMAFData_lineEdit.text()
-        newData, ctlList = self.ExImFuncs.replaceTarget(self.loadedData, oldObj, newObj)
+        self.renames[item.data(QtCore.Qt.UserRole)] = newObj
+        item.setText(newObj)
         self.UI.replaceMAFData_lineEdit.clear()
-        self.loadedData = newData
-        self.loadedListPopulate(ctlList)
+        self.UI.saveMapping_pushButton.setEnabled(True)
 
     def dirListing(self):
-        """ Lists all .animMAF files for the current scene in the UI.
+        """ Lists all .animMAF files for the current scene in the UI, through the directory's catalog.
+
+        What's already catalogued shows straight away, then only new or changed files get read.
 
         :return: None
         """
-        fpReturns = self.ExImFuncs.getSavePath("None")
-        if fpReturns:
-            if os.path.exists(fpReturns[3]):
-                dirList = os.listdir(fpReturns[3])
-                self.UI.curDirContents_listWidget.clear()
-                for i in dirList:
-                    if i.endswith(".animMAF"):
-                        self.UI.curDirContents_listWidget.addItem(i)
-            else:
-                self.UI.curDirContents_listWidget.clear()
-                self.UI.curDirContents_listWidget.addItem("-None-")
+        aeDirPath = self.ExImFuncs.getMafDir()
+        treeWidget = self.UI.curDirContents_treeWidget
+        if not aeDirPath or not os.path.isdir(aeDirPath):
+            treeWidget.clear()
+            treeWidget.addTopLevelItem(QtGui.QTreeWidgetItem(["-None-"]))
+            return
+
+        if self.catalog is None or self.catalog.directory != aeDirPath:
+            self.catalog = Catalog(aeDirPath)
+            self.catalogPopulate()
+            QtGui.QApplication.processEvents()
+        if any(self.catalog.update()):
+            self.catalogPopulate()
+
+    def catalogPopulate(self):
+        """ Fills the directory listing from the catalog, filtered by the search field.
+
+        :return: None
+        """
+        if self.catalog is None:
+            return
+        treeWidget = self.UI.curDirContents_treeWidget
+        treeWidget.setSortingEnabled(False)
+        treeWidget.clear()
+        for row in self.catalog.search(self.UI.curDirSearch_lineEdit.text()):
+            frames = ""
+            if row['startFrame'] is not None:
+                frames = "%g-%g" % (row['startFrame'], row['endFrame'])
+            item = QtGui.QTreeWidgetItem([row['topNode'] or "", row['variant'] or "", row['user'] or "", frames,
+                                          time.strftime('%Y-%m-%d %H:%M', time.localtime(row['mtime'])),
+                                          row['name']])
+            if row['error']:
+                item.setToolTip(5, row['error'])
+            treeWidget.addTopLevelItem(item)
+        treeWidget.setSortingEnabled(True)
 
 
 def run():
@@ -0,0 +1,67 @@
+"""
+~ MAF Undo ~ 2026/10/19
+
+Puts the API key edits of an import on Maya's undo queue.
+
+MFnAnimCurve edits recorded in an MAnimCurveChange don't go through the undo queue by
+themselves. runUndoable hands the edit to the cmmMafCurveChange command (CMiller_MafCurveCmd,
+loaded on first use), which runs it and undoes or redoes the MAnimCurveChange it recorded.
+importAnim and applyTransformCache wrap their command calls and the cmds edits around them
+in one undo chunk, so every import is a single undo step.
+
+v.1 Initial Release
+"""
+
+import os
+
+from maya import OpenMayaAnim as omAnim, cmds
+
+myDir = os.path.dirname(os.path.abspath(__file__))
+
+COMMAND_NAME = 'cmmMafCurveChange'
+COMMAND_PLUGIN = 'CMiller_MafCurveCmd'
+
+# (function, MAnimCurveChange) handed over to the next cmmMafCurveChange call
+_pending = []
+
+
+def runUndoable(func):
+    """ Runs func(change) inside the cmmMafCurveChange command, so its key edits can be undone.
+
+    :param func: Function making its MFnAnimCurve edits with the MAnimCurveChange it gets.
+    :return: Whatever func returned.
+    """
+    if not cmds.pluginInfo(COMMAND_PLUGIN, q=1, loaded=1):
+        cmds.loadPlugin(os.path.join(myDir, COMMAND_PLUGIN + '.py'), quiet=1)
+    change = omAnim.MAnimCurveChange()
+    result = []
+    _pending.append((lambda change: result.append(func(change)), change))
+    try:
+        getattr(cmds, COMMAND_NAME)()
+    finally:
+        if _pending and _pending[-1][1] is change:
+            _pending.pop()
+    return result[0] if result else None
+
+
+def takePending():
+    """ Command side of runUndoable.
+
+    :return: (function, MAnimCurveChange)
+    """
+    if not _pending:
+        raise RuntimeError("%s only runs edits handed over by runUndoable" % COMMAND_NAME)
+    return _pending.pop()
+
+
+class UndoChunk(object):
+    """ Groups every undoable edit made inside the with block into one undo step.
+
+    """
+    def __enter__(self):
+        cmds.undoInfo(openChunk=1)
+        return self
+
+    def __exit__(self, *args):
+        cmds.undoInfo(closeChunk=1)
+        return False
@@ -0,0 +1,88 @@
+"""
+~ MAF Background Writer ~ 2026/10/19
+
+Encodes and writes export files on worker threads so Maya's UI stays responsive.
+
+The caller reads everything it needs from Maya on the main thread and hands over a job that
+only needs plain Python data. The job's encode function and the file write run on a worker
+thread. Files go through atomicWrite, a temp file next to the target renamed over it, so a
+reader never sees half a file. Completion callbacks go back through executeDeferred, so they
+run on the main thread and may use cmds freely.
+
+v.3 skinSaver went back to its own writer, CMiller_skinWriter
+v.2 Shared with the skinSaver tool
+v.1 Initial Release
+"""
+
+import threading
+import traceback
+
+from CMiller_MafFormat import atomicWrite
+
+
+class BackgroundWriter(object):
+    """ Queue of encode + write jobs running on daemon threads.
+
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.listeners = []
+
+    def addListener(self, func):
+        """ Registers func(pendingJobs), called on the main thread whenever the count changes.
+
+        """
+        if func not in self.listeners:
+            self.listeners.append(func)
+
+    def removeListener(self, func):
+        if func in self.listeners:
+            self.listeners.remove(func)
+
+    def _notify(self):
+        for func in list(self.listeners):
+            try:
+                func(self.pending)
+            except RuntimeError:
+                # The window went away without unregistering
+                self.removeListener(func)
+
+    def submit(self, path, encode, onDone=None):
+        """ Starts a job.
+
+        :param path: File to write.
+        :param encode: Function returning the file's bytes (or list of chunks), run on the worker thread.
+        :param onDone: Optional onDone(path, error) run on the main thread, error is None on success.
+        :return: None
+        """
+        with self._lock:
+            self.pending += 1
+        self._notify()
+        thread = threading.Thread(target=self._run, args=(path, encode, onDone))
+        thread.daemon = True
+        thread.start()
+
+    def _run(self, path, encode, onDone):
+        error = None
+        try:
+            atomicWrite(path, encode())
+        except Exception:
+            error = traceback.format_exc()
+        import maya.utils
+        maya.utils.executeDeferred(self._finish, path, error, onDone)
+
+    def _finish(self, path, error, onDone):
+        with self._lock:
+            self.pending -= 1
+        if error:
+            print error
+            from maya import cmds
+            cmds.warning("Background write of %s failed" % path)
+        if onDone is not None:
+            onDone(path, error)
+        self._notify()
+
+
+# One queue for every tool and window
+writer = BackgroundWriter()
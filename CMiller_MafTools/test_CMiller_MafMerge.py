@@ -0,0 +1,58 @@
+"""
+~ MAF Merge Tests ~ 2026/10/19
+
+Shard merging checks that run without Maya.
+
+Usage:
+    python -m pytest CMiller_MafTools/test_CMiller_MafMerge.py
+
+v.1 Initial Release
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from CMiller_MafFormat import MafFile, mergeCurves, mergeMafFiles, writeMaf
+
+
+class MergeStaticTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def test_equalStatics(self):
+        self.assertEqual(mergeCurves([(1.0, 1, 10), (1.0, 11, 20)]), 1.0)
+
+    def test_differentStatics(self):
+        curve = mergeCurves([(0.0, 1, 10), (1.0, 11, 20)])
+        self.assertEqual(list(curve['time']), [1, 11])
+        self.assertEqual(list(curve['value']), [0.0, 1.0])
+        self.assertEqual(curve['outTan'], ['step', 'step'])
+        self.assertEqual(curve['weightedTan'], [False])
+
+    def test_differentStaticShards(self):
+        paths = []
+        for startFrame, endFrame, value in [(1, 10, 0.0), (11, 20, 1.0)]:
+            path = os.path.join(self.tmpDir, 'shard%d.animMAF' % startFrame)
+            writeMaf(path, 'prop', {'switch_ctl': {'ikFk': value}}, [0.0] * 9, startFrame, endFrame)
+            paths.append(path)
+
+        savePath = mergeMafFiles(paths, os.path.join(self.tmpDir, 'merged.animMAF'))
+        mafFile = MafFile(savePath)
+        self.assertEqual((mafFile.startFrame, mafFile.endFrame), (1, 20))
+        curve = mafFile.readControl('switch_ctl')['ikFk']
+        self.assertEqual(list(curve['time']), [1.0, 11.0])
+        self.assertEqual(list(curve['value']), [0.0, 1.0])
+        self.assertEqual(curve['inTan'], ['step', 'step'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ import os
 from maya import OpenMaya as om, OpenMayaUI as omUI, OpenMayaAnim as oma, cmds, mel
 from PySide import QtGui, QtCore, QtUiTools
 from shiboken import wrapInstance
+from CMiller_skinWriter import atomicWrite, writer
 
 myDir = os.path.dirname(os.path.abspath(__file__))
 myFile = os.path.join(myDir, 'CMiller_SkinUI.ui')
@@ -101,9 +102,9 @@ class SkinCluster(object):
         print("Elapsed time was %g seconds" % (total_time))
 
     @classmethod
-    def export(cls, savePath=None, mesh=None):
+    def export(cls, savePath=None, mesh=None, background=False):
         skin = SkinCluster(mesh)
-        skin.exportSkinData(savePath)
+        skin.exportSkinData(savePath, background)
 
     @classmethod
     def destroyNamespace(cls, name):
@@ -195,8 +196,13 @@ class SkinCluster(object):
         self.mfnSkin.getBlendWeights(dgPath, components, wgts)
         self.data['blendWeights'] = [wgts[i] for i in range(wgts.length())]
 
-    def exportSkinData(self, savePath=None):
+    def exportSkinData(self, savePath=None, background=False):
+        """ Reads the skinCluster and writes it to a .skin file.
 
+        :param savePath: File to write, asks for one if None.
+        :param background: Encode and write the file on a worker thread once the weights have been read.
+        :return: None
+        """
         if savePath == None:
             savePath = cmds.fileDialog2(ds=2, fm=0, ff='Skin Files (*%s)' % SkinCluster.skinFileExt)[0]
         if not savePath:
@@ -206,10 +212,18 @@ class SkinCluster(object):
 
         self.getData()
 
-        with open(savePath, 'wb') as file:
-            json.dump(self.data, file)
-        print 'Exported skinCluster (%d influences, %d verts) %s' % (
-            len(self.data['weights'].keys()), len(self.data['blendWeights']), savePath)
+        # Only the API reads above need Maya, the JSON encode and write can happen elsewhere
+        data = self.data
+        message = 'Exported skinCluster (%d influences, %d verts) %s' % (
+            len(data['weights'].keys()), len(data['blendWeights']), savePath)
+        if background:
+            def done(path, error):
+                if error is None:
+                    print message
+            writer.submit(savePath, lambda: json.dumps(data), done)
+        else:
+            atomicWrite(savePath, json.dumps(data))
+            print message
 
     def refreshNamespaceUI(self):
         nsList = cmds.namespaceInfo(lon=1) + ["*Empty*"]
@@ -616,6 +630,10 @@ class designerUI(QtGui.QDialog, SkinCluster):
 
         self.refreshNamespaceUI()
 
+        # Pending background writes show in the title bar
+        self.title = self.UI.windowTitle()
+        writer.addListener(self.writesPending)
+
         # Show the window
         self.UI.show()
 
@@ -623,7 +641,16 @@ class designerUI(QtGui.QDialog, SkinCluster):
         """Saves the skin weights.
 
         """
-        self.export()
+        self.export(background=True)
+
+    def writesPending(self, count):
+        """Writer listener, shows the number of skin files still being written.
+
+        """
+        if count:
+            self.UI.setWindowTitle('%s - writing %d file%s' % (self.title, count, 's' if count > 1 else ''))
+        else:
+            self.UI.setWindowTitle(self.title)
 
     def loadWeights(self):
         """Loads the local space skin weights.
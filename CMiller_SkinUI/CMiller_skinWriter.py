@@ -0,0 +1,117 @@
+"""
+~ Skin Background Writer ~ 2026/10/19
+
+Encodes and writes .skin files on worker threads so Maya's UI stays responsive.
+
+The caller reads everything it needs from Maya on the main thread and hands over a job that
+only needs plain Python data. The job's encode function and the file write run on a worker
+thread. Files go through atomicWrite, a temp file next to the target renamed over it, so a
+reader never sees half a file. Completion callbacks go back through executeDeferred, so they
+run on the main thread and may use cmds freely.
+
+v.2 maya.utils is imported when a job finishes, so the module loads outside Maya
+v.1 Initial Release
+"""
+
+import os
+import tempfile
+import threading
+import traceback
+
+
+def atomicWrite(path, data):
+    """ Writes bytes to a temp file in the target directory, then renames it over the target.
+
+    Readers of the target see the old file or the new one, never part of one. Windows can't
+    rename over an existing file, so there the target is removed first and for a moment
+    there is no file at all. It still never holds part of one.
+
+    :param path: File to write.
+    :param data: Bytes, or a list of bytes chunks.
+    :return: path
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, tempPath = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            for chunk in ([data] if isinstance(data, bytes) else data):
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        if os.name == 'nt' and os.path.exists(path):
+            # Windows can't rename over an existing file
+            os.remove(path)
+        os.rename(tempPath, path)
+    except Exception:
+        if os.path.exists(tempPath):
+            os.remove(tempPath)
+        raise
+    return path
+
+
+class BackgroundWriter(object):
+    """ Queue of encode + write jobs running on daemon threads.
+
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.listeners = []
+
+    def addListener(self, func):
+        """ Registers func(pendingJobs), called on the main thread whenever the count changes.
+
+        """
+        if func not in self.listeners:
+            self.listeners.append(func)
+
+    def removeListener(self, func):
+        if func in self.listeners:
+            self.listeners.remove(func)
+
+    def _notify(self):
+        for func in list(self.listeners):
+            try:
+                func(self.pending)
+            except RuntimeError:
+                # The window went away without unregistering
+                self.removeListener(func)
+
+    def submit(self, path, encode, onDone=None):
+        """ Starts a job.
+
+        :param path: File to write.
+        :param encode: Function returning the file's bytes (or list of chunks), run on the worker thread.
+        :param onDone: Optional onDone(path, error) run on the main thread, error is None on success.
+        :return: None
+        """
+        with self._lock:
+            self.pending += 1
+        self._notify()
+        thread = threading.Thread(target=self._run, args=(path, encode, onDone))
+        thread.daemon = True
+        thread.start()
+
+    def _run(self, path, encode, onDone):
+        error = None
+        try:
+            atomicWrite(path, encode())
+        except Exception:
+            error = traceback.format_exc()
+        import maya.utils
+        maya.utils.executeDeferred(self._finish, path, error, onDone)
+
+    def _finish(self, path, error, onDone):
+        with self._lock:
+            self.pending -= 1
+        if error:
+            print error
+            from maya import cmds
+            cmds.warning("Background write of %s failed" % path)
+        if onDone is not None:
+            onDone(path, error)
+        self._notify()
+
+
+# One queue for the whole tool, shared by every window
+writer = BackgroundWriter()
@@ -8,6 +8,7 @@ Additionally allows weight transfer via selected vertices.
 Written and maintained by Christopher M. Miller
 
 
+v.4 Selected vertex transfers follow soft selection falloff
 v.3 Added prelim mirror weights
 v.2 Added Percentage option, GUI
 v.1 Initial Release to transfer weight values as command line.
@@ -25,7 +26,49 @@ import os
 myDir = os.path.dirname(os.path.abspath(__file__))
 myFile = os.path.join(myDir, 'CMiller_WeightTools.ui')
 
-def weightJumper(skin,jointSource="",jointTarget="",selVerts=False, percent=100):
+def toDoubleArray(values):
+    """ Builds an MDoubleArray from a list in one copy instead of a set() per element.
+
+    :param values: List of floats.
+    :return: MDoubleArray
+    """
+    util = om.MScriptUtil()
+    util.createFromList(values, len(values))
+    return om.MDoubleArray(util.asDoublePtr(), len(values))
+
+
+def getSoftSelection(softSelect=True):
+    """ Reads the selected vertices along with their soft selection falloff.
+
+    :param softSelect: Include the soft selection. Off, only the hard selected vertices are returned.
+    :return: Vertex component MObject and a list of per-vertex falloff weights (all 1.0 without soft select).
+    """
+    vertSelList = om.MSelectionList()
+    if softSelect:
+        try:
+            richSel = om.MRichSelection()
+            om.MGlobal.getRichSelection(richSel)
+            richSel.getSelection(vertSelList)
+        except RuntimeError:
+            softSelect = False
+    if not softSelect:
+        om.MGlobal.getActiveSelectionList(vertSelList)
+
+    selection_iter = om.MItSelectionList(vertSelList,om.MFn.kMeshVertComponent)
+    selection_DagPath = om.MDagPath()
+    componentSel = om.MObject()
+    selection_iter.getDagPath(selection_DagPath, componentSel)
+
+    fnComp = om.MFnSingleIndexedComponent(componentSel)
+    if fnComp.hasWeights():
+        falloff = [fnComp.weight(i).influence() for i in xrange(fnComp.elementCount())]
+    else:
+        falloff = [1.0] * fnComp.elementCount()
+
+    return componentSel, falloff
+
+
+def weightJumper(skin,jointSource="",jointTarget="",selVerts=False, percent=100, softSelect=True):
     """
 
     :param skin: The skinCluster to affect.
@@ -33,6 +76,7 @@ def weightJumper(skin,jointSource="",jointTarget="",selVerts=False, percent=100)
     :param jointTarget: Influence where the weights will be transferred (added) to.
     :param selVerts: Boolean for transferring entire influence or only affecting selected vertices.
     :param percent: Int 0 to 100 for the percentage of weights to transfer.
+    :param softSelect: Scale the transfer per vertex by the soft selection falloff when selVerts is on.
     :return: None
     """
 
@@ -60,21 +104,16 @@ def weightJumper(skin,jointSource="",jointTarget="",selVerts=False, percent=100)
     components = om.MObject()
     mfnSetMembers.getDagPath(0, dgPath, components)
 
+    falloff = None
     if selVerts:
-        # Get selected verts
-        vertSelList = om.MSelectionList()
-        om.MGlobal.getActiveSelectionList(vertSelList)
-        selection_iter = om.MItSelectionList(vertSelList,om.MFn.kMeshVertComponent)
-        selection_DagPath = om.MDagPath()
-        componentSel = om.MObject()
-
-        selection_iter.getDagPath(selection_DagPath, componentSel)
-        finalComponents = componentSel
+        # Get selected verts, with soft select on the soft selection and its weights too
+        finalComponents, falloff = getSoftSelection(softSelect)
+        if not softSelect:
+            falloff = None
     else:
         finalComponents = components
 
     transPercent = percent*.01
-    keepPercent = (100-percent)*.01
 
     # Get the number of influences that affect the skinCluster
     infs = om.MDagPathArray()
@@ -96,33 +135,26 @@ def weightJumper(skin,jointSource="",jointTarget="",selVerts=False, percent=100)
         elif infName==jointTarget:
             myWinIndex=counter
 
-    # Find current weights
-    myInflArray = om.MIntArray(1,myWinIndex)
-    myOtherInflArray = om.MIntArray(1,myCountIndex)
+    # Read only the source and target columns of the affected verts, interleaved per vertex
+    pairInflArray = om.MIntArray(2)
+    pairInflArray.set(myCountIndex,0)
+    pairInflArray.set(myWinIndex,1)
 
-    jointSourceWeights = om.MDoubleArray()
-    skinClusterNode.getWeights(skinPath,finalComponents,myOtherInflArray,jointSourceWeights)
+    pairWeights = om.MDoubleArray()
+    skinClusterNode.getWeights(skinPath,finalComponents,pairInflArray,pairWeights)
+    pairWeights = list(pairWeights)
 
-    jointDestWeights = om.MDoubleArray()
-    skinClusterNode.getWeights(skinPath,finalComponents,myInflArray,jointDestWeights)
-
-    jointTargetFinalWeights = om.MDoubleArray(len(jointDestWeights))
-    bigOldWeightList = [(x*transPercent) + y for x, y in zip(jointSourceWeights, jointDestWeights)]
-
-    for i in xrange(len(jointDestWeights)):
-        jointTargetFinalWeights.set(bigOldWeightList[i],i)
-
-
-    jointSourceNewWeights = om.MDoubleArray(len(jointDestWeights))
-    if percent != 100:
-        keepWeightList = [x*keepPercent for x in jointSourceWeights]
-        for i in xrange(len(jointDestWeights)):
-            jointSourceNewWeights.set(keepWeightList[i],i)
+    sourceWeights = pairWeights[0::2]
+    if falloff is None:
+        moved = [x*transPercent for x in sourceWeights]
+    else:
+        moved = [x*transPercent*f for x, f in zip(sourceWeights, falloff)]
 
+    pairWeights[0::2] = [x - m for x, m in zip(sourceWeights, moved)]
+    pairWeights[1::2] = [y + m for y, m in zip(pairWeights[1::2], moved)]
 
     # Set new weights
-    skinClusterNode.setWeights(skinPath,finalComponents,myInflArray,jointTargetFinalWeights,False)
-    skinClusterNode.setWeights(skinPath,finalComponents,myOtherInflArray,jointSourceNewWeights,False)
+    skinClusterNode.setWeights(skinPath,finalComponents,pairInflArray,toDoubleArray(pairWeights),False)
 
     cmds.setAttr("%s.normalizeWeights"%skin,normalVal)
     